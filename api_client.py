@@ -1,17 +1,32 @@
 import os
+import threading
 import requests
-import json
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-import time
 
-from config import DATA_DIR, CACHE_EXPIRY_HOURS
+import profiling
+import request_log
+from config import DATA_DIR, FETCH_CONCURRENCY, FETCH_FAILURES_FILE
+from http_client import HttpClient
+from cache_policy import is_cache_stale, write_cache_file, write_json_atomic, save_manifest
+from finals import get_finals_tournament_ids, finals_tournament_id_list
+from data_store import series_path, tournament_games_path, tournament_details_path, finals_standings_path, read_json
 from page_generators.caching import memoize_by_first_arg
 
 load_dotenv()
 
 API_KEY = os.getenv("MATCHPLAY_API_KEY")
 USER_ID = os.getenv("USER_ID")
-BASE_URL = "https://app.matchplay.events/api"
+# Overridable so the fetch pipeline can be pointed at a local stub server.
+BASE_URL = os.getenv("MATCHPLAY_BASE_URL", "https://app.matchplay.events/api")
+
+# The /games endpoint accepts up to 25 tournament IDs per request.
+GAMES_BATCH_SIZE = 25
+# Fields that the per-tournament games endpoint returns and the site depends on; batched rows
+# without them are not used.
+BATCH_REQUIRED_GAME_FIELDS = ('resultPositions', 'resultPoints')
+
+FETCH_FAILURES_PATH = os.path.join(DATA_DIR, FETCH_FAILURES_FILE)
 
 HEADERS = {
     "Authorization": f"Bearer {API_KEY}",
@@ -19,12 +34,100 @@ HEADERS = {
     "Accept": "application/json"
 }
 
-def is_cache_stale(filepath):
-    if not os.path.exists(filepath):
-        return True
-    file_mod_time = os.path.getmtime(filepath)
-    current_time = time.time()
-    return (current_time - file_mod_time) > (CACHE_EXPIRY_HOURS * 3600)
+HTTP = HttpClient(HEADERS)
+HTTP.session.hooks['response'].append(request_log.log_response)
+
+def enable_replay(log_path, latency=False):
+    """Answers every API request from the recorded responses in log_path instead of the network."""
+    adapter = request_log.ReplayAdapter(log_path, latency)
+    HTTP.session.mount("http://", adapter)
+    HTTP.session.mount("https://", adapter)
+
+def run_concurrently(func, items, max_workers=FETCH_CONCURRENCY):
+    """
+    Calls func(*item) for each item on a bounded thread pool and returns the results
+    in the order of items. With max_workers <= 1 the calls run sequentially.
+    """
+    if max_workers <= 1:
+        return [func(*item) for item in items]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(func, *item) for item in items]
+        return [future.result() for future in futures]
+
+# Retry queue: fetches that still failed after the HTTP client's own retries. fetch_data runs
+# them once more after each phase, and whatever fails again is written to FETCH_FAILURES_PATH
+# instead of silently leaving weeks out of the site. (Their cache files stay stale or missing,
+# so the next --fetch requests them again.)
+_failed_fetches = []
+_failed_fetches_lock = threading.Lock()
+
+def record_failed_fetch(fetch_func, args, error):
+    """Queues a failed fetch_func(*args) call for retrying."""
+    with _failed_fetches_lock:
+        _failed_fetches.append((fetch_func, args, error))
+
+def _call(func, args):
+    return func(*args)
+
+def retry_failed_fetches(max_workers=FETCH_CONCURRENCY):
+    """
+    Runs every queued fetch once more and returns {(fetch function, args): result}. Fetches
+    that fail again are queued again.
+    """
+    with _failed_fetches_lock:
+        queued = list(dict.fromkeys((func, args) for func, args, _ in _failed_fetches))
+        _failed_fetches.clear()
+    if not queued:
+        return {}
+    print(f"Retrying {len(queued)} failed fetch(es)...")
+    return dict(zip(queued, run_concurrently(_call, queued, max_workers)))
+
+def save_failed_fetches():
+    """Writes the fetches still in the retry queue to FETCH_FAILURES_PATH, or removes it if there are none."""
+    with _failed_fetches_lock:
+        failures = [
+            {'fetch': func.__name__, 'args': list(args), 'error': str(error)}
+            for func, args, error in _failed_fetches
+        ]
+    if not failures:
+        if os.path.exists(FETCH_FAILURES_PATH):
+            os.remove(FETCH_FAILURES_PATH)
+        return
+    write_json_atomic(FETCH_FAILURES_PATH, failures)
+    print(f"WARNING: {len(failures)} fetch(es) failed after retrying; see {FETCH_FAILURES_PATH}.")
+    for failure in failures[:10]:
+        print(f"  {failure['fetch']}{tuple(failure['args'])}: {failure['error']}")
+
+def get_all_pages(url, params):
+    """
+    Collects the 'data' items of every page of a paginated endpoint. Further pages are only
+    requested while the response carries pagination meta (last_page or current_page); a
+    response without it, or a page repeating the previous one, ends the loop, so an endpoint
+    that ignores `page` is not requested forever.
+    """
+    params = dict(params)
+    results = []
+    previous_items = None
+    page = 1
+    while True:
+        params['page'] = page
+        data = HTTP.get(url, params=params).json()
+        items = data.get('data')
+        if not items or items == previous_items:
+            break
+        results.extend(items)
+        meta = data.get('meta') or {}
+        last_page = meta.get('last_page')
+        current_page = meta.get('current_page')
+        if last_page is None and current_page is None:
+            break
+        if last_page is not None and page >= last_page:
+            break
+        if current_page is not None and current_page != page:
+            break
+        previous_items = items
+        page += 1
+    return results
 
 def get_series_by_owner(user_id, status=None):
     print(f"--- Fetching series for owner ID: {user_id} ---")
@@ -32,142 +135,277 @@ def get_series_by_owner(user_id, status=None):
     params = {'owner': user_id}
     if status:
         params['status'] = status
-    all_series = []
-    page = 1
-    while True:
-        params['page'] = page
-        response = requests.get(url, headers=HEADERS, params=params)
-        response.raise_for_status()
-        data = response.json()
-        if data.get('data'):
-            all_series.extend(data['data'])
-            page += 1
-        else:
-            break
-    return all_series
+    return get_all_pages(url, params)
+
+def finals_cache_status(tournament_id, results):
+    """
+    Returns the status to cache a finals tournament's standings or games with. Finals are
+    played after their weekly series completes, so the series status says nothing about
+    them: results are only cached as 'completed' (never re-fetched) once they are not empty
+    and the tournament's own details say it is completed. Anything else is cached as
+    'active' and re-checked after CACHE_EXPIRY_HOURS.
+    """
+    if not results:
+        return 'active'
+    tournament_details = fetch_tournament_details(tournament_id)
+    if tournament_details and (tournament_details.get('data') or {}).get('status') == 'completed':
+        return 'completed'
+    return 'active'
+
+def _games_cache_status(tournament_id, series_status, games):
+    # Weekly tournaments are cached with their series' status; finals tasks carry None
+    return series_status if series_status is not None else finals_cache_status(tournament_id, games)
 
 @memoize_by_first_arg
-def fetch_finals_results(tournament_ids, series_status='active'):
+def fetch_finals_results(tournament_ids):
     if not isinstance(tournament_ids, list):
         tournament_ids = [tournament_ids]
     all_combined_results = []
+    failed = False
     for tournament_id in tournament_ids:
-        filepath = os.path.join(DATA_DIR, f"finals_standings_{tournament_id}.json")
-        if not is_cache_stale(filepath) and os.path.exists(filepath):
+        filepath = finals_standings_path(tournament_id)
+        if not is_cache_stale(filepath):
             print(f"Using cached finals standings for Tournament ID: {tournament_id}...")
-            with open(filepath, 'r') as f:
-                all_combined_results.extend(json.load(f))
+            request_log.log_cache_hit(f"{BASE_URL}/tournaments/{tournament_id}/standings")
+            all_combined_results.extend(read_json(filepath))
             continue
         
         print(f"Fetching finals standings for Tournament ID: {tournament_id}...")
         url = f"{BASE_URL}/tournaments/{tournament_id}/standings"
         try:
-            response = requests.get(url, headers=HEADERS)
-            response.raise_for_status()
-            current_results = response.json()
-            with open(filepath, 'w') as f:
-                json.dump(current_results, f, indent=4)
+            current_results = HTTP.get(url).json()
+            write_cache_file(filepath, current_results, finals_cache_status(tournament_id, current_results))
             all_combined_results.extend(current_results)
         except requests.exceptions.RequestException as e:
             print(f"Error fetching finals standings for tournament {tournament_id}: {e}")
-    
+            record_failed_fetch(fetch_finals_results, (tournament_id,), e)
+            failed = True
+
+    # A failed fetch returns None, which is not memoized, so the retry queue can run it again
+    if failed:
+        return None
+
     if all_combined_results:
         all_combined_results.sort(key=lambda x: x['position'])
     return all_combined_results
 
 @memoize_by_first_arg
 def fetch_tournament_games(tournament_id, series_status='active'):
-    filepath = os.path.join(DATA_DIR, f"tournament_games_{tournament_id}.json")
-    if not is_cache_stale(filepath) and os.path.exists(filepath):
+    """
+    Returns the games of one tournament with their arena details embedded. series_status is
+    None for a finals tournament, whose games are cached with its own status (see
+    finals_cache_status).
+    """
+    filepath = tournament_games_path(tournament_id)
+    if not is_cache_stale(filepath, series_status):
         print(f"Using cached game data for Tournament ID: {tournament_id}...")
-        with open(filepath, 'r') as f:
-            return json.load(f)
+        request_log.log_cache_hit(f"{BASE_URL}/tournaments/{tournament_id}/games")
+        return read_json(filepath)
 
     print(f"Fetching game data for Tournament ID: {tournament_id}...")
     url = f"{BASE_URL}/tournaments/{tournament_id}/games"
     try:
-        response = requests.get(url, headers=HEADERS)
-        response.raise_for_status()
-        games_data = response.json()
-        
-        # After fetching, also fetch tournament details to embed arena names
-        tournament_details = fetch_tournament_details(tournament_id, series_status)
-        if tournament_details and 'data' in tournament_details and 'arenas' in tournament_details['data']:
-            arena_map = {arena['arenaId']: arena for arena in tournament_details['data']['arenas']}
-            if 'data' in games_data:
-                for game in games_data['data']:
-                    if game.get('arenaId') and game['arenaId'] in arena_map:
-                        game['arena'] = arena_map[game['arenaId']]
-        
-        with open(filepath, 'w') as f:
-            json.dump(games_data, f, indent=4)
-        print(f"Saved game data for tournament {tournament_id}")
-        return games_data
+        games_data = HTTP.get(url).json()
     except requests.exceptions.RequestException as e:
         print(f"Error fetching game data for tournament {tournament_id}: {e}")
+        record_failed_fetch(fetch_tournament_games, (tournament_id, series_status), e)
         return None
 
+    # After fetching, also fetch tournament details to embed arena names
+    tournament_details = fetch_tournament_details(tournament_id, series_status or 'active')
+    if tournament_details is None:
+        record_failed_fetch(fetch_tournament_games, (tournament_id, series_status), "tournament details unavailable")
+        return None
+    if 'data' in tournament_details and 'arenas' in tournament_details['data']:
+        arena_map = {arena['arenaId']: arena for arena in tournament_details['data']['arenas']}
+        if 'data' in games_data:
+            for game in games_data['data']:
+                if game.get('arenaId') and game['arenaId'] in arena_map:
+                    game['arena'] = arena_map[game['arenaId']]
+
+    write_cache_file(filepath, games_data, _games_cache_status(tournament_id, series_status, games_data.get('data')))
+    print(f"Saved game data for tournament {tournament_id}")
+    return games_data
+
 @memoize_by_first_arg
 def fetch_tournament_details(tournament_id, series_status='active'):
-    filepath = os.path.join(DATA_DIR, f"tournament_details_{tournament_id}.json")
-    if not is_cache_stale(filepath) and os.path.exists(filepath):
+    filepath = tournament_details_path(tournament_id)
+    if not is_cache_stale(filepath, series_status):
         print(f"Using cached tournament details for Tournament ID: {tournament_id}...")
-        with open(filepath, 'r') as f:
-            return json.load(f)
+        request_log.log_cache_hit(f"{BASE_URL}/tournaments/{tournament_id}", {'includeArenas': 'true'})
+        return read_json(filepath)
 
     print(f"Fetching full tournament details for Tournament ID: {tournament_id}...")
     url = f"{BASE_URL}/tournaments/{tournament_id}"
     params = {'includeArenas': 'true'}
     try:
-        response = requests.get(url, headers=HEADERS, params=params)
-        response.raise_for_status()
-        tournament_details = response.json()
-        with open(filepath, 'w') as f:
-            json.dump(tournament_details, f, indent=4)
+        tournament_details = HTTP.get(url, params=params).json()
+        write_cache_file(filepath, tournament_details, series_status)
         print(f"Saved full tournament details for tournament {tournament_id}")
         return tournament_details
     except requests.exceptions.RequestException as e:
         print(f"Error fetching full tournament details for tournament {tournament_id}: {e}")
         return None
 
-def fetch_data(excluded_series_names, finals_mapping, parse_series_name_func):
+def fetch_games_batch(tournament_ids):
+    """
+    Fetches the games of up to GAMES_BATCH_SIZE tournaments with a single /games request
+    and returns them grouped by tournament ID, or None if the request fails or its rows lack
+    the result fields of the per-tournament games endpoint.
+    """
+    print(f"Fetching game data for Tournament IDs: {', '.join(str(tid) for tid in tournament_ids)}...")
+    url = f"{BASE_URL}/games"
+    params = {'tournaments': ','.join(str(tid) for tid in tournament_ids)}
+    try:
+        games = get_all_pages(url, params)
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching batched game data for tournaments {tournament_ids}: {e}")
+        return None
+    if any(field not in game for game in games for field in BATCH_REQUIRED_GAME_FIELDS):
+        print(f"Batched game data for tournaments {tournament_ids} lacks game results; fetching them per tournament.")
+        return None
+
+    games_by_tournament = {tid: [] for tid in tournament_ids}
+    for game in games:
+        if game.get('tournamentId') in games_by_tournament:
+            games_by_tournament[game['tournamentId']].append(game)
+    return games_by_tournament
+
+def resolve_arenas(games_by_tournament, tournament_statuses):
+    """
+    Embeds arena details into each game. Tournament details are only fetched for tournaments
+    that reference an arena not already seen, so a venue's arenas are resolved once overall
+    rather than once per weekly tournament. Returns the IDs of the tournaments whose details
+    could not be fetched.
+    """
+    unresolved = set()
+    arena_map = {}
+    for games in games_by_tournament.values():
+        for game in games:
+            if game.get('arena') and game.get('arenaId'):
+                arena_map[game['arenaId']] = game['arena']
+
+    for tournament_id, games in games_by_tournament.items():
+        if any(game.get('arenaId') and game['arenaId'] not in arena_map for game in games):
+            tournament_details = fetch_tournament_details(tournament_id, tournament_statuses.get(tournament_id) or 'active')
+            if tournament_details is None:
+                unresolved.add(tournament_id)
+            elif 'data' in tournament_details and 'arenas' in tournament_details['data']:
+                for arena in tournament_details['data']['arenas']:
+                    arena_map.setdefault(arena['arenaId'], arena)
+
+        for game in games:
+            if game.get('arenaId') and game['arenaId'] in arena_map:
+                game['arena'] = arena_map[game['arenaId']]
+    return unresolved
+
+def fetch_tournament_games_batched(games_tasks, max_workers=FETCH_CONCURRENCY):
+    """
+    Refreshes the tournament_games_{id}.json cache for every stale (tournament_id, series_status)
+    task using batched /games requests, then splits the results back into per-tournament files.
+    Batches that fail fall back to the per-tournament endpoint; tournaments whose arenas cannot
+    be resolved are not written and go to the retry queue. Finals tasks have a series_status
+    of None and are cached with the finals tournament's own status.
+    """
+    tournament_statuses = {}
+    for tournament_id, series_status in games_tasks:
+        tournament_statuses.setdefault(tournament_id, series_status)
+
+    stale_ids = []
+    for tid, series_status in tournament_statuses.items():
+        if is_cache_stale(tournament_games_path(tid), series_status):
+            stale_ids.append(tid)
+        else:
+            request_log.log_cache_hit(f"{BASE_URL}/tournaments/{tid}/games")
+    chunks = [stale_ids[i:i + GAMES_BATCH_SIZE] for i in range(0, len(stale_ids), GAMES_BATCH_SIZE)]
+    batch_results = run_concurrently(fetch_games_batch, [(chunk,) for chunk in chunks], max_workers)
+
+    games_by_tournament = {}
+    for chunk, result in zip(chunks, batch_results):
+        if result is None:
+            run_concurrently(fetch_tournament_games, [(tid, tournament_statuses[tid]) for tid in chunk], max_workers)
+            continue
+        games_by_tournament.update(result)
+
+    unresolved = resolve_arenas(games_by_tournament, tournament_statuses)
+
+    for tournament_id, games in games_by_tournament.items():
+        if tournament_id in unresolved:
+            record_failed_fetch(fetch_tournament_games, (tournament_id, tournament_statuses[tournament_id]),
+                                "tournament details unavailable")
+            continue
+        filepath = tournament_games_path(tournament_id)
+        write_cache_file(filepath, {'data': games}, _games_cache_status(tournament_id, tournament_statuses[tournament_id], games))
+        print(f"Saved game data for tournament {tournament_id}")
+
+def fetch_series_details(series_id, series_status):
+    """
+    Returns the detailed data for a series, using the local cache when it is still fresh. If the
+    request fails the fetch is queued for retrying and the cached copy (if any) is returned.
+    """
+    series_filepath = series_path(series_id)
+
+    url = f"{BASE_URL}/series/{series_id}"
+    params = {'includeDetails': 'true'}
+
+    if not is_cache_stale(series_filepath, series_status):
+        request_log.log_cache_hit(url, params)
+        return read_json(series_filepath)
+
+    print(f"Fetching details for Series ID: {series_id}...")
+    try:
+        series_data_raw = HTTP.get(url, params=params).json()
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching details for series {series_id}: {e}")
+        record_failed_fetch(fetch_series_details, (series_id, series_status), e)
+        return read_json(series_filepath)
+    write_cache_file(series_filepath, series_data_raw, series_status)
+    return series_data_raw
+
+def fetch_data(excluded_series_names, finals_mapping, parse_series_name_func, max_workers=FETCH_CONCURRENCY):
+    """
+    Fetches every series owned by USER_ID along with its weekly tournament games and finals results.
+    Requests run on a pool of max_workers threads sharing one rate-limited keep-alive session; each
+    cache file is written by exactly one request, so the on-disk result does not depend on completion
+    order. Failed fetches are queued and run again after each phase; those still failing at the
+    end are written to FETCH_FAILURES_PATH.
+    """
     print("Fetching data from Matchplay API...")
     os.makedirs(DATA_DIR, exist_ok=True)
     
-    series_list = get_series_by_owner(USER_ID)
-    
-    for series in series_list:
-        if series['name'] in excluded_series_names:
-            continue
+    with profiling.stage("fetch.series_list"):
+        series_list = [s for s in get_series_by_owner(USER_ID) if s['name'] not in excluded_series_names]
 
-        series_id = series['seriesId']
-        series_filepath = os.path.join(DATA_DIR, f"series_{series_id}.json")
-
-        if not is_cache_stale(series_filepath) and os.path.exists(series_filepath):
-            with open(series_filepath, 'r') as f:
-                series_data_raw = json.load(f)
-        else:
-            print(f"Fetching details for Series ID: {series_id}...")
-            url = f"{BASE_URL}/series/{series_id}"
-            params = {'includeDetails': 'true'}
-            response = requests.get(url, headers=HEADERS, params=params)
-            response.raise_for_status()
-            series_data_raw = response.json()
-            with open(series_filepath, 'w') as f:
-                json.dump(series_data_raw, f, indent=4)
+    with profiling.stage("fetch.series_details"):
+        series_tasks = [(series['seriesId'], series['status']) for series in series_list]
+        all_series_data_raw = run_concurrently(fetch_series_details, series_tasks, max_workers)
+        retried = retry_failed_fetches(max_workers)
+        all_series_data_raw = [
+            retried.get((fetch_series_details, task), series_data_raw)
+            for task, series_data_raw in zip(series_tasks, all_series_data_raw)
+        ]
 
+    games_tasks = []
+    finals_tasks = []
+    for series, series_data_raw in zip(series_list, all_series_data_raw):
         # Process main season tournaments
-        if 'data' in series_data_raw and 'tournamentIds' in series_data_raw['data']:
+        if series_data_raw and 'data' in series_data_raw and 'tournamentIds' in series_data_raw['data']:
             for tournament_id in series_data_raw['data']['tournamentIds']:
-                fetch_tournament_games(tournament_id, series_status=series['status'])
+                games_tasks.append((tournament_id, series['status']))
 
         # Process finals tournaments
         year, season_name_parsed, league_name_parsed = parse_series_name_func(series['name'])
-        if league_name_parsed in finals_mapping and year != "N/A" and season_name_parsed != "N/A":
-            key = f"{season_name_parsed} {year}"
-            finals_tournament_ids = finals_mapping[league_name_parsed].get(key)
-            if finals_tournament_ids:
-                fetch_finals_results(finals_tournament_ids, series_status=series['status'])
-                t_ids = finals_tournament_ids if isinstance(finals_tournament_ids, list) else [finals_tournament_ids]
-                for tid in t_ids:
-                    fetch_tournament_games(tid, series_status=series['status'])
+        finals_tournament_ids = get_finals_tournament_ids(league_name_parsed, season_name_parsed, year, finals_mapping)
+        if finals_tournament_ids:
+            finals_tasks.append((finals_tournament_ids,))
+            for tid in finals_tournament_id_list(finals_tournament_ids):
+                games_tasks.append((tid, None))
+
+    with profiling.stage("fetch.finals_standings"):
+        run_concurrently(fetch_finals_results, finals_tasks, max_workers)
+        retry_failed_fetches(max_workers)
+    with profiling.stage("fetch.tournament_games"):
+        fetch_tournament_games_batched(games_tasks, max_workers)
+        retry_failed_fetches(max_workers)
+    save_manifest()
+    save_failed_fetches()
@@ -0,0 +1,211 @@
+"""
+Times the site build on synthetic leagues of increasing size.
+
+    python -m benchmarks.run_benchmarks [--scales 1,10,100] [--output benchmark_results.json]
+
+Scale N is N times the league's real history (see synthetic_league.py). Every scale is
+generated into its own working directory and built in a fresh Python process, which times
+each stage and reports the peak RSS; the results of all scales are written as one JSON
+document so runs can be compared to catch regressions.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+from benchmarks.synthetic_league import generate_league
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_SEASONS = 58
+BASE_PLAYER_POOL = 600
+RESULT_FILE = "stages.json"
+
+class _Timer:
+    """Accumulates wall and CPU time per stage name."""
+
+    def __init__(self):
+        self.stages = {}
+
+    def measure(self, name, func, *args, **kwargs):
+        wall, cpu = time.perf_counter(), time.process_time()
+        result = func(*args, **kwargs)
+        self.add(name, time.perf_counter() - wall, time.process_time() - cpu)
+        return result
+
+    def add(self, name, wall, cpu):
+        stage = self.stages.setdefault(name, {'wall_s': 0.0, 'cpu_s': 0.0})
+        stage['wall_s'] += wall
+        stage['cpu_s'] += cpu
+
+    def wrap(self, name, func):
+        """Returns func with every call timed as the stage name."""
+        def timed(*args, **kwargs):
+            return self.measure(name, func, *args, **kwargs)
+        return timed
+
+def _timed_write_atomic(timer, write_atomic):
+    """
+    Wraps write_atomic so that the time spent producing the chunks it writes (rendering and
+    minifying a streamed page) is recorded as 'render' and the rest as 'write'.
+    """
+    def timed(path, chunks):
+        rendering = [0.0, 0.0]
+
+        def timed_chunks():
+            iterator = iter(chunks)
+            while True:
+                wall, cpu = time.perf_counter(), time.process_time()
+                chunk = next(iterator, None)
+                rendering[0] += time.perf_counter() - wall
+                rendering[1] += time.process_time() - cpu
+                if chunk is None:
+                    return
+                yield chunk
+
+        wall, cpu = time.perf_counter(), time.process_time()
+        written = write_atomic(path, timed_chunks())
+        timer.add('render', *rendering)
+        timer.add('write', time.perf_counter() - wall - rendering[0], time.process_time() - cpu - rendering[1])
+        return written
+    return timed
+
+def measure_build(work_dir):
+    """
+    Builds the site in work_dir (the current directory of a fresh process) and records stage
+    timings. Stages nest: build_league_model includes 'load' (reading the series and game
+    files) and 'process_games' (reducing each series' games to its outcome tables), and the
+    page generator stages include 'render' (rendering and minifying pages) and 'write' (the
+    atomic file writes).
+    """
+    from config import EXCLUDED_SERIES_NAMES, OUTPUT_DIR, STATIC_DIR, MINIFY_HTML
+    import data_processor
+    from data_processor import iter_series_data, build_league_model
+    from page_generators import page_writer
+    from page_generators.page_writer import PageWriter
+    from page_generators.helpers import create_environment
+    from page_generators.assets import publish_static_files
+    from page_generators.seasons import generate_seasons_page, generate_season_pages
+    from page_generators.players import generate_player_pages
+    from page_generators.charts import generate_charts_page
+    from page_generators.leaderboards import generate_leaderboards_page
+    from site_generator import peak_rss_mb
+
+    timer = _Timer()
+    total_wall, total_cpu = time.perf_counter(), time.process_time()
+
+    # The build runs in its own process, so the stage functions are wrapped in place
+    data_processor.read_series_games = timer.wrap('load', data_processor.read_series_games)
+    data_processor.process_series_games = timer.wrap('process_games', data_processor.process_series_games)
+    page_writer.write_atomic = _timed_write_atomic(timer, page_writer.write_atomic)
+
+    # Series are streamed into the league model; 'load' includes reading the series files
+    series_iter = iter_series_data(EXCLUDED_SERIES_NAMES)
+    def timed_series():
+        while True:
+            series_data_raw = timer.measure('load', next, series_iter, None)
+            if series_data_raw is None:
+                return
+            yield series_data_raw
+    league_model = timer.measure('build_league_model', build_league_model, timed_series())
+
+    shutil.rmtree(OUTPUT_DIR, ignore_errors=True)
+    static_urls = publish_static_files(STATIC_DIR, os.path.join(OUTPUT_DIR, 'static'), minify=MINIFY_HTML)
+    writer = PageWriter(
+        OUTPUT_DIR, create_environment, env_args=("benchmark", static_urls), minify=MINIFY_HTML,
+        virtual_inputs={'series_index': league_model['series_index_signature']}
+    )
+    timer.measure('generate_seasons_page', generate_seasons_page, writer, league_model)
+    timer.measure('generate_season_pages', generate_season_pages, writer, league_model)
+    chart_data = timer.measure('generate_player_pages', generate_player_pages, writer, league_model)
+    timer.measure('generate_charts_page', generate_charts_page, writer, league_model, chart_data)
+    timer.measure('generate_leaderboards_page', generate_leaderboards_page, writer, league_model)
+    timer.measure('finish', writer.finish)
+    timer.add('total', time.perf_counter() - total_wall, time.process_time() - total_cpu)
+
+    result = {
+        'stages': timer.stages,
+        'pages_rendered': writer.rendered_count,
+        'bytes_written': writer.bytes_written,
+        'peak_rss_mb': peak_rss_mb()
+    }
+    with open(os.path.join(work_dir, RESULT_FILE), 'w') as f:
+        json.dump(result, f, indent=4)
+
+def _prepare_work_dir(work_dir, scale, seed):
+    if os.path.exists(work_dir):
+        shutil.rmtree(work_dir)
+    os.makedirs(work_dir)
+    for name in ('templates', 'static'):
+        os.symlink(os.path.join(REPO_DIR, name), os.path.join(work_dir, name))
+    started = time.perf_counter()
+    size = generate_league(
+        os.path.join(work_dir, 'data'), seasons=int(BASE_SEASONS * scale),
+        player_pool=int(BASE_PLAYER_POOL * scale), seed=seed
+    )
+    size['generate_s'] = time.perf_counter() - started
+    return size
+
+def run_scale(scale, base_dir, seed=0, keep=False):
+    """Generates a league at the given scale, builds it in a subprocess and returns the measurements."""
+    work_dir = os.path.join(base_dir, f"scale_{scale:g}")
+    print(f"Scale {scale:g}x: generating synthetic league in {work_dir}...")
+    size = _prepare_work_dir(work_dir, scale, seed)
+    print(f"Scale {scale:g}x: {size['series']} series, {size['games']} games. Building...")
+
+    env = dict(os.environ, PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    subprocess.run(
+        [sys.executable, '-m', 'benchmarks.run_benchmarks', '--measure', work_dir],
+        cwd=work_dir, env=env, check=True, stdout=subprocess.DEVNULL
+    )
+    with open(os.path.join(work_dir, RESULT_FILE), 'r') as f:
+        result = json.load(f)
+    if not keep:
+        shutil.rmtree(work_dir)
+    print(f"Scale {scale:g}x: built in {result['stages']['total']['wall_s']:.2f}s")
+    return {'scale': scale, 'size': size, **result}
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the site build on synthetic leagues.")
+    parser.add_argument("--scales", default="1,10,100",
+                        help="Comma-separated multiples of the real league history to benchmark.")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results.")
+    parser.add_argument("--work-dir", default=None, help="Directory for the generated leagues (default: a temp dir).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the synthetic leagues.")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated data and output.")
+    parser.add_argument("--measure", metavar="DIR", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure_build(args.measure)
+        return
+
+    base_dir = args.work_dir or tempfile.mkdtemp(prefix="mfp_bench_")
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'runs': [run_scale(float(scale), base_dir, args.seed, args.keep) for scale in args.scales.split(',')]
+    }
+    if not (args.work_dir or args.keep):
+        os.rmdir(base_dir)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Wrote benchmark results to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import os
+import json
+import random
+
+# Synthetic league data in the exact shapes --fetch writes to the data directory
+# (series_{id}.json, tournament_games_{id}.json, finals_standings_{id}.json and
+# finals_mapping.json), so the site can be built at any scale without the API.
+#
+# The defaults approximate the real league history: 58 seasons alternating between the
+# two leagues, ~55 players a season out of a pool of ~600, 10 weekly tournaments of 5 games
+# per player in groups of four, and finals for every season.
+
+LEAGUES = ["MFPinball", "MFLadies Pinball"]
+SEASONS = ["Winter", "Spring", "Summer", "Fall"]
+# Points for 1st..4th in a four-player game and 1st..3rd in a three-player game
+POINTS_4P = [7, 5, 3, 1]
+POINTS_3P = [7, 4, 1]
+NUM_ARENAS = 60
+LATEST_YEAR = 2025
+FIRST_SERIES_ID = 100000
+FIRST_TOURNAMENT_ID = 1000000
+FINALS_SIZE = 16
+
+def _write_json(data_dir, filename, data):
+    with open(os.path.join(data_dir, filename), 'w') as f:
+        json.dump(data, f, indent=4)
+
+def _groups(players):
+    """Splits a night's players into games of four, using threes for the remainder."""
+    num_threes = (-len(players)) % 4 if len(players) >= 6 else 0
+    groups = []
+    index = 0
+    while index < len(players):
+        size = 3 if num_threes > 0 else 4
+        num_threes -= size == 3
+        groups.append(players[index:index + size])
+        index += size
+    return [group for group in groups if len(group) >= 2]
+
+def _play_game(rng, game_id, tournament_id, round_id, game_set, players, arena):
+    finish = players[:]
+    rng.shuffle(finish)
+    points_table = POINTS_4P if len(players) == 4 else POINTS_3P
+    points = {player_id: points_table[min(finish.index(player_id), len(points_table) - 1)] for player_id in players}
+    game = {
+        'gameId': game_id,
+        'roundId': round_id,
+        'tournamentId': tournament_id,
+        'arenaId': arena['arenaId'],
+        'set': game_set,
+        'status': 'completed',
+        'startedAt': f"2024-01-01T{round_id:02d}:00:00",
+        'playerIds': players,
+        'resultPositions': finish,
+        'resultPoints': [f"{points[player_id]:.2f}" for player_id in players],
+        'arena': arena
+    }
+    return game, points
+
+def generate_league(data_dir, seasons=58, players_per_season=55, weeks=10, games_per_night=5,
+                    player_pool=600, attendance=0.8, with_finals=True, seed=0):
+    """
+    Writes a synthetic league into data_dir and returns its size:
+    {'series', 'tournaments', 'games', 'players'}.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    rng = random.Random(seed)
+    arenas = [{'arenaId': 1 + i, 'name': f"Machine {i + 1:02d}", 'status': 'active'} for i in range(NUM_ARENAS)]
+    pool = [{'playerId': 1 + i, 'name': f"Player {i + 1}", 'ifpaId': 50000 + i if i % 3 else None}
+            for i in range(max(player_pool, players_per_season))]
+
+    next_tournament_id = FIRST_TOURNAMENT_ID
+    next_game_id = 1
+    finals_mapping = {league: {} for league in LEAGUES}
+    num_games = 0
+
+    for index in range(seasons):
+        series_id = FIRST_SERIES_ID + index
+        league = LEAGUES[index % len(LEAGUES)]
+        season = SEASONS[(index // len(LEAGUES)) % len(SEASONS)]
+        year = LATEST_YEAR - seasons // (len(LEAGUES) * len(SEASONS)) + index // (len(LEAGUES) * len(SEASONS))
+        players = rng.sample(pool, players_per_season)
+        player_ids = [player['playerId'] for player in players]
+
+        tournament_ids = []
+        tournament_points = {}
+        for _ in range(weeks):
+            tournament_id = next_tournament_id
+            next_tournament_id += 1
+            tournament_ids.append(tournament_id)
+
+            present = [player_id for player_id in player_ids if rng.random() < attendance]
+            night_points = dict.fromkeys(present, 0)
+            games = []
+            for round_id in range(1, games_per_night + 1):
+                rng.shuffle(present)
+                for group in _groups(present):
+                    game, points = _play_game(rng, next_game_id, tournament_id, round_id, 0, group, rng.choice(arenas))
+                    next_game_id += 1
+                    games.append(game)
+                    for player_id, player_points in points.items():
+                        night_points[player_id] += player_points
+            num_games += len(games)
+            _write_json(data_dir, f"tournament_games_{tournament_id}.json", {'data': games})
+            tournament_points[str(tournament_id)] = {
+                str(player_id): f"{points:.2f}" for player_id, points in night_points.items()
+            }
+
+        totals = {player_id: 0 for player_id in player_ids}
+        for week in tournament_points.values():
+            for player_id, points in week.items():
+                totals[int(player_id)] += int(float(points))
+        ranked = sorted(player_ids, key=lambda player_id: -totals[player_id])
+        standings = [
+            {'playerId': player_id, 'position': position + 1, 'points': totals[player_id],
+             'pointsAdjusted': totals[player_id]}
+            for position, player_id in enumerate(ranked)
+        ]
+
+        _write_json(data_dir, f"series_{series_id}.json", {'data': {
+            'seriesId': series_id,
+            'name': f"{league} {season} {year} Season",
+            'status': 'active' if index == seasons - 1 else 'completed',
+            'tournamentIds': tournament_ids,
+            'players': players,
+            'standings': standings,
+            'tournamentPoints': tournament_points
+        }})
+
+        if with_finals:
+            finals_id = next_tournament_id
+            next_tournament_id += 1
+            finalists = ranked[:FINALS_SIZE]
+            finals_mapping[league][f"{season} {year}"] = finals_id
+            games = []
+            finals_points = dict.fromkeys(finalists, 0)
+            for game_set, group in enumerate(_groups(finalists)):
+                for round_id in range(1, 4):
+                    game, points = _play_game(rng, next_game_id, finals_id, round_id, game_set, group, rng.choice(arenas))
+                    next_game_id += 1
+                    games.append(game)
+                    for player_id, player_points in points.items():
+                        finals_points[player_id] += player_points
+            num_games += len(games)
+            _write_json(data_dir, f"tournament_games_{finals_id}.json", {'data': games})
+            finals_ranked = sorted(finalists, key=lambda player_id: -finals_points[player_id])
+            _write_json(data_dir, f"finals_standings_{finals_id}.json", [
+                {'playerId': player_id, 'position': position + 1, 'points': finals_points[player_id]}
+                for position, player_id in enumerate(finals_ranked)
+            ])
+
+    _write_json(data_dir, "finals_mapping.json", finals_mapping)
+    return {
+        'series': seasons,
+        'tournaments': next_tournament_id - FIRST_TOURNAMENT_ID,
+        'games': num_games,
+        'players': len(pool)
+    }
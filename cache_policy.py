@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import atexit
+import hashlib
+import tempfile
+import threading
+
+import profiling
+from config import DATA_DIR, CACHE_EXPIRY_HOURS, CACHE_MANIFEST_FILE, DATA_STORE_BACKEND
+
+# Cache policy for the JSON files in DATA_DIR.
+#
+# Every file written by api_client is recorded in a manifest with the time it was fetched,
+# the status of its series at that time and a hash of its content. A cached file is:
+#   - permanent if it was fetched while its series was already 'completed' and the series
+#     is still 'completed' (history never changes once a season is over),
+#   - subject to CACHE_EXPIRY_HOURS otherwise (active seasons, or files fetched before the
+#     series completed, which need one final refresh),
+#   - always stale if its content no longer matches the recorded hash, or if the series
+#     status has changed since it was fetched.
+# Files without a manifest entry (e.g. caches created before the manifest existed) fall back
+# to the file modification time.
+#
+# With DATA_STORE_BACKEND = "sqlite" responses are written to sqlite_store instead, which
+# keeps the same fetch time and status per document; the content hash check does not apply
+# because documents are never edited in place.
+
+if DATA_STORE_BACKEND == "sqlite":
+    import sqlite_store
+else:
+    sqlite_store = None
+
+MANIFEST_PATH = os.path.join(DATA_DIR, CACHE_MANIFEST_FILE)
+
+_manifest = None
+_manifest_dirty = False
+_manifest_lock = threading.Lock()
+
+def _load_manifest():
+    global _manifest
+    if _manifest is None:
+        if os.path.exists(MANIFEST_PATH):
+            with open(MANIFEST_PATH, 'r') as f:
+                _manifest = json.load(f)
+        else:
+            _manifest = {}
+    return _manifest
+
+def file_sha256(filepath):
+    """Returns the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def get_manifest_entry(filepath):
+    """Returns the manifest entry recorded for a cache file, or None."""
+    with _manifest_lock:
+        return _load_manifest().get(os.path.basename(filepath))
+
+def is_cache_stale(filepath, series_status=None):
+    """
+    Decides whether a cached file must be re-fetched, given the current status of the
+    series it belongs to (None if unknown).
+    """
+    stale = _is_cache_stale(filepath, series_status)
+    profiling.count("cache_policy.stale" if stale else "cache_policy.fresh")
+    return stale
+
+def _is_cache_stale(filepath, series_status):
+    if sqlite_store is not None:
+        entry = sqlite_store.document_entry(filepath)
+        return entry is None or _is_entry_stale(entry, series_status)
+
+    if not os.path.exists(filepath):
+        return True
+
+    entry = get_manifest_entry(filepath)
+    if entry is None:
+        file_mod_time = os.path.getmtime(filepath)
+        return (time.time() - file_mod_time) > (CACHE_EXPIRY_HOURS * 3600)
+
+    if entry.get('sha256') != file_sha256(filepath):
+        return True
+    return _is_entry_stale(entry, series_status)
+
+def _is_entry_stale(entry, series_status):
+    # An entry without a status (e.g. a file imported from a cache that predates the manifest
+    # and that belongs to no cached series) is only checked for age, like a JSON cache file
+    # without a manifest entry
+    if series_status is not None and entry.get('status') is not None and entry['status'] != series_status:
+        return True
+    if entry.get('status') == 'completed':
+        return False
+    return (time.time() - entry.get('fetched_at', 0)) > (CACHE_EXPIRY_HOURS * 3600)
+
+def write_json_atomic(filepath, data):
+    """Writes JSON to a temp file and renames it into place so readers never see partial files."""
+    directory = os.path.dirname(filepath) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".json")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=4)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def write_cache_file(filepath, data, series_status):
+    """Writes a fetched API response to the cache and records it in the manifest."""
+    global _manifest_dirty
+    if sqlite_store is not None:
+        sqlite_store.write_document(filepath, data, series_status)
+        return
+    write_json_atomic(filepath, data)
+    entry = {
+        'fetched_at': time.time(),
+        'status': series_status,
+        'sha256': file_sha256(filepath)
+    }
+    with _manifest_lock:
+        _load_manifest()[os.path.basename(filepath)] = entry
+        _manifest_dirty = True
+
+def save_manifest():
+    """Persists the manifest if any cache file was written since it was last saved."""
+    global _manifest_dirty
+    with _manifest_lock:
+        if not _manifest_dirty:
+            return
+        os.makedirs(os.path.dirname(MANIFEST_PATH) or ".", exist_ok=True)
+        write_json_atomic(MANIFEST_PATH, dict(sorted(_load_manifest().items())))
+        _manifest_dirty = False
+
+atexit.register(save_manifest)
@@ -1,10 +1,28 @@
 # config.py
+import os
+from datetime import datetime
 
 # -- File/Directory Paths --
 DATA_DIR = "data"
 OUTPUT_DIR = "output"
 TEMPLATES_DIR = "templates"
 STATIC_DIR = "static"
+# Records the inputs each generated page was rendered from (used by --incremental).
+# Kept outside OUTPUT_DIR so it is not deployed with the site.
+BUILD_MANIFEST_PATH = ".build_manifest.json"
+# Per-series leaderboard aggregates saved between builds, so only series whose
+# data changed are aggregated again.
+AGGREGATE_STORE_PATH = ".leaderboard_aggregates.json"
+# Compiled templates saved between builds (and shared by render workers), so templates
+# are only compiled again when their source changes. None disables the cache.
+TEMPLATE_CACHE_DIR = ".template_cache"
+
+# -- Data Store Configuration --
+# Where fetched API data is kept: "json" (one file per response in DATA_DIR) or
+# "sqlite" (one database at SQLITE_STORE_PATH, see sqlite_store.py). Run
+# `python main.py --import-sqlite` once to copy an existing JSON cache into it.
+DATA_STORE_BACKEND = "json"
+SQLITE_STORE_PATH = os.path.join(DATA_DIR, "league.sqlite3")
 
 # -- Series Configuration --
 # Series to exclude from all processing
@@ -19,7 +37,72 @@ EXCLUDED_SERIES_NAMES = [
 # to be eligible for the "Most Improved Player" leaderboard.
 MIN_WEEKS_FOR_IMPROVEMENT = 5
 
+# Weekly points for winning every game of a league night (a "perfect night").
+PERFECT_NIGHT_POINTS = 35.0
+
+# Number of rows shown on the ranked leaderboards.
+LEADERBOARD_SIZE = 25
+
+# -- Players List Configuration --
+# Number of players per page of the players list and of its search results.
+PLAYERS_PAGE_SIZE = 50
+
+# -- Output Assets Configuration --
+# Collapse whitespace and strip comments in rendered HTML (the contents of <script>, <pre>
+# and <textarea> are kept as they are) and minify the CSS in STATIC_DIR.
+MINIFY_HTML = True
+
+# Write .gz siblings (and .br siblings, if the optional brotli package is installed) of the
+# text files in OUTPUT_DIR for hosts and CDNs that serve precompressed files.
+PRECOMPRESS_OUTPUT = True
+
+# Chart.js build loaded by the charts page.
+CHART_JS_URL = "https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js"
+
 # -- Caching Configuration --
-# How long cached API data is considered valid, in hours.
-# Data older than this will be re-fetched.
+# How long cached API data for active series is considered valid, in hours.
+# Data older than this will be re-fetched. Data fetched after a series was
+# completed is kept permanently (see cache_policy.py).
 CACHE_EXPIRY_HOURS = 24
+
+# Manifest (inside DATA_DIR) recording fetch time, series status and a content
+# hash for every cached API response.
+CACHE_MANIFEST_FILE = "cache_manifest.json"
+
+# -- Arena Stats Configuration --
+# Only games from series starting on or after this date count towards the
+# per-machine performance tables on player pages (Winter 2024 starts roughly here).
+ARENA_DATA_CUTOFF_DATE = datetime(2024, 1, 1)
+
+# -- Fetch Configuration --
+# Maximum number of concurrent API requests made by fetch_data.
+# Set to 1 to fetch everything sequentially.
+FETCH_CONCURRENCY = 8
+
+# -- HTTP Configuration --
+# (connect, read) timeout of every API request, in seconds.
+HTTP_TIMEOUT_SECONDS = (5, 30)
+
+# How often a request that failed with a connection error, a timeout, 429 or 5xx is
+# retried, and the base and maximum of its exponential backoff in seconds. A Retry-After
+# header sent by the API takes precedence over the backoff.
+HTTP_MAX_RETRIES = 4
+HTTP_BACKOFF_SECONDS = 1.0
+HTTP_MAX_BACKOFF_SECONDS = 60
+
+# Client-side rate limit shared by all fetch workers: requests per second on average,
+# with bursts of up to HTTP_RATE_LIMIT_BURST requests.
+HTTP_RATE_LIMIT_PER_SECOND = 10
+HTTP_RATE_LIMIT_BURST = 20
+
+# File (inside DATA_DIR) listing the fetches that still failed after retrying.
+FETCH_FAILURES_FILE = "fetch_failures.json"
+
+# -- Request Log Configuration --
+# File (inside DATA_DIR) every API request and cache hit of --fetch is appended to, one JSON
+# object per line (see request_log.py). Set to None to turn the log off.
+REQUEST_LOG_FILE = "requests.jsonl"
+
+# When replaying a recorded log (--replay), delay each response by its recorded latency so
+# replayed fetches can be timed. Set to False to replay as fast as possible.
+REPLAY_RECORDED_LATENCY = True
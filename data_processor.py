@@ -1,47 +1,174 @@
-import os
 import json
 import re
+import math
+from array import array
 from collections import defaultdict
+from datetime import datetime
 
-from config import DATA_DIR
-from api_client import fetch_tournament_games
-
-def load_all_series_data(excluded_series_names):
-    """Loads all series data from the JSON files in the data directory."""
-    all_series_data = []
-    if not os.path.exists(DATA_DIR):
-        return all_series_data
-        
-    for filename in os.listdir(DATA_DIR):
-        if filename.startswith("series_") and filename.endswith(".json"):
-            filepath = os.path.join(DATA_DIR, filename)
-            with open(filepath, 'r') as f:
-                series_data_raw = json.load(f)
-                
-                if series_data_raw['data']['name'] in excluded_series_names:
-                    print(f"Skipping excluded series during load: {series_data_raw['data']['name']} (ID: {series_data_raw['data']['seriesId']})")
-                    continue
-                
-                series_id = series_data_raw['data']['seriesId']
-                series_status = series_data_raw['data']['status']
-
-                series_data_raw['tournament_games_data'] = {}
-                if 'tournamentIds' in series_data_raw['data']:
-                    for tournament_id in series_data_raw['data']['tournamentIds']:
-                        games = fetch_tournament_games(tournament_id, series_status=series_status)
-                        if games and games.get('data'):
-                            series_data_raw['tournament_games_data'][tournament_id] = games['data']
-                
-                all_series_data.append(series_data_raw)
-    return all_series_data
-
-def load_finals_mapping():
-    """Loads the finals mapping from finals_mapping.json."""
-    filepath = os.path.join(DATA_DIR, 'finals_mapping.json')
-    if os.path.exists(filepath):
-        with open(filepath, 'r') as f:
-            return json.load(f)
-    return {}
+from config import ARENA_DATA_CUTOFF_DATE, PERFECT_NIGHT_POINTS
+from data_store import (tournament_games_path, finals_standings_path, series_files, read_json,
+                        read_tournament_games, read_finals_standings)
+from game_store import build_game_columns, player_outcomes, machine_outcome_counts, add_machine_outcomes, empty_game_outcomes
+from normalize import normalize_series, normalize_games
+from finals import FINALS_MAPPING_PATH, get_finals_tournament_ids, finals_tournament_id_list, get_finals_player_positions
+
+def iter_series_data(excluded_series_names):
+    """
+    Yields the series in the local data store one at a time. Nothing is fetched. Each
+    series file is read, reduced to compact records and indexes, and released before the
+    next series is read, so memory holds one season's raw JSON at a time. Tournament games
+    are not read here; build_league_model streams them one series at a time once the year
+    corrections are known.
+    """
+    for filepath in series_files():
+        series_data_raw = load_series_file(filepath, excluded_series_names)
+        if series_data_raw is not None:
+            yield series_data_raw
+
+def load_series_file(filepath, excluded_series_names):
+    """
+    Loads one series file into a Series record plus the indexes the generators use, or
+    returns None if the series is excluded or the file is not a series response. Values
+    that fail normalization are listed in the series' invalid_inputs.
+    """
+    series_json = (read_json(filepath) or {}).get('data')
+    if not isinstance(series_json, dict) or 'seriesId' not in series_json or 'name' not in series_json:
+        print(f"WARNING: Skipping {filepath}: not a series response")
+        return None
+
+    if series_json['name'] in excluded_series_names:
+        print(f"Skipping excluded series during load: {series_json['name']} (ID: {series_json['seriesId']})")
+        return None
+
+    invalid_inputs = []
+    series, weeks = normalize_series(series_json, filepath, invalid_inputs)
+    series_data_raw = {
+        'data': series,
+        # Input files this series was built from, used for incremental site builds
+        'source_files': [filepath] + [tournament_games_path(tid) for tid in series.tournamentIds],
+        'missing_inputs': [],
+        'invalid_inputs': invalid_inputs
+    }
+    return index_series_data(series_data_raw, weeks)
+
+def index_series_data(series_data_raw, weeks):
+    """
+    Attaches constant-time lookup indexes to a loaded series: standings and players by
+    playerId, week number (1-based) by tournamentId and the per-player points index. The
+    weekly points are not kept.
+    """
+    series = series_data_raw['data']
+    standings_by_player = {}
+    for standing in series.standings:
+        # Keep the first standing per player, matching a linear scan of the standings
+        standings_by_player.setdefault(standing.playerId, standing)
+    series_data_raw['standings_by_player'] = standings_by_player
+    series_data_raw['players_by_id'] = {p.playerId: p for p in series.players}
+    series_data_raw['week_by_tournament'] = {tid: i + 1 for i, tid in enumerate(series.tournamentIds)}
+    index_series_points(series_data_raw, weeks)
+    return series_data_raw
+
+def read_series_games(series_data_raw):
+    """
+    Reads the tournament games of a loaded series as Game records ({tournamentId: [Game, ...]}).
+    Tournament games that were never fetched are listed in the series' missing_inputs.
+    """
+    tournament_games = {}
+    for tournament_id in series_data_raw['data'].tournamentIds:
+        games = read_tournament_games(tournament_id, series_data_raw['missing_inputs'])
+        if games and games.get('data'):
+            tournament_games[tournament_id] = normalize_games(
+                games['data'], tournament_games_path(tournament_id), series_data_raw['invalid_inputs']
+            )
+    return tournament_games
+
+def process_series_games(series_data_raw, tournament_games, machine_totals=None):
+    """
+    Attaches a series' per-player game outcomes and almost perfect nights, and folds its
+    per-machine outcome counts into machine_totals if given. Neither the Game records nor
+    the columnar store the outcomes are computed from are kept.
+    """
+    game_columns = build_game_columns(tournament_games)
+    series_data_raw['game_data'] = process_game_data(game_columns)
+    series_data_raw['almost_perfect_nights'] = find_series_almost_perfect_nights(series_data_raw, tournament_games)
+    if machine_totals is not None:
+        add_machine_outcomes(machine_totals, machine_outcome_counts(game_columns))
+
+def index_series_points(series_data_raw, weeks):
+    """
+    Transposes a series' normalized weekly points (see normalize_series) into one entry per
+    player with the week scores and the totals the pages need, so they never rescan every
+    week for every player. Also records the winner of every tournament.
+
+    week_scores holds one slot per tournament in tournamentIds order (NaN where the player
+    did not play); scores holds every score in tournamentPoints order, including weeks that
+    are not in tournamentIds. perfect_scores lists (tournamentId, playerId) for every
+    PERFECT_NIGHT_POINTS score, in tournamentPoints order.
+    """
+    num_weeks = len(series_data_raw['data'].tournamentIds)
+
+    points_by_player = {}
+    weekly_winners = {}
+    perfect_scores = []
+    for tournament_id, week_num, player_points in weeks:
+        winner_id, winner_points = None, None
+        for player_id, points in player_points:
+            entry = points_by_player.get(player_id)
+            if entry is None:
+                entry = points_by_player[player_id] = {
+                    'week_scores': array('d', [math.nan]) * num_weeks,
+                    'scores': array('d'),
+                    'total_raw_points': 0.0
+                }
+            entry['scores'].append(points)
+            entry['total_raw_points'] += points
+            if week_num is not None:
+                entry['week_scores'][week_num - 1] = points
+            if points == PERFECT_NIGHT_POINTS:
+                perfect_scores.append((tournament_id, player_id))
+            # First highest score wins ties, like max() over the tournament's players
+            if winner_points is None or points > winner_points:
+                winner_id, winner_points = player_id, points
+        weekly_winners[tournament_id] = winner_id
+
+    weekly_wins = defaultdict(int)
+    for winner_id in weekly_winners.values():
+        weekly_wins[winner_id] += 1
+
+    for player_id, entry in points_by_player.items():
+        weeks_played = len(entry['scores'])
+        top_6_scores = sorted(entry['scores'], reverse=True)[:6]
+        top_6_scores.extend([None] * (6 - len(top_6_scores)))
+        entry['weeks_played'] = weeks_played
+        entry['average_points_per_week'] = entry['total_raw_points'] / weeks_played
+        entry['top_6_scores'] = top_6_scores
+        entry['weekly_wins'] = weekly_wins[player_id]
+
+    series_data_raw['points_by_player'] = points_by_player
+    series_data_raw['weekly_winners'] = weekly_winners
+    series_data_raw['perfect_scores'] = perfect_scores
+    return series_data_raw
+
+def get_player_points(series_data_raw, player_id):
+    """Returns a player's entry from the points_by_player index, or an empty one if they scored no points."""
+    entry = series_data_raw['points_by_player'].get(player_id)
+    if entry is None:
+        num_weeks = len(series_data_raw['week_by_tournament'])
+        entry = {
+            'week_scores': array('d', [math.nan]) * num_weeks,
+            'scores': array('d'),
+            'total_raw_points': 0.0,
+            'weeks_played': 0,
+            'average_points_per_week': 0,
+            'top_6_scores': [None] * 6,
+            'weekly_wins': 0
+        }
+    return entry
+
+def get_player_name(series_data_raw, player_id, default='Unknown Player'):
+    """Returns a player's name within a series using the players_by_id index."""
+    player = series_data_raw['players_by_id'].get(player_id)
+    return player.name if player else default
 
 def parse_series_name(series_name):
     """Parses a series name into Year, Season, and League components."""
@@ -102,108 +229,271 @@ def apply_year_corrections_to_seasons_list(seasons_list):
     seasons_list.sort(key=lambda x: x['seriesId'], reverse=True)
     return seasons_list
 
-def process_game_data(series_data):
+def process_game_data(game_columns):
     """
-    Processes raw game data for a series to extract detailed player performance.
+    Builds the per-player game outcome table of a series from its columnar game store.
     """
-    by_machine = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
-    by_player = defaultdict(lambda: defaultdict(int))
+    return {'by_player': player_outcomes(game_columns)}
 
-    for tournament_id, games_list in series_data.get('tournament_games_data', {}).items():
+def find_series_almost_perfect_nights(series_data_raw, tournament_games):
+    """
+    Identifies instances where a player won the first 4 games of a league night and then did not win the last one.
+    """
+    almost_perfect_nights = []
+
+    series = series_data_raw['data']
+    series_id = series.seriesId
+    series_name = series.name
+
+    year, season_name, league_name = parse_series_name(series_name)
+    league_type = 'Combined'
+    if league_name == "MFPinball":
+        league_type = 'MFP'
+    elif league_name == "MFLadies Pinball":
+        league_type = 'MFLP'
+
+    tournament_id_to_week_num = series_data_raw['week_by_tournament']
+
+    for tournament_id, games_list in tournament_games.items():
+        # Group games by player
+        player_games = defaultdict(list)
         for game in games_list:
-            arena_name = game.get('arena', {}).get('name', 'Unknown Arena')
-            num_players = len(game['playerIds'])
-
-            for player_id in game['playerIds']:
-                try:
-                    position = game['resultPositions'].index(player_id) + 1
-                except (ValueError, TypeError):
-                    continue 
-
-                by_player[player_id]['total_games'] += 1
-                
-                if position == 1:
-                    by_player[player_id]['1st'] += 1
-                elif position == 2:
-                    if num_players == 4:
-                        by_player[player_id]['2nd_4p'] += 1
-                    elif num_players == 3:
-                        by_player[player_id]['2nd_3p'] += 1
-                elif position == 3:
-                    if num_players == 4:
-                        by_player[player_id]['3rd_4p'] += 1
-                    elif num_players == 3:
-                        by_player[player_id]['4th_combined'] += 1
-                elif position == 4:
-                    if num_players == 4:
-                        by_player[player_id]['4th_combined'] += 1
-
-                by_machine[player_id][arena_name]['total_plays'] += 1
-                if position == 1:
-                    by_machine[player_id][arena_name]['1st_place'] += 1
-                elif position == 2:
-                    by_machine[player_id][arena_name]['2nd_place'] += 1
-                elif position == 3:
-                    by_machine[player_id][arena_name]['3rd_place'] += 1
-
-    return {'by_machine': by_machine, 'by_player': by_player}
+            for pid in game.playerIds:
+                player_games[pid].append(game)
+
+        for player_id, p_games in player_games.items():
+            if len(p_games) == 5:
+                # Sort by roundId, then startedAt, then gameId
+                p_games.sort(key=lambda x: (x.roundId, x.startedAt, x.gameId or 0))
+
+                won_first_4 = True
+                for i in range(4):
+                    game = p_games[i]
+                    if not (game.resultPositions and game.resultPositions[0] == player_id):
+                        won_first_4 = False
+                        break
+
+                if won_first_4:
+                    # Check if lost 5th
+                    last_game = p_games[4]
+                    if last_game.resultPositions and last_game.resultPositions[0] != player_id:
+                        almost_perfect_nights.append({
+                            'playerId': player_id,
+                            'name': get_player_name(series_data_raw, player_id),
+                            'seriesId': series_id,
+                            'seriesName': series_name,
+                            'tournamentId': tournament_id,
+                            'week_num': tournament_id_to_week_num.get(tournament_id, 'N/A'),
+                            'wins': 4,
+                            'total_games': 5,
+                            'league_type': league_type
+                        })
+
+    return almost_perfect_nights
 
 def find_almost_perfect_nights(all_series_data):
+    """Collects the almost perfect nights found in every series when it was loaded."""
+    almost_perfect_nights = []
+    for series_data_raw in all_series_data:
+        almost_perfect_nights.extend(series_data_raw['almost_perfect_nights'])
+    return almost_perfect_nights
+
+def build_season_entries(all_series_data):
+    """Parses every series name once and returns the year-corrected season entries."""
+    season_entries = []
+    for series_data_raw in all_series_data:
+        series = series_data_raw['data']
+        year, season_name_parsed, league_name_parsed = parse_series_name(series.name)
+        season_entries.append({
+            'seriesId': series.seriesId,
+            'seriesName': series.name,
+            'year': year,
+            'season_name': season_name_parsed,
+            'league_name': league_name_parsed,
+            'status': series.status,
+            'original_series_data': series_data_raw
+        })
+    return apply_year_corrections_to_seasons_list(season_entries)
+
+def include_in_arena_stats(series_data, year):
+    """Determines whether a series falls on or after the arena data cutoff date."""
+    # Prefer the series start date; fall back to the corrected year if it is missing or unparsable.
+    if series_data.startDate:
+        try:
+            start_date = datetime.strptime(series_data.startDate.split('T')[0], "%Y-%m-%d")
+            if start_date >= ARENA_DATA_CUTOFF_DATE:
+                return True
+        except ValueError:
+            pass
+
+    if year != "N/A":
+        try:
+            if int(year) >= 2024:
+                return True
+        except ValueError:
+            pass
+    return False
+
+def build_player_seasons(all_series_data, seasons_by_id, all_players_game_performance):
     """
-    Identifies instances where a player won the first 4 games of a league night and then did not win the last one.
+    Builds the per-player, per-season summaries used by the player pages, the charts
+    and the leaderboards. all_players_game_performance holds the all-time outcomes by
+    machine folded while the games were streamed. Returns (player_categorized_seasons,
+    players_list).
     """
-    almost_perfect_nights = []
+    unique_players = {}
+    player_categorized_seasons = {}
 
+    for series_data_raw in all_series_data:
+        series_data = series_data_raw['data']
+        series_id = series_data.seriesId
+
+        season = seasons_by_id[series_id]
+        year = season['year']
+        season_name_parsed = season['season_name']
+        league_name_parsed = season['league_name']
+        game_data = season['game_data']
+
+        finals_player_positions = season['finals_player_positions']
+
+        for player_info in series_data.players:
+            player_id = player_info.playerId
+            if player_id not in unique_players:
+                unique_players[player_id] = player_info
+                player_categorized_seasons[player_id] = {
+                    'player_info': player_info,
+                    'mfp_seasons': [],
+                    'mflp_seasons': [],
+                    'series_ids': []
+                }
+            player_categorized_seasons[player_id]['series_ids'].append(series_id)
+
+            player_standing = series_data_raw['standings_by_player'].get(player_id)
+
+            qualifying_position = player_standing.position if player_standing else 'N/A'
+            final_position = qualifying_position
+            played_in_finals = player_id in finals_player_positions
+
+            if played_in_finals:
+                final_position = finals_player_positions[player_id]
+
+            player_points = get_player_points(series_data_raw, player_id)
+            player_game_stats = game_data['by_player'].get(player_id, empty_game_outcomes())
+            top_6_scores = player_points['top_6_scores']
+
+            season_entry = {
+                'seriesId': series_id,
+                'seriesName': series_data.name,
+                'year': year,
+                'season_name': season_name_parsed,
+                'league_name': league_name_parsed,
+                'summary_stats': {
+                    'final_position': final_position,
+                    'qualifying_position': qualifying_position,
+                    'played_in_finals': played_in_finals,
+                    'total_raw_points': round(player_points['total_raw_points'], 2),
+                    'total_adjusted_points': player_standing.pointsAdjusted if player_standing else 0,
+                    'weeks_played': player_points['weeks_played'],
+                    'weekly_wins': player_points['weekly_wins'],
+                    'average_points_per_week': round(player_points['average_points_per_week'], 2),
+                    'best_week_score': top_6_scores[0] if top_6_scores[0] is not None else 0.0,
+                    'top_6_scores': list(top_6_scores),
+                    'game_outcomes': player_game_stats
+                }
+            }
+
+            if "MFPinball" in league_name_parsed or "MFP" in league_name_parsed:
+                player_categorized_seasons[player_id]['mfp_seasons'].append(season_entry)
+            elif "Monterey Flipper Ladies Pinball" in league_name_parsed or "MFLadies" in league_name_parsed:
+                player_categorized_seasons[player_id]['mflp_seasons'].append(season_entry)
+
+    for player_id, data in player_categorized_seasons.items():
+        data['mfp_seasons'].sort(key=lambda x: x['seriesId'], reverse=True)
+        data['mflp_seasons'].sort(key=lambda x: x['seriesId'], reverse=True)
+        data['game_performance'] = all_players_game_performance.get(player_id, {})
+
+    return player_categorized_seasons, list(unique_players.values())
+
+def build_league_model(series_data_iter):
+    """
+    Builds the shared league model once per run from the series yielded by
+    iter_series_data. Every series is parsed, year-corrected, scored and matched with its
+    finals results here so the page generators only read precomputed data instead of
+    re-processing the series themselves. Input files that are not in the local data store
+    are collected in missing_inputs, and values that failed normalization in invalid_inputs.
+
+    Series arrive already reduced to their indexes (see index_series_data). Their
+    tournament games are then streamed one series at a time in load order (see
+    read_series_games and process_series_games): each series'
+    game columns are reduced to its outcome tables, eligible series fold their machine
+    outcome counts into the running all-time totals, and the columns are dropped before
+    the next series' games are read. Games are read only after the year corrections,
+    which depend on every series name, so arena eligibility is known while streaming.
+    """
+    all_series_data = list(series_data_iter)
+    seasons = build_season_entries(all_series_data)
+    seasons_by_id = {}
+
+    # All-time performance by machine, over every series recent enough to have arena data
+    all_players_game_performance = {}
+    corrected_years = {season['seriesId']: season['year'] for season in seasons}
     for series_data_raw in all_series_data:
         series = series_data_raw['data']
-        series_id = series['seriesId']
-        series_name = series['name']
-        
-        year, season_name, league_name = parse_series_name(series_name)
-        league_type = 'Combined'
-        if league_name == "MFPinball":
-            league_type = 'MFP'
-        elif league_name == "MFLadies Pinball":
-            league_type = 'MFLP'
-        
-        tournament_id_to_week_num = {tid: i + 1 for i, tid in enumerate(series.get('tournamentIds', []))}
-        player_name_map = {p['playerId']: p['name'] for p in series.get('players', [])}
-
-        for tournament_id_str, games_list in series_data_raw.get('tournament_games_data', {}).items():
-            tournament_id = int(tournament_id_str)
-            
-            # Group games by player
-            player_games = defaultdict(list)
-            for game in games_list:
-                if 'playerIds' in game:
-                    for pid in game['playerIds']:
-                        player_games[pid].append(game)
-            
-            for player_id, p_games in player_games.items():
-                if len(p_games) == 5:
-                    # Sort by roundId, then startedAt, then gameId
-                    p_games.sort(key=lambda x: (x.get('roundId', 0), x.get('startedAt', ''), x.get('gameId', 0)))
-                    
-                    won_first_4 = True
-                    for i in range(4):
-                        game = p_games[i]
-                        if not ('resultPositions' in game and game['resultPositions'] and game['resultPositions'][0] == player_id):
-                            won_first_4 = False
-                            break
-                    
-                    if won_first_4:
-                        # Check if lost 5th
-                        last_game = p_games[4]
-                        if 'resultPositions' in last_game and last_game['resultPositions'] and last_game['resultPositions'][0] != player_id:
-                            almost_perfect_nights.append({
-                                'playerId': player_id,
-                                'name': player_name_map.get(player_id, 'Unknown Player'),
-                                'seriesId': series_id,
-                                'seriesName': series_name,
-                                'tournamentId': tournament_id,
-                                'week_num': tournament_id_to_week_num.get(tournament_id, 'N/A'),
-                                'wins': 4,
-                                'total_games': 5,
-                                'league_type': league_type
-                            })
-    return almost_perfect_nights
+        in_arena_stats = include_in_arena_stats(series, corrected_years[series.seriesId])
+        process_series_games(
+            series_data_raw, read_series_games(series_data_raw),
+            all_players_game_performance if in_arena_stats else None
+        )
+
+    for season_entry in seasons:
+        finals_tournament_ids = get_finals_tournament_ids(
+            season_entry['league_name'], season_entry['season_name'], season_entry['year']
+        )
+
+        finals_standings = []
+        finals_games = []
+        source_files = season_entry['original_series_data'].get('source_files', []) + [FINALS_MAPPING_PATH]
+        missing_inputs = list(season_entry['original_series_data'].get('missing_inputs', []))
+        invalid_inputs = list(season_entry['original_series_data'].get('invalid_inputs', []))
+        if finals_tournament_ids:
+            finals_standings = read_finals_standings(finals_tournament_ids, missing_inputs)
+            for tid in finals_tournament_id_list(finals_tournament_ids):
+                games = read_tournament_games(tid, missing_inputs)
+                finals_games.append(
+                    normalize_games(games['data'], tournament_games_path(tid), invalid_inputs)
+                    if games and games.get('data') else []
+                )
+                source_files.append(finals_standings_path(tid))
+                source_files.append(tournament_games_path(tid))
+
+        season_entry['finals_tournament_ids'] = finals_tournament_ids
+        season_entry['has_finals'] = "Yes" if finals_tournament_ids else "No"
+        season_entry['finals_standings'] = finals_standings
+        season_entry['finals_player_positions'] = get_finals_player_positions(finals_standings)
+        season_entry['finals_games'] = finals_games
+        season_entry['game_data'] = season_entry['original_series_data']['game_data']
+        season_entry['source_files'] = source_files
+        season_entry['missing_inputs'] = missing_inputs
+        season_entry['invalid_inputs'] = invalid_inputs
+        seasons_by_id[season_entry['seriesId']] = season_entry
+
+    player_categorized_seasons, players_list = build_player_seasons(
+        all_series_data, seasons_by_id, all_players_game_performance
+    )
+
+    # Year corrections and finals lookups for one season depend on which other seasons
+    # exist, so pages built from a season also depend on this index of all series.
+    series_index = sorted((season['seriesId'], season['seriesName']) for season in seasons)
+
+    return {
+        'all_series_data': all_series_data,
+        'seasons': seasons,
+        'seasons_by_id': seasons_by_id,
+        'player_categorized_seasons': player_categorized_seasons,
+        'players_list': players_list,
+        'almost_perfect_nights': find_almost_perfect_nights(all_series_data),
+        'series_index_signature': json.dumps(series_index),
+        'source_files': sorted({path for season in seasons for path in season['source_files']}),
+        'missing_inputs': sorted({path for season in seasons for path in season['missing_inputs']}),
+        'invalid_inputs': list(dict.fromkeys(problem for season in seasons for problem in season['invalid_inputs']))
+    }
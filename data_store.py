@@ -0,0 +1,90 @@
+import os
+import json
+import hashlib
+
+from config import DATA_DIR, DATA_STORE_BACKEND
+from finals import finals_tournament_id_list
+
+# Read-only access to the local data store written by --fetch: the JSON files in DATA_DIR,
+# or with DATA_STORE_BACKEND = "sqlite" the documents of sqlite_store, which are addressed
+# by the same file paths. Site generation reads its inputs only through these functions and
+# never goes to the network; inputs that do not exist are collected in a missing_inputs
+# list so they can be reported together before any page is rendered.
+
+if DATA_STORE_BACKEND == "sqlite":
+    import sqlite_store
+else:
+    sqlite_store = None
+
+def series_path(series_id):
+    return os.path.join(DATA_DIR, f"series_{series_id}.json")
+
+def tournament_games_path(tournament_id):
+    return os.path.join(DATA_DIR, f"tournament_games_{tournament_id}.json")
+
+def tournament_details_path(tournament_id):
+    return os.path.join(DATA_DIR, f"tournament_details_{tournament_id}.json")
+
+def finals_standings_path(tournament_id):
+    return os.path.join(DATA_DIR, f"finals_standings_{tournament_id}.json")
+
+def _in_sqlite_store(filepath):
+    return sqlite_store is not None and sqlite_store.parse_document_name(filepath) is not None
+
+def series_files():
+    """Returns the paths of every series in the data store."""
+    if sqlite_store is not None:
+        return sqlite_store.document_paths('series')
+    if not os.path.exists(DATA_DIR):
+        return []
+    return [
+        os.path.join(DATA_DIR, filename) for filename in os.listdir(DATA_DIR)
+        if filename.startswith("series_") and filename.endswith(".json")
+    ]
+
+def read_json(filepath, missing_inputs=None):
+    """Reads a JSON file from the data store. Returns None (and records the path in missing_inputs) if it does not exist."""
+    if _in_sqlite_store(filepath):
+        data = sqlite_store.read_document(filepath)
+    elif os.path.exists(filepath):
+        with open(filepath, 'r') as f:
+            data = json.load(f)
+    else:
+        data = None
+    if data is None and missing_inputs is not None:
+        missing_inputs.append(filepath)
+    return data
+
+def input_signature(filepath):
+    """Returns the content hash of a data store input, or 'missing' if it does not exist."""
+    if _in_sqlite_store(filepath):
+        entry = sqlite_store.document_entry(filepath)
+        return entry['sha1'] if entry else 'missing'
+    if not os.path.exists(filepath):
+        return 'missing'
+    with open(filepath, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def read_tournament_games(tournament_id, missing_inputs=None):
+    """Returns the cached games response of a tournament, or None if it was never fetched."""
+    return read_json(tournament_games_path(tournament_id), missing_inputs)
+
+def read_finals_standings(finals_tournament_ids, missing_inputs=None):
+    """Returns the combined standings of a season's finals tournament(s), sorted by position."""
+    all_combined_results = []
+    for tournament_id in finals_tournament_id_list(finals_tournament_ids):
+        results = read_json(finals_standings_path(tournament_id), missing_inputs)
+        if results:
+            all_combined_results.extend(results)
+    all_combined_results.sort(key=lambda x: x['position'])
+    return all_combined_results
+
+def summarize_missing_inputs(missing_inputs, limit=10):
+    """Prints one summary of the input files generation had to do without."""
+    if not missing_inputs:
+        return
+    print(f"WARNING: {len(missing_inputs)} input file(s) are missing from the local data store; the pages that use them are rendered without that data. Run with --fetch to download them.")
+    for filepath in missing_inputs[:limit]:
+        print(f"  missing: {filepath}")
+    if len(missing_inputs) > limit:
+        print(f"  ... and {len(missing_inputs) - limit} more")
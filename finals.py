@@ -0,0 +1,48 @@
+import os
+import json
+
+from config import DATA_DIR
+
+# Resolution of a season's finals: which tournament(s) were its finals, according to
+# finals_mapping.json, and where each player finished in them.
+
+FINALS_MAPPING_PATH = os.path.join(DATA_DIR, 'finals_mapping.json')
+
+_finals_mapping = None
+
+def load_finals_mapping(path=FINALS_MAPPING_PATH):
+    """
+    Loads the finals mapping from finals_mapping.json, reading the file only once per run.
+    A mapping at another path (e.g. in a JSON cache being imported) is read on every call.
+    """
+    global _finals_mapping
+    if path != FINALS_MAPPING_PATH:
+        return _read_finals_mapping(path)
+    if _finals_mapping is None:
+        _finals_mapping = _read_finals_mapping(path)
+    return _finals_mapping
+
+def _read_finals_mapping(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def get_finals_tournament_ids(league_name, season_name, year, finals_mapping=None):
+    """Looks up the finals tournament ID(s) for a season, or None if it has no finals."""
+    if finals_mapping is None:
+        finals_mapping = load_finals_mapping()
+    if league_name in finals_mapping and year != "N/A" and season_name != "N/A":
+        key = f"{season_name} {year}"
+        return finals_mapping[league_name].get(key)
+    return None
+
+def finals_tournament_id_list(finals_tournament_ids):
+    """Returns the finals tournament ID(s) of a season as a list (the mapping holds an ID or a list of IDs)."""
+    if not finals_tournament_ids:
+        return []
+    return finals_tournament_ids if isinstance(finals_tournament_ids, list) else [finals_tournament_ids]
+
+def get_finals_player_positions(finals_standings):
+    """Maps playerId to final position for a season's combined finals standings."""
+    return {result['playerId']: result['position'] for result in finals_standings}
@@ -0,0 +1,152 @@
+from collections import defaultdict
+
+import numpy as np
+
+# Columnar store of league games.
+#
+# Every (game, player) appearance is one row, so the per-player and per-machine outcome
+# tables are group-bys over flat NumPy columns instead of nested loops over the raw API
+# JSON. Arenas are stored as codes into the store's 'arena_names' list.
+#
+# Rows follow the order of the games in the input, and every table built from a store
+# lists players (and a player's machines) in the order they first appear, which is the
+# order the nested-dict version of these tables had.
+
+GAME_COLUMNS = {
+    'game_id': np.int64,
+    'tournament_id': np.int64,
+    'arena': np.int32,
+    'player_id': np.int64,
+    'position': np.int16,
+    'num_players': np.int16,
+    'points': np.float64
+}
+
+# Per-player game outcome counters. Every key is present from the start so rendering a
+# template never inserts keys into shared data (pages may render in worker processes).
+GAME_OUTCOME_KEYS = ('total_games', '1st', '2nd_4p', '2nd_3p', '3rd_4p', '4th_combined')
+
+MACHINE_OUTCOME_KEYS = ('1st_place', '2nd_place', '3rd_place', 'total_plays')
+
+def empty_game_outcomes():
+    """Returns a zeroed game outcome counter for one player."""
+    return defaultdict(int, {key: 0 for key in GAME_OUTCOME_KEYS})
+
+def build_game_columns(tournament_games):
+    """
+    Converts the games of a series ({tournamentId: [Game, ...]}) into a columnar store.
+    Players missing from a game's resultPositions (e.g. unfinished games) get no row.
+    """
+    rows = {name: [] for name in GAME_COLUMNS}
+    arena_names = []
+    arena_codes = {}
+
+    for tournament_id, games_list in tournament_games.items():
+        for game in games_list:
+            arena_name = game.arenaName
+            if arena_name not in arena_codes:
+                arena_codes[arena_name] = len(arena_names)
+                arena_names.append(arena_name)
+
+            if game.resultPositions is None:
+                continue
+            # 1-based finishing position of each player; the first entry wins if a player is listed twice
+            positions = {}
+            for index, player_id in enumerate(game.resultPositions):
+                positions.setdefault(player_id, index + 1)
+
+            result_points = game.resultPoints or ()
+            num_players = len(game.playerIds)
+            for player_index, player_id in enumerate(game.playerIds):
+                position = positions.get(player_id)
+                if position is None:
+                    continue
+                rows['game_id'].append(-1 if game.gameId is None else game.gameId)
+                rows['tournament_id'].append(tournament_id)
+                rows['arena'].append(arena_codes[arena_name])
+                rows['player_id'].append(player_id)
+                rows['position'].append(position)
+                rows['num_players'].append(num_players)
+                rows['points'].append(result_points[player_index] if player_index < len(result_points) else np.nan)
+
+    columns = {name: np.array(values, dtype=GAME_COLUMNS[name]) for name, values in rows.items()}
+    columns['arena_names'] = arena_names
+    return columns
+
+def _group_first_seen(keys):
+    """
+    Groups equal keys. Returns (the distinct keys in order of first appearance, the group
+    number of every row).
+    """
+    distinct, first_index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(first_index, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return distinct[order], rank[inverse.reshape(-1)]
+
+def _count(groups, mask, num_groups):
+    return np.bincount(groups[mask], minlength=num_groups).tolist()
+
+def player_outcomes(columns):
+    """Counts finishing positions per player: {playerId: {outcome: count}} with GAME_OUTCOME_KEYS."""
+    players, groups = _group_first_seen(columns['player_id'])
+    num_groups = len(players)
+    position = columns['position']
+    num_players = columns['num_players']
+    four_player = num_players == 4
+    three_player = num_players == 3
+
+    table = {
+        'total_games': np.bincount(groups, minlength=num_groups).tolist(),
+        '1st': _count(groups, position == 1, num_groups),
+        '2nd_4p': _count(groups, (position == 2) & four_player, num_groups),
+        '2nd_3p': _count(groups, (position == 2) & three_player, num_groups),
+        '3rd_4p': _count(groups, (position == 3) & four_player, num_groups),
+        # Last place: 3rd of three or 4th of four
+        '4th_combined': _count(groups, ((position == 3) & three_player) | ((position == 4) & four_player), num_groups)
+    }
+    return {
+        player_id: {key: table[key][i] for key in GAME_OUTCOME_KEYS}
+        for i, player_id in enumerate(players.tolist())
+    }
+
+def machine_outcome_counts(columns):
+    """
+    Counts plays and top-3 finishes per (player, machine) pair of a store, in order of first
+    appearance, as arrays: {'player_id', 'arena' (codes into 'arena_names'), 'arena_names',
+    and one count array per MACHINE_OUTCOME_KEYS}. Much smaller than the store itself, so a
+    series' counts can be kept after its game columns are released.
+    """
+    arena_names = columns['arena_names']
+    num_arenas = max(len(arena_names), 1)
+    players, player_groups = _group_first_seen(columns['player_id'])
+    pair_keys = player_groups.astype(np.int64) * num_arenas + columns['arena']
+    pairs, groups = _group_first_seen(pair_keys)
+    num_groups = len(pairs)
+    position = columns['position']
+
+    return {
+        'player_id': players[pairs // num_arenas],
+        'arena': (pairs % num_arenas).astype(np.int32),
+        'arena_names': list(arena_names),
+        '1st_place': np.bincount(groups[position == 1], minlength=num_groups),
+        '2nd_place': np.bincount(groups[position == 2], minlength=num_groups),
+        '3rd_place': np.bincount(groups[position == 3], minlength=num_groups),
+        'total_plays': np.bincount(groups, minlength=num_groups)
+    }
+
+def add_machine_outcomes(by_machine, counts):
+    """
+    Adds the counts of machine_outcome_counts to a {playerId: {arena name: {outcome: count}}}
+    table in place and returns it. Adding the counts of several stores in order gives the
+    table of their combined games (with MACHINE_OUTCOME_KEYS), with players and machines in order of first appearance.
+    """
+    arena_names = counts['arena_names']
+    values = [counts[key].tolist() for key in MACHINE_OUTCOME_KEYS]
+    for i, (player_id, arena) in enumerate(zip(counts['player_id'].tolist(), counts['arena'].tolist())):
+        outcomes = by_machine.setdefault(player_id, {}).setdefault(
+            arena_names[arena], {key: 0 for key in MACHINE_OUTCOME_KEYS}
+        )
+        for key, key_values in zip(MACHINE_OUTCOME_KEYS, values):
+            outcomes[key] += key_values[i]
+    return by_machine
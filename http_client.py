@@ -0,0 +1,135 @@
+import re
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import profiling
+from config import (FETCH_CONCURRENCY, HTTP_TIMEOUT_SECONDS, HTTP_MAX_RETRIES, HTTP_BACKOFF_SECONDS,
+                    HTTP_MAX_BACKOFF_SECONDS, HTTP_RATE_LIMIT_PER_SECOND, HTTP_RATE_LIMIT_BURST)
+
+# Shared HTTP layer of api_client.
+#
+# Every request waits for a token from a client-side token bucket, so a large concurrent
+# refresh stays under the API's rate limit instead of provoking 429s. Connection errors,
+# timeouts, 429 and 5xx responses are retried with exponential backoff (with jitter); a
+# Retry-After header overrides the backoff, and after a 429 the bucket is paused so every
+# worker thread waits, not just the one that was throttled.
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second on average, bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Holds back all requests for the given number of seconds."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+def retry_after_seconds(response):
+    """Returns the delay requested by a Retry-After header (seconds or HTTP date), or None."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def endpoint_name(url):
+    """Returns the API path of a URL with IDs replaced by {id}, e.g. /tournaments/{id}/games."""
+    path = requests.utils.urlparse(url).path
+    if path.startswith('/api'):
+        path = path[len('/api'):]
+    return re.sub(r'/\d+', '/{id}', path)
+
+def _profile_response(response, *args, **kwargs):
+    if not profiling.is_enabled():
+        return
+    endpoint = f"{response.request.method} {endpoint_name(response.url)}"
+    profiling.observe(f"http {endpoint}", response.elapsed.total_seconds())
+    profiling.count("http.bytes", len(response.content))
+    if response.status_code >= 400:
+        profiling.count(f"http.status_{response.status_code}")
+
+class HttpClient:
+    """A keep-alive session shared by the fetch workers, with rate limiting, timeouts and retries."""
+
+    def __init__(self, headers, pool_size=FETCH_CONCURRENCY, rate=HTTP_RATE_LIMIT_PER_SECOND,
+                 burst=HTTP_RATE_LIMIT_BURST, timeout=HTTP_TIMEOUT_SECONDS, max_retries=HTTP_MAX_RETRIES,
+                 backoff=HTTP_BACKOFF_SECONDS, max_backoff=HTTP_MAX_BACKOFF_SECONDS):
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        self.session.hooks['response'].append(_profile_response)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.bucket = TokenBucket(rate, burst)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def backoff_delay(self, attempt):
+        """Exponential backoff with jitter for the given retry attempt (0-based)."""
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def get(self, url, params=None):
+        """
+        Sends a GET request and returns the successful response. Transient failures are retried
+        up to max_retries times; the last failure is raised as a requests RequestException.
+        """
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt)
+                reason = type(e).__name__
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    response.raise_for_status()
+                    return response
+                delay = retry_after_seconds(response)
+                if delay is None:
+                    delay = self.backoff_delay(attempt)
+                if response.status_code == 429:
+                    self.bucket.pause(delay)
+                reason = f"HTTP {response.status_code}"
+            attempt += 1
+            profiling.count("http.retries")
+            print(f"{reason} from {endpoint_name(url)}, retrying in {delay:.1f}s (attempt {attempt} of {self.max_retries})")
+            time.sleep(delay)
@@ -1,11 +1,17 @@
 import argparse
 import os
+import sys
 from dotenv import load_dotenv
 
-from api_client import fetch_data, API_KEY, USER_ID
-from data_processor import load_finals_mapping, parse_series_name
+import profiling
+import request_log
+from api_client import fetch_data, enable_replay, API_KEY, USER_ID
+from data_processor import parse_series_name
+from finals import load_finals_mapping
 from site_generator import generate_site
-from config import EXCLUDED_SERIES_NAMES, TEMPLATES_DIR
+from page_generators.helpers import create_environment, precompile_templates
+from sqlite_store import import_json_cache
+from config import EXCLUDED_SERIES_NAMES, TEMPLATES_DIR, TEMPLATE_CACHE_DIR, SQLITE_STORE_PATH, REPLAY_RECORDED_LATENCY
 
 load_dotenv()
 
@@ -24,23 +30,128 @@ def main():
         action="store_true",
         help="Generate the static HTML site."                                                                                                                                                                                                                                                                                                                                                                                                                          
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep the existing output and only re-render pages whose input data or templates changed."
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes used to render pages (0 = one per CPU core)."
+    )
+    parser.add_argument(
+        "--verify-aggregates",
+        action="store_true",
+        help="Check the stored all-time leaderboard aggregates against a full rebuild."
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Abort site generation if any input file is missing from the local data store or fails validation."
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile_report.json",
+        metavar="REPORT",
+        help="Write a JSON report of per-stage timings, cache hits and HTTP requests (default: profile_report.json)."
+    )
+    parser.add_argument(
+        "--cprofile",
+        metavar="STAGE",
+        help="With --profile, also run STAGE (e.g. generate.player_pages) under cProfile and dump its stats next to the report."
+    )
+    parser.add_argument(
+        "--import-sqlite",
+        action="store_true",
+        help="Import the JSON files in the data directory into the SQLite data store."
+    )
+    parser.add_argument(
+        "--record-responses",
+        action="store_true",
+        help="With --fetch, also store the API response bodies in the request log so the fetch can be replayed."
+    )
+    parser.add_argument(
+        "--replay",
+        nargs="?",
+        const=request_log.REQUEST_LOG_PATH,
+        metavar="LOG",
+        help="With --fetch, answer API requests from the responses recorded in LOG instead of the network (default: the request log)."
+    )
+    parser.add_argument(
+        "--request-stats",
+        action="store_true",
+        help="Print the requests, cache hits, latency and bytes per endpoint of the last fetch in the request log."
+    )
+    parser.add_argument(
+        "--precompile-templates",
+        action="store_true",
+        help="Compile every template into the template bytecode cache, so the next build starts without compiling."
+    )
     args = parser.parse_args()
 
+    if args.profile:
+        profiling.enable(args.cprofile, os.path.splitext(args.profile)[0] + ".prof")
+        try:
+            run(args)
+        finally:
+            profiling.write_report(args.profile)
+    else:
+        run(args)
+
+def run(args):
+    """Runs the steps selected on the command line."""
     # Default to generating the site if no arguments are provided
-    should_generate = args.generate or not (args.fetch)
+    should_generate = args.generate or not (args.fetch or args.import_sqlite or args.request_stats or args.precompile_templates)
+
+    if args.import_sqlite:
+        print("--- Importing JSON Cache into SQLite ---")
+        print(f"Imported {import_json_cache()} files into {SQLITE_STORE_PATH}")
+        if not (args.fetch or should_generate):
+            return
 
-    if not API_KEY or not USER_ID or "YOUR_" in API_KEY:
-        print("Please create a .env file and add your MATCHPLAY_API_KEY and USER_ID.")
-        return
+    if args.precompile_templates:
+        if not TEMPLATE_CACHE_DIR:
+            print("The template bytecode cache is disabled (TEMPLATE_CACHE_DIR in config.py).")
+        else:
+            count = precompile_templates(create_environment(last_updated=None))
+            print(f"Compiled {count} templates from '{TEMPLATES_DIR}' into '{TEMPLATE_CACHE_DIR}'")
+        if not (args.fetch or should_generate):
+            return
+
+    # Reads only the request log, so it needs no credentials
+    if args.request_stats and not args.fetch:
+        request_log.summarize()
+        if not should_generate:
+            return
 
     if args.fetch:
+        # Only fetching needs credentials; a replayed fetch never reaches the API, so it does
+        # not need a key, and generating reads only the local data store
+        if not USER_ID or (not args.replay and (not API_KEY or "YOUR_" in API_KEY)):
+            print("Please create a .env file and add your MATCHPLAY_API_KEY and USER_ID.")
+            return
         print("--- Starting Data Fetch ---")
-        fetch_data(EXCLUDED_SERIES_NAMES, load_finals_mapping(), parse_series_name)
+        request_log.configure(record_bodies=args.record_responses)
+        if args.replay:
+            print(f"Replaying API responses from {args.replay}")
+            enable_replay(args.replay, latency=REPLAY_RECORDED_LATENCY)
+        with profiling.stage("fetch"):
+            fetch_data(EXCLUDED_SERIES_NAMES, load_finals_mapping(), parse_series_name)
         print("--- Data Fetch Complete ---")
 
+    if args.request_stats and args.fetch:
+        request_log.summarize()
+
     if should_generate:
         print("--- Starting Site Generation ---")
-        generate_site(EXCLUDED_SERIES_NAMES)
+        with profiling.stage("generate"):
+            succeeded = generate_site(EXCLUDED_SERIES_NAMES, incremental=args.incremental, jobs=args.jobs or os.cpu_count(),
+                                      verify_aggregates=args.verify_aggregates, strict=args.strict)
+        if succeeded is False:
+            sys.exit(1)
         print("--- Site Generation Complete ---")
 
 if __name__ == "__main__":
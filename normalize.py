@@ -0,0 +1,166 @@
+import math
+
+from records import Player, Standing, Series, Game
+
+# Normalization of cached API payloads, run once when a file is loaded.
+#
+# The API sends IDs as strings in some places (the keys of tournamentPoints) and points as
+# strings ("21.00"), and leaves optional game fields out. Everything is converted here to
+# typed records: IDs to int, points to float, a game's arena to its name, and each week of
+# a series to its week number in tournamentIds order, so the code that indexes and renders
+# the data does no per-access conversions. Values that cannot be converted are skipped and
+# reported as (file, problem) pairs in the caller's invalid_inputs list.
+
+UNKNOWN_ARENA = 'Unknown Arena'
+
+class _Problems:
+    """Records validation problems of one input file."""
+
+    def __init__(self, filepath, invalid_inputs):
+        self.filepath = filepath
+        self.invalid_inputs = invalid_inputs
+
+    def add(self, message):
+        if self.invalid_inputs is not None:
+            self.invalid_inputs.append((self.filepath, message))
+
+    def to_int(self, value, what):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            self.add(f"{what}: {value!r} is not an ID")
+            return None
+
+    def to_float(self, value, what):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            self.add(f"{what}: {value!r} is not a number")
+            return None
+
+def _is_empty(value):
+    # The API sends an empty list instead of an empty object
+    return isinstance(value, (dict, list)) and not value
+
+def normalize_series(series_json, filepath, invalid_inputs=None):
+    """
+    Converts the 'data' object of a /series/{id} response into a Series record and its
+    weekly points: a list of (tournamentId, week number or None, [(playerId, points), ...])
+    in tournamentPoints order, with weeks numbered from 1 in tournamentIds order.
+    """
+    problems = _Problems(filepath, invalid_inputs)
+
+    tournament_ids = []
+    for tournament_id in series_json.get('tournamentIds') or []:
+        tournament_id = problems.to_int(tournament_id, "tournamentIds")
+        if tournament_id is not None:
+            tournament_ids.append(tournament_id)
+
+    players = []
+    for player in series_json.get('players') or []:
+        player_id = problems.to_int(player.get('playerId'), "players.playerId")
+        if player_id is not None:
+            players.append(Player(player_id, player.get('name', 'Unknown Player'), player.get('ifpaId')))
+
+    standings = []
+    for standing in series_json.get('standings') or []:
+        player_id = problems.to_int(standing.get('playerId'), "standings.playerId")
+        if player_id is None:
+            continue
+        points_adjusted = standing.get('pointsAdjusted')
+        if not isinstance(points_adjusted, (int, float)):
+            problems.add(f"standings[{player_id}].pointsAdjusted: {points_adjusted!r} is not a number")
+            points_adjusted = 0
+        standings.append(Standing(player_id, standing.get('position'), points_adjusted))
+
+    series = Series(
+        seriesId=series_json['seriesId'],
+        name=series_json['name'],
+        status=series_json.get('status'),
+        startDate=series_json.get('startDate'),
+        tournamentIds=tournament_ids,
+        players=players,
+        standings=standings
+    )
+    return series, normalize_tournament_points(series_json.get('tournamentPoints'), tournament_ids, problems)
+
+def normalize_tournament_points(tournament_points, tournament_ids, problems):
+    week_by_tournament = {tid: i + 1 for i, tid in enumerate(tournament_ids)}
+    weeks = []
+    if tournament_points is None or _is_empty(tournament_points):
+        return weeks
+    if not isinstance(tournament_points, dict):
+        problems.add(f"tournamentPoints: expected an object, got {type(tournament_points).__name__}")
+        return weeks
+
+    for tournament_id_str, player_points_map in tournament_points.items():
+        if _is_empty(player_points_map):
+            continue
+        if not isinstance(player_points_map, dict):
+            problems.add(f"tournamentPoints[{tournament_id_str}]: expected an object, got {type(player_points_map).__name__}")
+            continue
+        tournament_id = problems.to_int(tournament_id_str, "tournamentPoints")
+        if tournament_id is None:
+            continue
+        player_points = []
+        for player_id_str, points_str in player_points_map.items():
+            player_id = problems.to_int(player_id_str, f"tournamentPoints[{tournament_id}]")
+            points = problems.to_float(points_str, f"tournamentPoints[{tournament_id}][{player_id_str}]")
+            if player_id is not None and points is not None:
+                player_points.append((player_id, points))
+        if player_points:
+            weeks.append((tournament_id, week_by_tournament.get(tournament_id), player_points))
+    return weeks
+
+def _result_points(points, problems, game_id):
+    if points is None:
+        return None
+    typed = []
+    for value in points:
+        if value is None:
+            # Not played (yet)
+            typed.append(math.nan)
+            continue
+        value = problems.to_float(value, f"game {game_id} resultPoints")
+        typed.append(math.nan if value is None else value)
+    return typed
+
+def normalize_games(games_json, filepath, invalid_inputs=None):
+    """
+    Converts the games of a /tournaments/{id}/games response into Game records. Games
+    without a list of players are skipped.
+    """
+    problems = _Problems(filepath, invalid_inputs)
+    games = []
+    for game in games_json:
+        game_id = game.get('gameId')
+        player_ids = game.get('playerIds')
+        if not isinstance(player_ids, list):
+            problems.add(f"game {game_id}: no playerIds")
+            continue
+        arena = game.get('arena') or {}
+        games.append(Game(
+            gameId=game_id,
+            roundId=game.get('roundId') or 0,
+            startedAt=game.get('startedAt') or '',
+            arenaName=arena.get('name', UNKNOWN_ARENA),
+            set=game.get('set') or 0,
+            playerIds=player_ids,
+            resultPositions=game.get('resultPositions'),
+            resultPoints=_result_points(game.get('resultPoints'), problems, game_id)
+        ))
+    return games
+
+def summarize_invalid_inputs(invalid_inputs, limit=10):
+    """Prints one summary of the input files that failed validation, with the first problem of each."""
+    if not invalid_inputs:
+        return
+    by_file = {}
+    for filepath, message in invalid_inputs:
+        by_file.setdefault(filepath, []).append(message)
+    print(f"WARNING: {len(by_file)} input file(s) contain values that could not be read; those values were skipped.")
+    for filepath, messages in list(by_file.items())[:limit]:
+        more = f" (and {len(messages) - 1} more)" if len(messages) > 1 else ""
+        print(f"  invalid: {filepath}: {messages[0]}{more}")
+    if len(by_file) > limit:
+        print(f"  ... and {len(by_file) - limit} more files")
@@ -0,0 +1,53 @@
+import os
+import json
+import hashlib
+
+from cache_policy import write_json_atomic
+from config import AGGREGATE_STORE_PATH
+
+# Layout version of the store file. Entries are also invalidated whenever the site's Python
+# code changes (see series_fingerprint), so this only needs bumping if the layout changes.
+AGGREGATE_STORE_VERSION = 1
+
+def load_aggregate_store(path=AGGREGATE_STORE_PATH):
+    """
+    Returns the stored per-series entries as {seriesId: {'fingerprint': ..., 'contribution': ...}},
+    or {} if there is no usable store (which makes the caller rebuild every entry).
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            store = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable aggregate store {path}: {e}")
+        return {}
+    if store.get('version') != AGGREGATE_STORE_VERSION:
+        print(f"Aggregate store {path} has an old layout, rebuilding it.")
+        return {}
+    return {int(series_id): entry for series_id, entry in store.get('series', {}).items()}
+
+def save_aggregate_store(entries, path=AGGREGATE_STORE_PATH):
+    """Writes the per-series entries, replacing the previous store."""
+    write_json_atomic(path, {
+        'version': AGGREGATE_STORE_VERSION,
+        'series': {str(series_id): entry for series_id, entry in sorted(entries.items())}
+    })
+
+def series_fingerprint(writer, season):
+    """
+    Identifies everything a season's aggregates are computed from: its data files (series,
+    tournament games and finals), its year-corrected name, its finals tournaments and the
+    site's code. A stored entry with the same fingerprint can be reused as is.
+
+    The unit of reuse is the series rather than the tournament: a new weekly tournament also
+    moves the series' standings and adjusted points, so the whole series is aggregated again.
+    Only the seasons still being played change between builds, so that is normally one series.
+    """
+    digest = hashlib.sha1()
+    facts = [writer.code_signature(), season['year'], season['season_name'], season['league_name'], season['finals_tournament_ids']]
+    digest.update(json.dumps(facts).encode('utf-8'))
+    for path in season['source_files']:
+        digest.update(path.encode('utf-8'))
+        digest.update(writer.file_signature(path).encode('utf-8'))
+    return digest.hexdigest()
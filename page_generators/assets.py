@@ -0,0 +1,223 @@
+import os
+import re
+import gzip
+import hashlib
+import tempfile
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only .gz siblings are written
+    brotli = None
+
+# Post-render asset handling for static hosting.
+#
+#   - Static files are published under content-fingerprinted names (style.3f9c2a1b07d4.css), so
+#     browsers can cache them indefinitely and still pick up every change. Templates link
+#     them with the static_url() global, which resolves a name to its fingerprinted path.
+#   - Rendered HTML is minified by HtmlMinifier, and CSS by minify_css.
+#   - precompress_output writes .gz (and .br) siblings of every text file in the output.
+# Every output file is written with write_atomic, so a crashed build never leaves a partially
+# written file behind (a truncated .gz sibling would otherwise look up to date).
+
+COMPRESSIBLE_EXTENSIONS = ('.html', '.css', '.js', '.json', '.svg', '.txt')
+COMPRESSED_EXTENSIONS = ('.gz', '.br')
+# Length of the content hashes in the names of static files, chart data and search index shards
+CONTENT_HASH_LENGTH = 12
+# Write buffer of output files, and the name prefix of their temp files
+WRITE_BUFFER_SIZE = 64 * 1024
+TEMP_FILE_PREFIX = '.tmp_'
+
+def write_atomic(path, chunks):
+    """
+    Writes an iterable of byte chunks to a temp file next to path and renames it into place,
+    so readers never see a partial file. Returns the number of bytes written.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=TEMP_FILE_PREFIX)
+    written = 0
+    try:
+        with os.fdopen(fd, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+        # mkstemp creates the file readable by its owner only
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return written
+
+def minify_css(css):
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+def content_hash(data):
+    """Returns the hash that names a file by its content (bytes), CONTENT_HASH_LENGTH hex characters long."""
+    return hashlib.sha1(data).hexdigest()[:CONTENT_HASH_LENGTH]
+
+def fingerprinted_name(relative_path, data_hash):
+    """Inserts a content hash before the extension of a file name: style.css -> style.{hash}.css."""
+    root, ext = os.path.splitext(relative_path)
+    return f"{root}.{data_hash}{ext}"
+
+def publish_static_files(source_dir, target_dir, minify=True):
+    """
+    Writes every file of source_dir to target_dir under its fingerprinted name (CSS minified
+    first) and removes files of target_dir that are no longer published. Returns
+    {relative name: URL path} for static_url().
+    """
+    urls = {}
+    published = set()
+    for directory, _, filenames in os.walk(source_dir):
+        for filename in sorted(filenames):
+            source_path = os.path.join(directory, filename)
+            relative_path = os.path.relpath(source_path, source_dir).replace(os.sep, '/')
+            with open(source_path, 'rb') as f:
+                data = f.read()
+            if minify and filename.endswith('.css'):
+                data = minify_css(data.decode('utf-8')).encode('utf-8')
+
+            name = fingerprinted_name(relative_path, content_hash(data))
+            target_path = os.path.join(target_dir, name)
+            if not os.path.exists(target_path):
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                write_atomic(target_path, [data])
+            published.add(os.path.normpath(target_path))
+            urls[relative_path] = f"{os.path.basename(target_dir)}/{name}"
+
+    for directory, _, filenames in os.walk(target_dir):
+        for filename in filenames:
+            path = os.path.normpath(os.path.join(directory, filename))
+            if path not in published and not path.endswith(COMPRESSED_EXTENSIONS):
+                os.remove(path)
+    return urls
+
+class HtmlMinifier:
+    """
+    Streaming HTML minifier: every run of whitespace that contains a line break becomes a
+    single line break and comments are removed, which browsers render identically. The
+    contents of <script>, <pre> and <textarea> are passed through unchanged. Text can be
+    fed in arbitrary chunks; feed() returns the minified output that is final so far.
+    """
+
+    _SPECIAL = re.compile(r'<!--|<(script|pre|textarea)\b', re.I)
+    _WHITESPACE = re.compile(r'\s*\n\s*')
+
+    def __init__(self):
+        self.buffer = ''
+        self.end_tag = None
+
+    def feed(self, text):
+        self.buffer += text
+        return self._drain(final=False)
+
+    def close(self):
+        return self._drain(final=True)
+
+    def _minify(self, text):
+        return self._WHITESPACE.sub('\n', text)
+
+    def _drain(self, final):
+        out = []
+        while self.buffer:
+            if self.end_tag:
+                # Inside a <script>, <pre> or <textarea>: copy up to its end tag
+                index = self.buffer.lower().find(self.end_tag)
+                if index < 0:
+                    # Keep a tail that may be the start of the end tag
+                    cut = len(self.buffer) if final else max(0, len(self.buffer) - len(self.end_tag) + 1)
+                    out.append(self.buffer[:cut])
+                    self.buffer = self.buffer[cut:]
+                    break
+                out.append(self.buffer[:index])
+                self.buffer = self.buffer[index:]
+                self.end_tag = None
+                continue
+
+            match = self._SPECIAL.search(self.buffer)
+            if match is None:
+                if final:
+                    out.append(self._minify(self.buffer))
+                    self.buffer = ''
+                    break
+                # Keep a trailing partial tag and trailing whitespace for the next chunk
+                cut = self.buffer.rfind('<')
+                if cut < 0:
+                    cut = len(self.buffer.rstrip())
+                out.append(self._minify(self.buffer[:cut]))
+                self.buffer = self.buffer[cut:]
+                break
+
+            out.append(self._minify(self.buffer[:match.start()]))
+            if match.group(1) is None:
+                end = self.buffer.find('-->', match.end())
+                if end < 0:
+                    if final:
+                        self.buffer = ''
+                    else:
+                        self.buffer = self.buffer[match.start():]
+                    break
+                self.buffer = self.buffer[end + 3:]
+            else:
+                self.end_tag = f"</{match.group(1).lower()}"
+                out.append(self.buffer[match.start():match.end()])
+                self.buffer = self.buffer[match.end():]
+        return ''.join(out)
+
+def minify_html(html):
+    minifier = HtmlMinifier()
+    return minifier.feed(html) + minifier.close()
+
+def _write_compressed(path, data):
+    write_atomic(path + '.gz', [gzip.compress(data, compresslevel=9, mtime=0)])
+    if brotli is not None:
+        write_atomic(path + '.br', [brotli.compress(data, quality=11)])
+
+def precompress_output(output_dir):
+    """
+    Writes .gz (and .br) siblings of every compressible file in output_dir whose sibling is
+    missing or older than the file, and removes siblings whose file no longer exists (and
+    temp files of an interrupted build).
+    Returns the output size: {'files', 'bytes', 'gzip_bytes', 'brotli_bytes'} (brotli_bytes
+    is None without brotli).
+    """
+    size = {'files': 0, 'bytes': 0, 'gzip_bytes': 0, 'brotli_bytes': 0 if brotli is not None else None}
+    for directory, _, filenames in os.walk(output_dir):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if filename.startswith(TEMP_FILE_PREFIX):
+                # Left behind by a build that was killed while writing
+                os.remove(path)
+                continue
+            if filename.endswith(COMPRESSED_EXTENSIONS):
+                if not os.path.exists(path[:-3]):
+                    os.remove(path)
+                continue
+            size['files'] += 1
+            file_bytes = os.path.getsize(path)
+            size['bytes'] += file_bytes
+            if not filename.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+
+            siblings = [path + '.gz'] + ([path + '.br'] if brotli is not None else [])
+            if any(not os.path.exists(sibling) or os.path.getmtime(sibling) < os.path.getmtime(path) for sibling in siblings):
+                with open(path, 'rb') as f:
+                    _write_compressed(path, f.read())
+            size['gzip_bytes'] += os.path.getsize(path + '.gz')
+            if brotli is not None:
+                size['brotli_bytes'] += os.path.getsize(path + '.br')
+    return size
+
+def output_size(output_dir):
+    """Returns {'files', 'bytes'} of output_dir, not counting compressed siblings."""
+    size = {'files': 0, 'bytes': 0}
+    for directory, _, filenames in os.walk(output_dir):
+        for filename in filenames:
+            if not filename.endswith(COMPRESSED_EXTENSIONS):
+                size['files'] += 1
+                size['bytes'] += os.path.getsize(os.path.join(directory, filename))
+    return size
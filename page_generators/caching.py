@@ -1,12 +1,22 @@
 import functools
+import threading
+
+import profiling
 
 def memoize_by_first_arg(func):
     """
     A simple memoization decorator that caches results based on the first argument.
     This is suitable for functions where the first argument is the primary identifier
     for the data being fetched, like a tournament ID or list of IDs.
+
+    The cache is thread-safe: concurrent callers asking for the same key wait for
+    the first call to finish instead of fetching the same data twice. None results
+    (failed fetches) are not cached, so a later call tries again.
     """
     cache = {}
+    key_locks = {}
+    locks_guard = threading.Lock()
+
     @functools.wraps(func)
     def wrapper(first_arg, *args, **kwargs):
         # Create a cache key from the first argument.
@@ -16,9 +26,21 @@ def memoize_by_first_arg(func):
         else:
             key = first_arg
 
-        if key not in cache:
+        if key in cache:
+            profiling.count(f"memoize.{func.__name__}.hits")
+            return cache[key]
+
+        with locks_guard:
+            key_lock = key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            if key in cache:
+                profiling.count(f"memoize.{func.__name__}.hits")
+                return cache[key]
+            profiling.count(f"memoize.{func.__name__}.misses")
             # Call the original function with all its arguments
-            cache[key] = func(first_arg, *args, **kwargs)
-        
-        return cache[key]
+            result = func(first_arg, *args, **kwargs)
+            if result is not None:
+                cache[key] = result
+            return result
     return wrapper
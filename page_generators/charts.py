@@ -1,11 +1,44 @@
-import os
-from config import OUTPUT_DIR
+import json
 
-def generate_charts_page(env, all_players_chart_data):
-    """Generates the charts.html page."""
+from page_generators.assets import content_hash, fingerprinted_name
+
+# Season statistics that can be charted, in the column order of the chart data shards
+CHART_STATISTICS = ('average_points_per_week', 'total_raw_points', 'total_adjusted_points',
+                    'weeks_played', 'best_week_score')
+# Output subdirectory of the per-player chart data shards
+CHART_DATA_DIR = 'chart_data'
+
+def build_chart_shard(player_chart_data):
+    """
+    Returns the compact JSON (as bytes) of one player's chart data: the player's name and, per
+    league, one row of [season label, *CHART_STATISTICS] per season.
+    """
+    def rows(seasons_data):
+        return [[season['label']] + [season['stats'][key] for key in CHART_STATISTICS] for season in seasons_data]
+
+    shard = {
+        'name': player_chart_data['name'],
+        'mfp': rows(player_chart_data['mfp_seasons_data']),
+        'mflp': rows(player_chart_data['mflp_seasons_data'])
+    }
+    return json.dumps(shard, separators=(',', ':')).encode('utf-8')
+
+def generate_charts_page(writer, league_model, all_players_chart_data):
+    """
+    Generates the charts.html page. Each player's chart data is written to its own shard,
+    named by its content hash so browsers can cache it indefinitely, and the page only embeds
+    an index of [playerId, name, shard hash] that it loads the selected players' shards from.
+    """
     print("Generating charts.html...")
-    template = env.get_template('charts.html')
-    with open(os.path.join(OUTPUT_DIR, 'charts.html'), 'w') as f:
-        # Pass the Python dictionary directly; the 'tojson' filter in the template will handle serialization and escaping
-        f.write(template.render(all_players_chart_data=all_players_chart_data))
-    print("Generated charts.html")
+    chart_index = {'fields': CHART_STATISTICS, 'shard_dir': CHART_DATA_DIR, 'players': []}
+    for player_id, player_chart_data in all_players_chart_data.items():
+        # Only players with at least one season can be charted
+        if not (player_chart_data['mfp_seasons_data'] or player_chart_data['mflp_seasons_data']):
+            continue
+        data = build_chart_shard(player_chart_data)
+        shard_hash = content_hash(data)
+        writer.write_file(fingerprinted_name(f"{CHART_DATA_DIR}/{player_id}.json", shard_hash), data)
+        chart_index['players'].append([player_id, player_chart_data['name'], shard_hash])
+
+    writer.render('charts.html', 'charts.html', league_model['source_files'] + ['series_index'],
+                  chart_index=chart_index)
@@ -1,5 +1,11 @@
+import os
 import json
-from markupsafe import escape
+import hashlib
+import jinja2
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+from markupsafe import Markup, escape
+
+from config import TEMPLATES_DIR, TEMPLATE_CACHE_DIR, CHART_JS_URL
 
 # --- Jinja2 Custom Filters ---
 def score_color_filter(score):
@@ -86,3 +92,51 @@ def get_qualification_threshold(year_str, season_name):
 # Custom filter for safe JSON embedding in HTML attributes
 def json_attribute_filter(obj):
     return escape(json.dumps(obj))
+
+# Custom filter for compact JSON inside <script type="application/json"> blocks. <, > and &
+# are escaped so the data can never close the script tag.
+def json_script_filter(obj):
+    data = json.dumps(obj, separators=(',', ':'))
+    return Markup(data.replace('<', '\\u003c').replace('>', '\\u003e').replace('&', '\\u0026'))
+
+class TemplateBytecodeCache(FileSystemBytecodeCache):
+    """
+    Bytecode cache of compiled templates in TEMPLATE_CACHE_DIR. A cached template is used only
+    if the hash of its source (and of the Jinja version that compiled it) still matches, so
+    editing a template recompiles just that template.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(directory)
+
+    def get_source_checksum(self, source):
+        return hashlib.sha1(f"{jinja2.__version__}\0{source}".encode('utf-8')).hexdigest()
+
+def precompile_templates(env):
+    """Compiles every template into the environment's bytecode cache. Returns the number of templates."""
+    names = env.list_templates(extensions=['html'])
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+def create_environment(last_updated, static_urls=None):
+    """
+    Creates the Jinja2 environment used to render every page. Render worker processes
+    call this too, so all pages are rendered with identical configuration and share the
+    template bytecode cache. static_urls maps the files in STATIC_DIR to their published
+    (fingerprinted) paths for static_url().
+    """
+    static_urls = dict(static_urls or {})
+    bytecode_cache = TemplateBytecodeCache(TEMPLATE_CACHE_DIR) if TEMPLATE_CACHE_DIR else None
+    env = Environment(loader=FileSystemLoader(TEMPLATES_DIR), bytecode_cache=bytecode_cache)
+    env.filters['score_color_code'] = score_color_filter # Register the custom filter
+    env.filters['format_number'] = format_number_filter # Register the new filter
+    env.filters['tojson'] = json_attribute_filter # Register our custom safe JSON filter
+    env.filters['json_script'] = json_script_filter
+
+    # Add the build timestamp to global variables
+    env.globals['last_updated'] = last_updated
+    env.globals['static_url'] = lambda name: static_urls.get(name, f"static/{name}")
+    env.globals['chart_js_url'] = CHART_JS_URL
+    return env
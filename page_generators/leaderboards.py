@@ -1,301 +1,340 @@
-import os
-from copy import deepcopy
-from data_processor import load_finals_mapping, parse_series_name, apply_year_corrections_to_seasons_list, find_almost_perfect_nights, process_game_data
-from api_client import fetch_finals_results
-from config import OUTPUT_DIR, MIN_WEEKS_FOR_IMPROVEMENT
-
-def generate_leaderboards_page(env, all_series_data, player_categorized_seasons):
-    """Generates the all-time leaderboards page, separated by league type."""
-    print("Generating leaderboards.html...")
-    
-    mfp_players_stats = {}
-    mflp_players_stats = {}
-    
-    all_winning_scores = []
-    all_perfect_nights = []
+import heapq
+import math
+from data_processor import get_player_name
+from config import MIN_WEEKS_FOR_IMPROVEMENT, LEADERBOARD_SIZE, AGGREGATE_STORE_PATH
+from page_generators.aggregate_store import load_aggregate_store, save_aggregate_store, series_fingerprint
+
+LEAGUE_VIEWS = ('mfp', 'mflp', 'combined')
+
+def _sum(left, right):
+    return left + right
+
+def _keep_first(left, right):
+    return left
+
+def _sum_by_position(left, right):
+    return {position: left[position] + right[position] for position in left}
+
+# All-time per-player metrics of one league. Each metric is declared once with its initial
+# value and how partial aggregates merge: per-series aggregates are folded into a league's
+# all-time aggregate, and the combined view merges the MFP and MFLP aggregates (identity
+# fields keep the first league's value). Derived metrics are filled in by
+# finalize_player_stats.
+PLAYER_METRICS = (
+    ('playerId', lambda player_id: player_id, _keep_first),
+    ('name', lambda player_id: '', _keep_first),
+    ('ifpaId', lambda player_id: None, _keep_first),
+    ('total_adjusted_points', lambda player_id: 0.0, _sum),
+    ('total_raw_points', lambda player_id: 0.0, _sum),
+    ('top_4_finishes', lambda player_id: {1: 0, 2: 0, 3: 0, 4: 0}, _sum_by_position),
+    ('seasons_played_count', lambda player_id: 0, _sum),
+    ('total_weeks_played', lambda player_id: 0, _sum),
+    ('weekly_wins', lambda player_id: 0, _sum),
+    ('average_points_per_week', lambda player_id: 0.0, _keep_first),
+    ('total_games_won', lambda player_id: 0, _sum)
+)
+
+def _top_4_key(player):
+    finishes = player['top_4_finishes']
+    return (finishes[1], finishes[2], finishes[3], finishes[4])
+
+# Player rankings rendered for every league view: (name, sort key, row filter, size).
+# A size of None ranks every matching row.
+PLAYER_RANKINGS = (
+    ('total_points_leaderboard', lambda player: player['total_raw_points'], None, LEADERBOARD_SIZE),
+    ('top_4_finishes_leaderboard', _top_4_key, lambda player: sum(player['top_4_finishes'].values()) > 0, None)
+)
+
+def top_k(rows, key, size):
+    """
+    Returns the size highest rows by key, ties in input order; the same result as
+    sorted(rows, key=key, reverse=True)[:size] without sorting every row.
+    """
+    if size is None:
+        return sorted(rows, key=key, reverse=True)
+    return heapq.nlargest(size, rows, key=key)
+
+def new_player_stats(player_id):
+    return {name: initial(player_id) for name, initial, _ in PLAYER_METRICS}
+
+def merge_player_entries(left, right, later=False):
+    """
+    Merges two aggregates of one player into a new dict. With later=True right is a later
+    season of the same league, so its name and IFPA ID (when set) replace left's.
+    """
+    merged = {name: merge(left[name], right[name]) for name, _, merge in PLAYER_METRICS}
+    if later:
+        merged['name'] = right['name'] or left['name']
+        merged['ifpaId'] = right['ifpaId'] or left['ifpaId']
+    return merged
+
+def merge_player_stats(left, right):
+    """Merges two leagues' aggregates into a new dict; neither input is modified."""
+    merged = {}
+    for player_id in list(left) + [player_id for player_id in right if player_id not in left]:
+        if player_id in left and player_id in right:
+            merged[player_id] = merge_player_entries(left[player_id], right[player_id])
+        else:
+            merged[player_id] = dict(left.get(player_id) or right[player_id])
+    return merged
 
-    all_almost_perfect_nights = find_almost_perfect_nights(all_series_data)
-
-    temp_season_entries = []
-    for series_data_raw in all_series_data:
-        series = series_data_raw['data']
-        series_id = series['seriesId']
-        series_name = series['name']
-        year, season_name_parsed, league_name_parsed = parse_series_name(series_name)
-        temp_season_entries.append({
-            'seriesId': series_id,
-            'seriesName': series_name,
-            'year': year,
-            'season_name': season_name_parsed,
-            'league_name': league_name_parsed,
-            'original_series_data': series_data_raw
-        })
-    
-    corrected_temp_season_entries = apply_year_corrections_to_seasons_list(temp_season_entries)
-    corrected_seasons_map = {s['seriesId']: s for s in corrected_temp_season_entries}
-
-    for series_data_raw in all_series_data:
-        series_data = series_data_raw['data']
-        series_id = series_data['seriesId']
-        
-        game_data = process_game_data(series_data_raw)
-        
-        corrected_season_info = corrected_seasons_map.get(series_id, {})
-        year = corrected_season_info.get('year', 'N/A')
-        season_name_parsed = corrected_season_info.get('season_name', 'N/A')
-        league_name_parsed = corrected_season_info.get('league_name', 'Other')
-
-        target_stats_dict = None
-        if "MFPinball" in league_name_parsed or "MFP" in league_name_parsed:
-            target_stats_dict = mfp_players_stats
-        elif "Monterey Flipper Ladies Pinball" in league_name_parsed or "MFLadies" in league_name_parsed:
-            target_stats_dict = mflp_players_stats
-        
-        if target_stats_dict is not None:
-            for player_id, player_game_stats in game_data['by_player'].items():
-                if player_id not in target_stats_dict:
-                    target_stats_dict[player_id] = {
-                        'playerId': player_id,
-                        'name': '',
-                        'ifpaId': None,
-                        'total_adjusted_points': 0.0,
-                        'total_raw_points': 0.0,
-                        'top_4_finishes': {1: 0, 2: 0, 3: 0, 4: 0},
-                        'seasons_played_count': 0,
-                        'total_weeks_played': 0,
-                        'weekly_wins': 0,
-                        'average_points_per_week': 0.0,
-                        'total_games_won': 0
-                    }
-                target_stats_dict[player_id]['total_games_won'] += player_game_stats.get('1st', 0)
-
-            for player_info in series_data['players']:
-                player_id = player_info['playerId']
-                player_name = player_info['name']
-                ifpa_id = player_info.get('ifpaId')
-
-                if player_id not in target_stats_dict:
-                    target_stats_dict[player_id] = {
-                        'playerId': player_id,
-                        'name': player_name,
-                        'ifpaId': ifpa_id,
-                        'total_adjusted_points': 0.0,
-                        'total_raw_points': 0.0,
-                        'top_4_finishes': {1: 0, 2: 0, 3: 0, 4: 0},
-                        'seasons_played_count': 0,
-                        'total_weeks_played': 0,
-                        'weekly_wins': 0,
-                        'average_points_per_week': 0.0,
-                        'total_games_won': 0
-                    }
-                
-                target_stats_dict[player_id]['name'] = player_name
-                if ifpa_id:
-                    target_stats_dict[player_id]['ifpaId'] = ifpa_id
-
-                player_standing = next((s for s in series_data['standings'] if s['playerId'] == player_id), None)
-                
-                overall_final_position_for_season = 'N/A'
-                finals_tournament_ids = None
-                if league_name_parsed in load_finals_mapping() and year != "N/A" and season_name_parsed != "N/A":
-                    key = f"{season_name_parsed} {year}"
-                    finals_tournament_ids = load_finals_mapping()[league_name_parsed].get(key)
-                
-                if finals_tournament_ids:
-                    finals_standings = fetch_finals_results(finals_tournament_ids)
-                    if finals_standings:
-                        finals_player_positions = {res['playerId']: res['position'] for res in finals_standings}
-                        if player_id in finals_player_positions:
-                            overall_final_position_for_season = finals_player_positions[player_id]
-                        elif player_standing:
-                            overall_final_position_for_season = player_standing['position']
-                elif player_standing:
-                    overall_final_position_for_season = player_standing['position']
-
-                if player_standing:
-                    points_adjusted = player_standing['pointsAdjusted']
-                    target_stats_dict[player_id]['total_adjusted_points'] += points_adjusted
-                    target_stats_dict[player_id]['seasons_played_count'] += 1
-
-                    if isinstance(overall_final_position_for_season, int) and 1 <= overall_final_position_for_season <= 4:
-                        target_stats_dict[player_id]['top_4_finishes'][overall_final_position_for_season] += 1
-        
-        player_map = {p['playerId']: p['name'] for p in series_data['players']}
-        tournament_id_to_week_num = {tid: i + 1 for i, tid in enumerate(series_data['tournamentIds'])}
-
-        if 'tournamentPoints' in series_data and series_data['tournamentPoints']:
-            for tournament_id_str, player_points_map_val in series_data['tournamentPoints'].items():
-                current_tournament_id = int(tournament_id_str)
-                week_num = tournament_id_to_week_num.get(current_tournament_id)
-                if week_num is None:
-                    continue
-
-                if isinstance(player_points_map_val, dict):
-                    weekly_winner_id = None
-                    max_score = -1
-                    for player_id_str, points_str in player_points_map_val.items():
-                        points = float(points_str)
-                        player_id = int(player_id_str)
-                        
-                        if target_stats_dict and player_id in target_stats_dict:
-                            target_stats_dict[player_id]['total_raw_points'] += points
-                            target_stats_dict[player_id]['total_weeks_played'] += 1
-
-                        if points > max_score:
-                            max_score = points
-                            weekly_winner_id = player_id
-
-                        if points == 35.0:
-                            player_name = player_map.get(player_id, 'Unknown Player')
-                            perfect_night_entry = {
-                                'playerId': player_id,
-                                'name': player_name,
-                                'seriesId': series_id,
-                                'seriesName': series_data['name'],
-                                'year': year,
-                                'season_name': season_name_parsed,
-                                'week_num': week_num,
-                                'league_type': 'Combined'
-                            }
-                            if "MFPinball" in league_name_parsed or "MFP" in league_name_parsed:
-                                perfect_night_entry['league_type'] = 'MFP'
-                            elif "MFLadies Pinball" in league_name_parsed or "MFLadies" in league_name_parsed:
-                                perfect_night_entry['league_type'] = 'MFLP'
-                            
-                            all_perfect_nights.append(perfect_night_entry)
-                    
-                    if weekly_winner_id and target_stats_dict and weekly_winner_id in target_stats_dict:
-                        target_stats_dict[weekly_winner_id]['weekly_wins'] += 1
-
-    for stats in list(mfp_players_stats.values()) + list(mflp_players_stats.values()):
+def finalize_player_stats(players_stats):
+    for stats in players_stats.values():
         if stats['total_weeks_played'] > 0:
             stats['average_points_per_week'] = stats['total_raw_points'] / stats['total_weeks_played']
-
+    return players_stats
+
+def league_view(league_name):
+    """Returns the leaderboard view ('mfp' or 'mflp') a league counts towards, or None."""
+    if "MFPinball" in league_name or "MFP" in league_name:
+        return 'mfp'
+    elif "Monterey Flipper Ladies Pinball" in league_name or "MFLadies" in league_name:
+        return 'mflp'
+    return None
+
+def accumulate_series(players_stats, series_data_raw, season):
+    """Adds one series to the per-player aggregates of its league."""
+    series_data = series_data_raw['data']
+
+    for player_id, player_game_stats in season['game_data']['by_player'].items():
+        if player_id not in players_stats:
+            players_stats[player_id] = new_player_stats(player_id)
+        players_stats[player_id]['total_games_won'] += player_game_stats.get('1st', 0)
+
+    for player_info in series_data.players:
+        player_id = player_info.playerId
+        ifpa_id = player_info.ifpaId
+
+        if player_id not in players_stats:
+            players_stats[player_id] = new_player_stats(player_id)
+            players_stats[player_id]['ifpaId'] = ifpa_id
+        stats = players_stats[player_id]
+        stats['name'] = player_info.name
+        if ifpa_id:
+            stats['ifpaId'] = ifpa_id
+
+        player_standing = series_data_raw['standings_by_player'].get(player_id)
+
+        overall_final_position_for_season = 'N/A'
+        if season['finals_tournament_ids']:
+            if season['finals_standings']:
+                finals_player_positions = season['finals_player_positions']
+                if player_id in finals_player_positions:
+                    overall_final_position_for_season = finals_player_positions[player_id]
+                elif player_standing:
+                    overall_final_position_for_season = player_standing.position
+        elif player_standing:
+            overall_final_position_for_season = player_standing.position
+
+        if player_standing:
+            stats['total_adjusted_points'] += player_standing.pointsAdjusted
+            stats['seasons_played_count'] += 1
+
+            if isinstance(overall_final_position_for_season, int) and 1 <= overall_final_position_for_season <= 4:
+                stats['top_4_finishes'][overall_final_position_for_season] += 1
+
+    # Weekly points only count for tournaments on the series' schedule
+    for player_id, player_points in series_data_raw['points_by_player'].items():
+        if player_id in players_stats:
+            for points in player_points['week_scores']:
+                if not math.isnan(points):
+                    players_stats[player_id]['total_raw_points'] += points
+                    players_stats[player_id]['total_weeks_played'] += 1
+
+    week_by_tournament = series_data_raw['week_by_tournament']
+    for tournament_id, winner_id in series_data_raw['weekly_winners'].items():
+        if tournament_id in week_by_tournament and winner_id and winner_id in players_stats:
+            players_stats[winner_id]['weekly_wins'] += 1
+
+def find_perfect_nights(series_data_raw, season):
+    """Lists the perfect nights scored in the scheduled weeks of a series."""
+    series_data = series_data_raw['data']
+    league_type = {'mfp': 'MFP', 'mflp': 'MFLP'}.get(league_view(season['league_name']), 'Combined')
+    perfect_nights = []
+    for tournament_id, player_id in series_data_raw['perfect_scores']:
+        week_num = series_data_raw['week_by_tournament'].get(tournament_id)
+        if week_num is None:
+            continue
+        perfect_nights.append({
+            'playerId': player_id,
+            'name': get_player_name(series_data_raw, player_id),
+            'seriesId': series_data.seriesId,
+            'seriesName': series_data.name,
+            'year': season['year'],
+            'season_name': season['season_name'],
+            'week_num': week_num,
+            'league_type': league_type
+        })
+    return perfect_nights
+
+def series_contribution(series_data_raw, season):
+    """Aggregates one series on its own: the league view it counts towards, its per-player stats and its perfect nights."""
+    view = league_view(season['league_name'])
+    players_stats = {}
+    if view is not None:
+        accumulate_series(players_stats, series_data_raw, season)
+    return {
+        'view': view,
+        'players': players_stats,
+        'perfect_nights': find_perfect_nights(series_data_raw, season)
+    }
+
+def decode_contribution(contribution):
+    """Restores the integer keys JSON turned into strings in a stored contribution."""
+    players = {}
+    for player_id, stats in contribution['players'].items():
+        stats['top_4_finishes'] = {int(position): count for position, count in stats['top_4_finishes'].items()}
+        players[int(player_id)] = stats
+    return {**contribution, 'players': players}
+
+def fold_contributions(contributions):
+    """
+    Folds per-series contributions, in the order the series were loaded, into the all-time
+    per-player stats of every league view and the list of perfect nights.
+    """
+    players_stats = {'mfp': {}, 'mflp': {}}
+    all_perfect_nights = []
+    for contribution in contributions:
+        if contribution['view'] is not None:
+            totals = players_stats[contribution['view']]
+            for player_id, stats in contribution['players'].items():
+                if player_id in totals:
+                    totals[player_id] = merge_player_entries(totals[player_id], stats, later=True)
+                else:
+                    totals[player_id] = dict(stats)
+        all_perfect_nights.extend(contribution['perfect_nights'])
+
+    finalize_player_stats(players_stats['mfp'])
+    finalize_player_stats(players_stats['mflp'])
+    players_stats['combined'] = finalize_player_stats(merge_player_stats(players_stats['mfp'], players_stats['mflp']))
     all_perfect_nights.sort(key=lambda x: (x['seriesId'], x['week_num']))
-
-    mfp_leaderboard_data = list(mfp_players_stats.values())
-    mfp_total_points_leaderboard = sorted(mfp_leaderboard_data, key=lambda x: x['total_raw_points'], reverse=True)[:25]
-    mfp_top_4_finishes_leaderboard = sorted([p for p in mfp_leaderboard_data if sum(p['top_4_finishes'].values()) > 0], key=lambda x: (x['top_4_finishes'][1], x['top_4_finishes'][2], x['top_4_finishes'][3], x['top_4_finishes'][4]), reverse=True)
-
-    mflp_leaderboard_data = list(mflp_players_stats.values())
-    mflp_total_points_leaderboard = sorted(mflp_leaderboard_data, key=lambda x: x['total_raw_points'], reverse=True)[:25]
-    mflp_top_4_finishes_leaderboard = sorted([p for p in mflp_leaderboard_data if sum(p['top_4_finishes'].values()) > 0], key=lambda x: (x['top_4_finishes'][1], x['top_4_finishes'][2], x['top_4_finishes'][3], x['top_4_finishes'][4]), reverse=True)
-
-    combined_players_stats = deepcopy(mfp_players_stats)
-    for player_id, stats in mflp_players_stats.items():
-        if player_id in combined_players_stats:
-            combined_players_stats[player_id]['total_adjusted_points'] += stats['total_adjusted_points']
-            combined_players_stats[player_id]['total_raw_points'] += stats['total_raw_points']
-            combined_players_stats[player_id]['seasons_played_count'] += stats['seasons_played_count']
-            combined_players_stats[player_id]['total_weeks_played'] += stats['total_weeks_played']
-            combined_players_stats[player_id]['weekly_wins'] += stats['weekly_wins']
-            combined_players_stats[player_id]['total_games_won'] += stats.get('total_games_won', 0)
-            for i in range(1, 5):
-                combined_players_stats[player_id]['top_4_finishes'][i] += stats['top_4_finishes'][i]
+    return players_stats, all_perfect_nights
+
+def aggregates_differences(aggregates, expected):
+    """Describes where two (players_stats, perfect_nights) results differ; empty if they match."""
+    (players_stats, perfect_nights), (expected_stats, expected_nights) = aggregates, expected
+    differences = []
+    for view in LEAGUE_VIEWS:
+        if list(players_stats[view]) != list(expected_stats[view]):
+            differences.append(f"{view}: players differ")
+            continue
+        for player_id, stats in expected_stats[view].items():
+            if players_stats[view][player_id] != stats:
+                differences.append(f"{view}: player {player_id} differs")
+    if perfect_nights != expected_nights:
+        differences.append("perfect nights differ")
+    return differences
+
+def load_leaderboard_aggregates(writer, league_model, verify=False):
+    """
+    Returns the all-time (players_stats, perfect_nights). Series whose inputs are unchanged
+    since the last build reuse their contribution from the aggregate store; only new or
+    changed series (normally just the current season) are aggregated again. A missing or
+    unreadable store makes this a full rebuild. With verify=True the result is also
+    computed from scratch, and on a mismatch the from-scratch result is used and stored.
+    """
+    store = load_aggregate_store()
+    entries = {}
+    contributions = []
+    reused = 0
+    for series_data_raw in league_model['all_series_data']:
+        series_id = series_data_raw['data'].seriesId
+        season = league_model['seasons_by_id'][series_id]
+        fingerprint = series_fingerprint(writer, season)
+        entry = store.get(series_id)
+        if entry and entry.get('fingerprint') == fingerprint:
+            contributions.append(decode_contribution(entry['contribution']))
+            reused += 1
         else:
-            combined_players_stats[player_id] = stats
-    
-    for stats in combined_players_stats.values():
-        if stats['total_weeks_played'] > 0:
-            stats['average_points_per_week'] = stats['total_raw_points'] / stats['total_weeks_played']
-
-    combined_leaderboard_data = list(combined_players_stats.values())
-    combined_total_points_leaderboard = sorted(combined_leaderboard_data, key=lambda x: x['total_raw_points'], reverse=True)[:25]
-    combined_top_4_finishes_leaderboard = sorted([p for p in combined_leaderboard_data if sum(p['top_4_finishes'].values()) > 0], key=lambda x: (x['top_4_finishes'][1], x['top_4_finishes'][2], x['top_4_finishes'][3], x['top_4_finishes'][4]), reverse=True)
+            contribution = series_contribution(series_data_raw, season)
+            entry = {'fingerprint': fingerprint, 'contribution': contribution}
+            contributions.append(contribution)
+        entries[series_id] = entry
+    print(f"Leaderboard aggregates: {len(contributions) - reused} series aggregated, {reused} reused from {AGGREGATE_STORE_PATH}")
+
+    aggregates = fold_contributions(contributions)
+    if verify:
+        fresh_contributions = [
+            series_contribution(series_data_raw, league_model['seasons_by_id'][series_data_raw['data'].seriesId])
+            for series_data_raw in league_model['all_series_data']
+        ]
+        expected = fold_contributions(fresh_contributions)
+        differences = aggregates_differences(aggregates, expected)
+        if differences:
+            print(f"WARNING: Stored leaderboard aggregates do not match a full rebuild ({'; '.join(differences[:10])}). Using the rebuilt aggregates.")
+            for entry, contribution in zip(entries.values(), fresh_contributions):
+                entry['contribution'] = contribution
+            aggregates = expected
+        else:
+            print("Leaderboard aggregates match a full rebuild.")
+
+    save_aggregate_store(entries)
+    return aggregates
+
+def best_improvement(player_info, seasons_sorted):
+    """
+    Finds a player's largest adjusted-points improvement between two consecutive seasons
+    (both with at least MIN_WEEKS_FOR_IMPROVEMENT weeks played), or None.
+    """
+    best = {'player': player_info, 'improvement_percent': -1, 'season1': None, 'season2': None}
+    for season1, season2 in zip(seasons_sorted, seasons_sorted[1:]):
+        score1 = season1['summary_stats']['total_adjusted_points']
+        score2 = season2['summary_stats']['total_adjusted_points']
+        weeks_played1 = season1['summary_stats']['weeks_played']
+        weeks_played2 = season2['summary_stats']['weeks_played']
+
+        if (weeks_played1 >= MIN_WEEKS_FOR_IMPROVEMENT and weeks_played2 >= MIN_WEEKS_FOR_IMPROVEMENT and score1 > 0 and score2 > score1):
+            improvement = (score2 - score1) / score1
+            if improvement > best['improvement_percent']:
+                best.update({'improvement_percent': improvement, 'season1': season1, 'season2': season2})
+    return best if best['improvement_percent'] > -1 else None
+
+def view_seasons(player_data, view):
+    """A player's seasons counted by a league view, oldest first."""
+    if view == 'combined':
+        seasons = player_data['mfp_seasons'] + player_data['mflp_seasons']
+    else:
+        seasons = player_data[f'{view}_seasons']
+    return sorted(seasons, key=lambda x: x['seriesId'])
+
+def generate_leaderboards_page(writer, league_model, verify_aggregates=False):
+    """
+    Generates the all-time leaderboards page, separated by league type. With
+    verify_aggregates=True the stored aggregates are checked against a full rebuild.
+    """
+    print("Generating leaderboards.html...")
 
-    mfp_most_improved_leaderboard, mflp_most_improved_leaderboard, combined_most_improved_leaderboard = [], [], []
-    mfp_top_seasons, mflp_top_seasons, combined_top_seasons = [], [], []
+    players_stats, all_perfect_nights = load_leaderboard_aggregates(writer, league_model, verify=verify_aggregates)
 
-    for player_id, player_data in player_categorized_seasons.items():
+    top_seasons = {view: [] for view in LEAGUE_VIEWS}
+    most_improved = {view: [] for view in LEAGUE_VIEWS}
+    for player_data in league_model['player_categorized_seasons'].values():
         player_info = player_data['player_info']
-        
-        mfp_seasons_sorted = sorted(player_data['mfp_seasons'], key=lambda x: x['seriesId'])
-        best_mfp_improvement = {'player': player_info, 'improvement_percent': -1, 'season1': None, 'season2': None}
-        for i, season in enumerate(mfp_seasons_sorted):
-            if i > 0:
-                season1 = mfp_seasons_sorted[i-1]
-                season2 = season
-                score1 = season1['summary_stats']['total_adjusted_points']
-                score2 = season2['summary_stats']['total_adjusted_points']
-                weeks_played1 = season1['summary_stats']['weeks_played']
-                weeks_played2 = season2['summary_stats']['weeks_played']
-
-                if (weeks_played1 >= MIN_WEEKS_FOR_IMPROVEMENT and weeks_played2 >= MIN_WEEKS_FOR_IMPROVEMENT and score1 > 0 and score2 > score1):
-                    improvement = (score2 - score1) / score1
-                    if improvement > best_mfp_improvement['improvement_percent']:
-                        best_mfp_improvement.update({'improvement_percent': improvement, 'season1': season1, 'season2': season2})
-            
-            mfp_top_seasons.append({'player': player_info, 'season': season, 'score': season['summary_stats']['total_adjusted_points'], 'game_outcomes': season['summary_stats']['game_outcomes'], 'weekly_wins': season['summary_stats']['weekly_wins']})
-
-        if best_mfp_improvement['improvement_percent'] > -1:
-            mfp_most_improved_leaderboard.append(best_mfp_improvement)
-
-        mflp_seasons_sorted = sorted(player_data['mflp_seasons'], key=lambda x: x['seriesId'])
-        best_mflp_improvement = {'player': player_info, 'improvement_percent': -1, 'season1': None, 'season2': None}
-        for i, season in enumerate(mflp_seasons_sorted):
-            if i > 0:
-                season1 = mflp_seasons_sorted[i-1]
-                season2 = season
-                score1 = season1['summary_stats']['total_adjusted_points']
-                score2 = season2['summary_stats']['total_adjusted_points']
-                weeks_played1 = season1['summary_stats']['weeks_played']
-                weeks_played2 = season2['summary_stats']['weeks_played']
-
-                if (weeks_played1 >= MIN_WEEKS_FOR_IMPROVEMENT and weeks_played2 >= MIN_WEEKS_FOR_IMPROVEMENT and score1 > 0 and score2 > score1):
-                    improvement = (score2 - score1) / score1
-                    if improvement > best_mflp_improvement['improvement_percent']:
-                        best_mflp_improvement.update({'improvement_percent': improvement, 'season1': season1, 'season2': season2})
-
-            mflp_top_seasons.append({'player': player_info, 'season': season, 'score': season['summary_stats']['total_adjusted_points'], 'game_outcomes': season['summary_stats']['game_outcomes'], 'weekly_wins': season['summary_stats']['weekly_wins']})
-
-        if best_mflp_improvement['improvement_percent'] > -1:
-            mflp_most_improved_leaderboard.append(best_mflp_improvement)
-
-        all_seasons_sorted = sorted(player_data['mfp_seasons'] + player_data['mflp_seasons'], key=lambda x: x['seriesId'])
-        best_combined_improvement = {'player': player_info, 'improvement_percent': -1, 'season1': None, 'season2': None}
-        for i, season in enumerate(all_seasons_sorted):
-            if i > 0:
-                season1 = all_seasons_sorted[i-1]
-                season2 = season
-                score1 = season1['summary_stats']['total_adjusted_points']
-                score2 = season2['summary_stats']['total_adjusted_points']
-                weeks_played1 = season1['summary_stats']['weeks_played']
-                weeks_played2 = season2['summary_stats']['weeks_played']
-
-                if (weeks_played1 >= MIN_WEEKS_FOR_IMPROVEMENT and weeks_played2 >= MIN_WEEKS_FOR_IMPROVEMENT and score1 > 0 and score2 > score1):
-                    improvement = (score2 - score1) / score1
-                    if improvement > best_combined_improvement['improvement_percent']:
-                        best_combined_improvement.update({'improvement_percent': improvement, 'season1': season1, 'season2': season2})
-
-            combined_top_seasons.append({'player': player_info, 'season': season, 'score': season['summary_stats']['total_adjusted_points'], 'game_outcomes': season['summary_stats']['game_outcomes'], 'weekly_wins': season['summary_stats']['weekly_wins']})
-
-        if best_combined_improvement['improvement_percent'] > -1:
-            combined_most_improved_leaderboard.append(best_combined_improvement)
-
-    mfp_most_improved_leaderboard.sort(key=lambda x: x['improvement_percent'], reverse=True)
-    mflp_most_improved_leaderboard.sort(key=lambda x: x['improvement_percent'], reverse=True)
-    combined_most_improved_leaderboard.sort(key=lambda x: x['improvement_percent'], reverse=True)
-
-    mfp_top_seasons.sort(key=lambda x: x['score'], reverse=True)
-    mflp_top_seasons.sort(key=lambda x: x['score'], reverse=True)
-    combined_top_seasons.sort(key=lambda x: x['score'], reverse=True)
-
-    template = env.get_template('leaderboards.html')
-    with open(os.path.join(OUTPUT_DIR, 'leaderboards.html'), 'w') as f:
-        f.write(template.render(
-            mfp_total_points_leaderboard=mfp_total_points_leaderboard[:25],
-            mfp_top_4_finishes_leaderboard=mfp_top_4_finishes_leaderboard,
-            mfp_top_seasons_leaderboard=mfp_top_seasons[:25],
-            mfp_most_improved_leaderboard=mfp_most_improved_leaderboard[:25],
-            mflp_total_points_leaderboard=mflp_total_points_leaderboard[:25],
-            mflp_top_4_finishes_leaderboard=mflp_top_4_finishes_leaderboard,
-            mflp_top_seasons_leaderboard=mflp_top_seasons[:25],
-            mflp_most_improved_leaderboard=mflp_most_improved_leaderboard[:25],
-            combined_total_points_leaderboard=combined_total_points_leaderboard[:25],
-            combined_top_4_finishes_leaderboard=combined_top_4_finishes_leaderboard,
-            combined_top_seasons_leaderboard=combined_top_seasons[:25],
-            combined_most_improved_leaderboard=combined_most_improved_leaderboard[:25],
-            all_perfect_nights=all_perfect_nights,
-            all_almost_perfect_nights=all_almost_perfect_nights
-        ))
-    print("Generated leaderboards.html")
+        for view in LEAGUE_VIEWS:
+            seasons_sorted = view_seasons(player_data, view)
+            improvement = best_improvement(player_info, seasons_sorted)
+            if improvement:
+                most_improved[view].append(improvement)
+            for season in seasons_sorted:
+                top_seasons[view].append({
+                    'player': player_info,
+                    'season': season,
+                    'score': season['summary_stats']['total_adjusted_points'],
+                    'game_outcomes': season['summary_stats']['game_outcomes'],
+                    'weekly_wins': season['summary_stats']['weekly_wins']
+                })
+
+    leaderboards = {}
+    for view in LEAGUE_VIEWS:
+        rows = list(players_stats[view].values())
+        for name, key, row_filter, size in PLAYER_RANKINGS:
+            leaderboards[f'{view}_{name}'] = top_k([row for row in rows if row_filter is None or row_filter(row)], key, size)
+        leaderboards[f'{view}_top_seasons_leaderboard'] = top_k(top_seasons[view], lambda x: x['score'], LEADERBOARD_SIZE)
+        leaderboards[f'{view}_most_improved_leaderboard'] = top_k(most_improved[view], lambda x: x['improvement_percent'], LEADERBOARD_SIZE)
+
+    writer.render(
+        'leaderboards.html', 'leaderboards.html', league_model['source_files'] + ['series_index'],
+        all_perfect_nights=all_perfect_nights,
+        all_almost_perfect_nights=league_model['almost_perfect_nights'],
+        **leaderboards
+    )
@@ -0,0 +1,237 @@
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from jinja2 import meta
+
+from config import BUILD_MANIFEST_PATH
+from data_store import input_signature
+from page_generators.assets import HtmlMinifier, write_atomic, WRITE_BUFFER_SIZE
+
+# Python sources whose changes can alter any rendered page.
+CODE_SOURCES_DIRS = [os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                     os.path.dirname(os.path.abspath(__file__))]
+
+def _page_chunks(env, template_name, context, minifier, sizes):
+    """
+    Streams a template with Jinja's generate() and yields the page as UTF-8 chunks of about
+    WRITE_BUFFER_SIZE, minified if a minifier is given. Adds the unminified size to sizes.
+    """
+    buffer, buffered = [], 0
+    for text in env.get_template(template_name).generate(**context):
+        buffer.append(text)
+        buffered += len(text)
+        if buffered < WRITE_BUFFER_SIZE:
+            continue
+        chunk = ''.join(buffer)
+        buffer, buffered = [], 0
+        sizes['rendered'] += len(chunk.encode('utf-8'))
+        yield (minifier.feed(chunk) if minifier else chunk).encode('utf-8')
+    chunk = ''.join(buffer)
+    sizes['rendered'] += len(chunk.encode('utf-8'))
+    yield (minifier.feed(chunk) + minifier.close() if minifier else chunk).encode('utf-8')
+
+def _render_to_file(env, template_name, output_path, context, minify=False):
+    """
+    Renders a page straight to output_path (atomically, minified if requested) without holding
+    the whole page in memory. Returns its (rendered, written) size in bytes.
+    """
+    sizes = {'rendered': 0}
+    minifier = HtmlMinifier() if minify else None
+    written_size = write_atomic(output_path, _page_chunks(env, template_name, context, minifier, sizes))
+    return sizes['rendered'], written_size
+
+# Jinja environment of a render worker process, created once by _init_render_worker
+_worker_env = None
+
+def _init_render_worker(env_factory, env_args):
+    global _worker_env
+    _worker_env = env_factory(*env_args)
+
+def _render_in_worker(template_name, output_path, context, minify):
+    return _render_to_file(_worker_env, template_name, output_path, context, minify)
+
+class PageWriter:
+    """
+    Renders templates to files in the output directory and records, for every page,
+    the signatures of the inputs it was rendered from: data files, the template and
+    everything it extends/includes, and the site's Python code.
+
+    In incremental mode a page whose recorded inputs are unchanged (and whose output
+    file still exists) is not re-rendered, so its file stays byte-identical. Pages (and
+    files from write_file) that were produced by the previous build but not by this one are
+    removed in finish().
+
+    With jobs > 1 pages are rendered by a pool of worker processes, each building its own
+    environment from env_factory(*env_args); render() then only queues the page and
+    finish() waits for all of them.
+
+    Pages are streamed to disk as they render and replace their file only once complete.
+    With minify, rendered pages are minified as they are written. Names in common_inputs
+    are virtual inputs that every page depends on (e.g. the fingerprints of the static files).
+    """
+
+    def __init__(self, output_dir, env_factory, env_args=(), incremental=False, virtual_inputs=None, jobs=1,
+                 minify=False, common_inputs=()):
+        self.env = env_factory(*env_args)
+        self.output_dir = output_dir
+        self.incremental = incremental
+        self.minify = minify
+        self.common_inputs = list(common_inputs)
+        self.executor = None
+        self.pending = []
+        if jobs > 1:
+            self.executor = ProcessPoolExecutor(
+                max_workers=jobs, initializer=_init_render_worker, initargs=(env_factory, env_args)
+            )
+        # Named inputs that are not files, e.g. a signature of the list of series
+        # (the year corrections for one season depend on which other seasons exist).
+        self.virtual_inputs = dict(virtual_inputs or {})
+        self.manifest_path = BUILD_MANIFEST_PATH
+        self.previous_manifest = self._load_manifest() if incremental else {}
+        self.manifest = {}
+        self.rendered_count = 0
+        self.skipped_count = 0
+        self.bytes_written = 0
+        # Size of the pages rendered by this build before and after minification
+        self.bytes_rendered = 0
+        self.bytes_minified = 0
+        self._file_signatures = {}
+        self._template_signatures = {}
+        self._code_signature = None
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def file_signature(self, path):
+        """Returns the content hash of an input file, or 'missing' if it does not exist."""
+        if path not in self._file_signatures:
+            self._file_signatures[path] = input_signature(path)
+        return self._file_signatures[path]
+
+    def template_signature(self, template_name):
+        """Hashes a template together with every template it extends, includes or imports."""
+        if template_name not in self._template_signatures:
+            digest = hashlib.sha1()
+            pending, seen = [template_name], set()
+            while pending:
+                name = pending.pop()
+                if name in seen:
+                    continue
+                seen.add(name)
+                source, _, _ = self.env.loader.get_source(self.env, name)
+                digest.update(name.encode('utf-8'))
+                digest.update(source.encode('utf-8'))
+                referenced = meta.find_referenced_templates(self.env.parse(source))
+                pending.extend(sorted(ref for ref in referenced if ref))
+            self._template_signatures[template_name] = digest.hexdigest()
+        return self._template_signatures[template_name]
+
+    def code_signature(self):
+        """Hashes the Python sources of the site generator."""
+        if self._code_signature is None:
+            digest = hashlib.sha1()
+            for directory in CODE_SOURCES_DIRS:
+                for filename in sorted(os.listdir(directory)):
+                    if filename.endswith('.py'):
+                        with open(os.path.join(directory, filename), 'rb') as f:
+                            digest.update(filename.encode('utf-8'))
+                            digest.update(f.read())
+            self._code_signature = digest.hexdigest()
+        return self._code_signature
+
+    def input_signatures(self, template_name, inputs):
+        signatures = {
+            'code': self.code_signature(),
+            f"template:{template_name}": self.template_signature(template_name)
+        }
+        for name in self.common_inputs + list(inputs):
+            if name in self.virtual_inputs:
+                signatures[name] = self.virtual_inputs[name]
+            else:
+                signatures[name] = self.file_signature(name)
+        return signatures
+
+    def is_up_to_date(self, output_name, signatures):
+        previous = self.previous_manifest.get(output_name)
+        return (
+            previous is not None
+            and previous.get('inputs') == signatures
+            and os.path.exists(os.path.join(self.output_dir, output_name))
+        )
+
+    def render_to_file(self, template_name, output_path, context):
+        """Renders a page to its file (serial mode)."""
+        self._count_page_bytes(*_render_to_file(self.env, template_name, output_path, context, self.minify))
+
+    def _count_page_bytes(self, rendered_size, written_size):
+        self.bytes_rendered += rendered_size
+        self.bytes_minified += written_size
+        self.bytes_written += written_size
+
+    def render(self, template_name, output_name, inputs, **context):
+        """
+        Renders template_name with context into output_name unless, in incremental mode,
+        none of its inputs changed since the last build. Returns True if the page was written.
+        """
+        signatures = self.input_signatures(template_name, inputs)
+        self.manifest[output_name] = {'inputs': signatures}
+
+        if self.incremental and self.is_up_to_date(output_name, signatures):
+            self.skipped_count += 1
+            return False
+
+        output_path = os.path.join(self.output_dir, output_name)
+        if self.executor:
+            self.pending.append((output_name, self.executor.submit(_render_in_worker, template_name, output_path, context, self.minify)))
+        else:
+            self.render_to_file(template_name, output_path, context)
+            print(f"Generated {output_name}")
+        self.rendered_count += 1
+        return True
+
+    def write_file(self, output_name, data):
+        """
+        Writes generated bytes that are not a rendered template (e.g. a JSON data shard) to
+        output_name unless, in incremental mode, it already holds the same content. Returns
+        True if the file was written.
+        """
+        signatures = {'content': hashlib.sha1(data).hexdigest()}
+        self.manifest[output_name] = {'inputs': signatures}
+
+        if self.incremental and self.is_up_to_date(output_name, signatures):
+            return False
+
+        output_path = os.path.join(self.output_dir, output_name)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        self.bytes_written += write_atomic(output_path, [data])
+        return True
+
+    def finish(self):
+        """
+        Waits for pages still rendering in worker processes, removes pages the previous build
+        produced but this one did not, and saves the manifest.
+        """
+        if self.executor:
+            try:
+                for output_name, future in self.pending:
+                    self._count_page_bytes(*future.result())
+                    print(f"Generated {output_name}")
+            finally:
+                self.executor.shutdown()
+            self.pending = []
+        for output_name in self.previous_manifest:
+            if output_name not in self.manifest:
+                stale_path = os.path.join(self.output_dir, output_name)
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+                    print(f"Removed stale page {output_name}")
+
+        encoder = json.JSONEncoder(indent=4, sort_keys=True)
+        write_atomic(self.manifest_path, (chunk.encode('utf-8') for chunk in encoder.iterencode(self.manifest)))
+
+        if self.incremental:
+            print(f"Incremental build: {self.rendered_count} pages rendered, {self.skipped_count} unchanged")
@@ -0,0 +1,85 @@
+import re
+import json
+import unicodedata
+
+from page_generators.assets import content_hash, fingerprinted_name
+
+# Prebuilt search index of the players list.
+#
+# The players page embeds only a small manifest and the first page of players. The index
+# itself is written as content-hashed JSON files that the page fetches when they are needed:
+#   - records.{hash}.json: [playerId, name, seasons, weeks played, weekly wins] per player,
+#     sorted by normalized name, so any page of the list is a slice of it;
+#   - keys_{c}.{hash}.json: for the search keys starting with character c, the positions of
+#     the records whose name contains them. A name's keys are the trigrams of its words.
+# A query term of 3 or more characters only loads the key shards of its own trigrams; shorter
+# terms are matched as substrings by scanning the records. Names are normalized (marks
+# removed, lowercase, anything but letters and digits as word separators) in the same way by
+# normalize_name here and by the page's script.
+
+SEARCH_INDEX_DIR = 'search'
+
+def normalize_name(name):
+    # Same steps as the page's normalizeName: NFKD, drop marks (\p{M}), lowercase, and
+    # anything but letters and digits (\p{L}, \p{N}) becomes a word separator
+    decomposed = unicodedata.normalize('NFKD', name)
+    stripped = ''.join(char for char in decomposed if not unicodedata.category(char).startswith('M'))
+    return re.sub(r'[\W_]+', ' ', stripped.lower()).strip()
+
+def name_keys(normalized_name):
+    """Returns the search keys of a normalized name: the trigrams of its words."""
+    keys = set()
+    for word in normalized_name.split():
+        keys.update(word[i:i + 3] for i in range(len(word) - 2))
+    return keys
+
+def _player_record(player_id, data):
+    seasons = data['mfp_seasons'] + data['mflp_seasons']
+    return [
+        player_id,
+        data['player_info'].name,
+        len(seasons),
+        sum(season['summary_stats']['weeks_played'] for season in seasons),
+        int(sum(season['summary_stats']['weekly_wins'] for season in seasons))
+    ]
+
+def build_player_search_index(player_categorized_seasons):
+    """Returns (records, keys): the player records sorted by normalized name and {key: [record positions]}."""
+    records = sorted(
+        (_player_record(player_id, data) for player_id, data in player_categorized_seasons.items()),
+        key=lambda record: (normalize_name(record[1]), record[0])
+    )
+    keys = {}
+    for position, record in enumerate(records):
+        for key in name_keys(normalize_name(record[1])):
+            keys.setdefault(key, []).append(position)
+    return records, keys
+
+def _compact_json(data):
+    return json.dumps(data, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+def _write_hashed(writer, name, data):
+    """Writes data as {SEARCH_INDEX_DIR}/{name}.{content hash}.json and returns the hash."""
+    data_hash = content_hash(data)
+    writer.write_file(fingerprinted_name(f"{SEARCH_INDEX_DIR}/{name}.json", data_hash), data)
+    return data_hash
+
+def write_player_search_index(writer, player_categorized_seasons, page_size):
+    """
+    Writes the search index files and returns (manifest, first page of records). The manifest
+    is embedded in players.html and names the files the page loads.
+    """
+    records, keys = build_player_search_index(player_categorized_seasons)
+
+    shards = {}
+    for key, positions in keys.items():
+        shards.setdefault(key[0], {})[key] = positions
+
+    manifest = {
+        'dir': SEARCH_INDEX_DIR,
+        'page_size': page_size,
+        'total': len(records),
+        'records': _write_hashed(writer, 'records', _compact_json(records)),
+        'keys': {char: _write_hashed(writer, f"keys_{char}", _compact_json(shard)) for char, shard in sorted(shards.items())}
+    }
+    return manifest, records[:page_size]
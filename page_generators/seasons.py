@@ -1,38 +1,34 @@
-import os
+import math
 from collections import defaultdict
-from data_processor import load_finals_mapping, parse_series_name, apply_year_corrections_to_seasons_list, process_game_data
-from api_client import fetch_finals_results, fetch_tournament_games
-from config import OUTPUT_DIR
+from data_processor import empty_game_outcomes, get_player_name, get_player_points
 from page_generators.helpers import get_qualification_threshold
 
-def generate_seasons_page(env, all_series_data):
+def sort_standings_by_average(series_data_raw):
+    """Orders a series' qualifying standings by position, breaking ties on average points per week."""
+    standings_with_avg = [
+        {'playerId': standing.playerId, 'position': standing.position,
+         'avg_score': get_player_points(series_data_raw, standing.playerId)['average_points_per_week']}
+        for standing in series_data_raw['data'].standings
+    ]
+    return sorted(standings_with_avg, key=lambda x: (x['position'], -x['avg_score']))
+
+def generate_seasons_page(writer, league_model):
     """Generates the seasons.html page, separated by league type."""
     print("Generating seasons.html...")
-    template = env.get_template('seasons.html')
 
-    mfp_seasons_raw = []
-    mflp_seasons_raw = []
-    finals_mapping = load_finals_mapping()
+    mfp_seasons = []
+    mflp_seasons = []
     all_years = set()
 
-    series_data_map = {s['data']['seriesId']: s for s in all_series_data}
-
-    for series_data_raw in all_series_data:
-        series = series_data_raw['data']
-        series_id = series['seriesId']
-        series_name = series['name']
-        
-        year, season_name_parsed, league_name_parsed = parse_series_name(series_name)
-        all_years.add(year)
-
+    for season in league_model['seasons']:
         season_entry = {
-            'seriesId': series_id,
-            'seriesName': series_name,
-            'year': year,
-            'season_name': season_name_parsed,
-            'league_name': league_name_parsed,
-            'status': series['status'],
-            'has_finals': "No",
+            'seriesId': season['seriesId'],
+            'seriesName': season['seriesName'],
+            'year': season['year'],
+            'season_name': season['season_name'],
+            'league_name': season['league_name'],
+            'status': season['status'],
+            'has_finals': season['has_finals'],
             'first_place_player': None,
             'second_place_player': None,
             'third_place_player': None,
@@ -40,239 +36,153 @@ def generate_seasons_page(env, all_series_data):
             'qualified_players_count': 0,
             'qualification_threshold': 0
         }
-
-        if "MFPinball" in league_name_parsed or "MFP" in league_name_parsed:
-            mfp_seasons_raw.append(season_entry)
-        elif "Monterey Flipper Ladies Pinball" in league_name_parsed or "MFLadies" in league_name_parsed:
-            mflp_seasons_raw.append(season_entry)
-    
-    mfp_seasons = apply_year_corrections_to_seasons_list(mfp_seasons_raw)
-    mflp_seasons = apply_year_corrections_to_seasons_list(mflp_seasons_raw)
-
-    for season_list in [mfp_seasons, mflp_seasons]:
-        for season_entry in season_list:
-            league_name = season_entry['league_name']
-            year = season_entry['year']
-            season_name = season_entry['season_name']
-            series_id = season_entry['seriesId']
-            all_years.add(year)
-
-            finals_tournament_ids = None
-            if league_name in finals_mapping and year != "N/A" and season_name != "N/A":
-                key = f"{season_name} {year}"
-                finals_tournament_ids = finals_mapping[league_name].get(key)
-            
-            season_entry['has_finals'] = "Yes" if finals_tournament_ids else "No"
-            
-            original_series_data_for_top4 = series_data_map.get(series_id)
-            if original_series_data_for_top4:
-                series_details = original_series_data_for_top4['data']
-                player_map = {p['playerId']: p['name'] for p in series_details['players']}
-                
-                top_players_standings = []
-                if season_entry['has_finals'] == "Yes" and finals_tournament_ids:
-                    finals_standings = fetch_finals_results(finals_tournament_ids)
-                    if finals_standings:
-                        for result in finals_standings:
-                            top_players_standings.append({
-                                'playerId': result['playerId'],
-                                'name': player_map.get(result['playerId'], 'Unknown Player'),
-                                'position': result['position']
-                            })
-                        top_players_standings.sort(key=lambda x: x['position'])
-                    else:
-                        print(f"WARNING: Finals data for Season: {season_entry['seriesName']} (ID: {series_id}) is empty. Falling back to qualifying standings.")
-                        standings_with_avg = []
-                        for standing in series_details['standings']:
-                            player_id = standing['playerId']
-                            total_raw_points = 0
-                            weeks_played = 0
-                            if 'tournamentPoints' in series_details:
-                                for tournament_id_str, player_points_map in series_details['tournamentPoints'].items():
-                                    if str(player_id) in player_points_map:
-                                        total_raw_points += float(player_points_map[str(player_id)])
-                                        weeks_played += 1
-                            
-                            avg_score = total_raw_points / weeks_played if weeks_played > 0 else 0
-                            standings_with_avg.append({**standing, 'avg_score': avg_score})
-
-                        top_players_standings = sorted(standings_with_avg, key=lambda x: (x['position'], -x['avg_score']))
-                else:
-                    standings_with_avg = []
-                    for standing in series_details['standings']:
-                        player_id = standing['playerId']
-                        total_raw_points = 0
-                        weeks_played = 0
-                        if 'tournamentPoints' in series_details:
-                            for tournament_id_str, player_points_map in series_details['tournamentPoints'].items():
-                                if str(player_id) in player_points_map:
-                                    total_raw_points += float(player_points_map[str(player_id)])
-                                    weeks_played += 1
-                        
-                        avg_score = total_raw_points / weeks_played if weeks_played > 0 else 0
-                        standings_with_avg.append({**standing, 'avg_score': avg_score})
-
-                    top_players_standings = sorted(standings_with_avg, key=lambda x: (x['position'], -x['avg_score']))
-
-                for i, player_data in enumerate(top_players_standings[:4]):
-                    player_id = player_data['playerId']
-                    player_name = player_map.get(player_id, 'Unknown Player')
-                    if i == 0:
-                        season_entry['first_place_player'] = {'playerId': player_id, 'name': player_name}
-                    elif i == 1:
-                        season_entry['second_place_player'] = {'playerId': player_id, 'name': player_name}
-                    elif i == 2:
-                            season_entry['third_place_player'] = {'playerId': player_id, 'name': player_name}
-                    elif i == 3:
-                        season_entry['fourth_place_player'] = {'playerId': player_id, 'name': player_name}
-
-                qualification_threshold = get_qualification_threshold(year, season_name)
-                season_entry['qualification_threshold'] = qualification_threshold
-                qualified_player_ids = set()
-                for player_info in series_details['players']:
-                    player_id = player_info['playerId']
-                    weeks_played = 0
-                    if 'tournamentPoints' in series_details:
-                        for tournament_id_str, player_points_map in series_details['tournamentPoints'].items():
-                            if str(player_id) in player_points_map:
-                                weeks_played += 1
-                    if weeks_played >= qualification_threshold:
-                        qualified_player_ids.add(player_id)
-                season_entry['qualified_players_count'] = len(qualified_player_ids)
+        all_years.add(season['year'])
+
+        league_name = season_entry['league_name']
+        if "MFPinball" in league_name or "MFP" in league_name:
+            mfp_seasons.append(season_entry)
+        elif "Monterey Flipper Ladies Pinball" in league_name or "MFLadies" in league_name:
+            mflp_seasons.append(season_entry)
+        else:
+            continue
+
+        series_id = season['seriesId']
+        series_data_raw = season['original_series_data']
+        series_details = series_data_raw['data']
+
+        top_players_standings = []
+        if season['has_finals'] == "Yes":
+            finals_standings = season['finals_standings']
+            if finals_standings:
+                for result in finals_standings:
+                    top_players_standings.append({
+                        'playerId': result['playerId'],
+                        'name': get_player_name(series_data_raw, result['playerId']),
+                        'position': result['position']
+                    })
+                top_players_standings.sort(key=lambda x: x['position'])
+            else:
+                print(f"WARNING: Finals data for Season: {season_entry['seriesName']} (ID: {series_id}) is empty. Falling back to qualifying standings.")
+                top_players_standings = sort_standings_by_average(series_data_raw)
+        else:
+            top_players_standings = sort_standings_by_average(series_data_raw)
+
+        for i, player_data in enumerate(top_players_standings[:4]):
+            player_id = player_data['playerId']
+            player_name = get_player_name(series_data_raw, player_id)
+            if i == 0:
+                season_entry['first_place_player'] = {'playerId': player_id, 'name': player_name}
+            elif i == 1:
+                season_entry['second_place_player'] = {'playerId': player_id, 'name': player_name}
+            elif i == 2:
+                season_entry['third_place_player'] = {'playerId': player_id, 'name': player_name}
+            elif i == 3:
+                season_entry['fourth_place_player'] = {'playerId': player_id, 'name': player_name}
+
+        qualification_threshold = get_qualification_threshold(season_entry['year'], season_entry['season_name'])
+        season_entry['qualification_threshold'] = qualification_threshold
+        qualified_player_ids = set()
+        for player_info in series_details.players:
+            player_id = player_info.playerId
+            if get_player_points(series_data_raw, player_id)['weeks_played'] >= qualification_threshold:
+                qualified_player_ids.add(player_id)
+        season_entry['qualified_players_count'] = len(qualified_player_ids)
 
     mfp_seasons.sort(key=lambda x: x['seriesId'], reverse=True)
     mflp_seasons.sort(key=lambda x: x['seriesId'], reverse=True)
 
     sorted_years = sorted([y for y in all_years if y != "N/A"], reverse=True)
 
-    with open(os.path.join(OUTPUT_DIR, 'seasons.html'), 'w') as f:
-        f.write(template.render(
-            mfp_seasons=mfp_seasons,
-            mflp_seasons=mflp_seasons,
-            years=sorted_years
-        ))
-    print("Generated seasons.html")
+    writer.render(
+        'seasons.html', 'seasons.html', league_model['source_files'] + ['series_index'],
+        mfp_seasons=mfp_seasons,
+        mflp_seasons=mflp_seasons,
+        years=sorted_years
+    )
 
-def generate_season_pages(env, all_series_data):
+def generate_season_pages(writer, league_model):
     """Generates individual season pages."""
-    template = env.get_template('season.html')
-    finals_mapping = load_finals_mapping()
-    
-    processed_seasons_for_pages = []
-    for series_data_raw in all_series_data:
-        series = series_data_raw['data']
-        series_id = series['seriesId']
-        series_name = series['name']
-        
-        year, season_name_parsed, league_name_parsed = parse_series_name(series_name)
-        processed_seasons_for_pages.append({
-            'seriesId': series_id,
-            'seriesName': series_name,
-            'year': year,
-            'season_name': season_name_parsed,
-            'league_name': league_name_parsed,
-            'original_series_data': series_data_raw
-        })
-    
-    processed_seasons_for_pages = apply_year_corrections_to_seasons_list(processed_seasons_for_pages)
-    
-    for season_entry in processed_seasons_for_pages:
+
+    for season_entry in league_model['seasons']:
         series_id = season_entry['seriesId']
-        series = season_entry['original_series_data']['data']
-        game_data = process_game_data(season_entry['original_series_data'])
+        series_data_raw = season_entry['original_series_data']
+        series = series_data_raw['data']
+        game_data = season_entry['game_data']
+        has_finals = season_entry['has_finals']
 
-        finals_tournament_ids = None
-        if season_entry['league_name'] in finals_mapping and season_entry['year'] != "N/A" and season_entry['season_name'] != "N/A":
-            key = f"{season_entry['season_name']} {season_entry['year']}"
-            finals_tournament_ids = finals_mapping[season_entry['league_name']].get(key)
-        
-        has_finals = "Yes" if finals_tournament_ids else "No"
-        
         finals_data = {}
-        if finals_tournament_ids:
-            player_name_map = {p['playerId']: p['name'] for p in series['players']}
-            t_ids = finals_tournament_ids if isinstance(finals_tournament_ids, list) else [finals_tournament_ids]
-
-            for i, tid in enumerate(t_ids):
+        if season_entry['finals_tournament_ids']:
+            for i, games in enumerate(season_entry['finals_games']):
                 round_num = i + 1
-                games_data = fetch_tournament_games(tid, series_status=series['status'])
 
-                if games_data and games_data.get('data'):
-                    groups = defaultdict(lambda: {'arenas': set(), 'players': defaultdict(lambda: {'name': '', 'games': {}, 'total_points': 0})})
+                if games:
+                    groups = defaultdict(lambda: {'arenas': {}, 'players': defaultdict(lambda: {'name': '', 'games': {}, 'total_points': 0})})
                     tiebreakers = []
 
-                    for game in games_data['data']:
-                        arena_name = game.get('arena', {}).get('name', 'Unknown Arena')
-                        game_set = game.get('set', 0)
-                        
-                        if len(game['playerIds']) == 2:
+                    for game in games:
+                        arena_name = game.arenaName
+                        game_set = game.set
+
+                        if len(game.playerIds) == 2:
                             tiebreakers.append(game)
                             continue
 
-                        groups[game_set]['arenas'].add(arena_name)
+                        groups[game_set]['arenas'][arena_name] = None # Ordered set of arena names
 
-                        for p_idx, player_id in enumerate(game['playerIds']):
-                            groups[game_set]['players'][player_id]['name'] = player_name_map.get(player_id, 'Unknown Player')
-                            points = float(game['resultPoints'][p_idx])
+                        for p_idx, player_id in enumerate(game.playerIds):
+                            groups[game_set]['players'][player_id]['name'] = get_player_name(series_data_raw, player_id)
+                            points = game.resultPoints[p_idx]
                             groups[game_set]['players'][player_id]['games'][arena_name] = points
                             groups[game_set]['players'][player_id]['total_points'] += points
 
                     round_data = {
-                        'groups': {f'group_{k}': dict(v) for k, v in groups.items()},
+                        'groups': {
+                            f'group_{k}': {'arenas': list(v['arenas']), 'players': dict(v['players'])}
+                            for k, v in groups.items()
+                        },
                         'tiebreakers': []
                     }
 
                     for game in tiebreakers:
-                        arena_name = game.get('arena', {}).get('name', 'Unknown Arena')
-                        winner_id = game['resultPositions'][0]
-                        loser_id = game['resultPositions'][1]
+                        arena_name = game.arenaName
+                        winner_id = game.resultPositions[0]
+                        loser_id = game.resultPositions[1]
                         round_data['tiebreakers'].append({
-                            'winner': player_name_map.get(winner_id, 'Unknown'),
-                            'loser': player_name_map.get(loser_id, 'Unknown'),
+                            'winner': get_player_name(series_data_raw, winner_id, 'Unknown'),
+                            'loser': get_player_name(series_data_raw, loser_id, 'Unknown'),
                             'arena': arena_name
                         })
 
                     finals_data[f'round_{round_num}'] = round_data
 
-        tournament_id_to_week_num = {tid: i + 1 for i, tid in enumerate(series['tournamentIds'])}
-        
         season_players_data = []
         
-        for player_info in series['players']:
-            player_id = player_info['playerId']
-            
-            player_standing = next((s for s in series['standings'] if s['playerId'] == player_id), None)
+        for player_info in series.players:
+            player_id = player_info.playerId
             
-            qualifying_position = player_standing['position'] if player_standing else 'N/A'
-            total_adjusted_points = player_standing['pointsAdjusted'] if player_standing else 0.0
+            player_standing = series_data_raw['standings_by_player'].get(player_id)
             
-            weekly_scores_raw = []
-            total_raw_points = 0.0
+            qualifying_position = player_standing.position if player_standing else 'N/A'
+            total_adjusted_points = player_standing.pointsAdjusted if player_standing else 0.0
             
-            if 'tournamentPoints' in series and series['tournamentPoints']:
-                for tournament_id_str, player_points_map in series['tournamentPoints'].items():
-                    if str(player_id) in player_points_map:
-                        points = float(series['tournamentPoints'][tournament_id_str][str(player_id)])
-                        weekly_scores_raw.append({'tournament_id': int(tournament_id_str), 'points': points})
-                        total_raw_points += points
-            
-            weekly_scores_raw.sort(key=lambda x: x['tournament_id'])
+            player_points = get_player_points(series_data_raw, player_id)
+            total_raw_points = player_points['total_raw_points']
 
-            weekly_scores_ordered = ['N/A'] * 10 
+            # Weeks 1-10 of the schedule; weeks beyond 10 only count towards the total
+            weekly_scores_ordered = ['N/A'] * 10
             num_weeks_played_by_player = 0
-            for score_entry in weekly_scores_raw:
-                week_num = tournament_id_to_week_num.get(score_entry['tournament_id'])
-                if week_num is not None and 1 <= week_num <= 10:
-                    weekly_scores_ordered[week_num - 1] = score_entry['points']
+            for week_index, points in enumerate(player_points['week_scores'][:10]):
+                if not math.isnan(points):
+                    weekly_scores_ordered[week_index] = points
                     num_weeks_played_by_player += 1
-            
+
             average_points_per_week = total_raw_points / num_weeks_played_by_player if num_weeks_played_by_player > 0 else 0.0
 
-            player_game_stats = game_data['by_player'].get(player_id, defaultdict(int))
+            player_game_stats = game_data['by_player'].get(player_id, empty_game_outcomes())
 
             season_players_data.append({
                 'playerId': player_id,
-                'name': player_info['name'],
+                'name': player_info.name,
                 'qualifying_position': qualifying_position,
                 'total_adjusted_points': total_adjusted_points,
                 'total_raw_points': round(total_raw_points, 2),
@@ -283,12 +193,11 @@ def generate_season_pages(env, all_series_data):
         
         season_players_data.sort(key=lambda x: x['qualifying_position'] if isinstance(x['qualifying_position'], int) else float('inf'))
 
-        with open(os.path.join(OUTPUT_DIR, f"season_{series_id}.html"), 'w') as f:
-            f.write(template.render(
-                season=series,
-                season_players_data=season_players_data,
-                players=series['players'],
-                has_finals=has_finals,
-                finals_data=finals_data
-            ))
-        print(f"Generated season_{series_id}.html")
+        writer.render(
+            'season.html', f"season_{series_id}.html", season_entry['source_files'] + ['series_index'],
+            season=series,
+            season_players_data=season_players_data,
+            players=series.players,
+            has_finals=has_finals,
+            finals_data=finals_data
+        )
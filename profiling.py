@@ -0,0 +1,95 @@
+import json
+import time
+import cProfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+# Build instrumentation, enabled by `main.py --profile`.
+#
+# Stages record wall and CPU time (CPU time is process-wide, so it includes fetch threads).
+# Counters and timings are recorded from the paths that explain a slow build: HTTP requests,
+# cache freshness checks, memoized lookups, pages rendered and bytes written. All functions
+# are no-ops until enable() is called, so the instrumentation costs nothing in normal runs.
+
+_enabled = False
+_cprofile_stage = None
+_cprofile_path = None
+_started_at = None
+_stages = {}
+_counters = {}
+_timings = {}
+_lock = threading.Lock()
+
+def enable(cprofile_stage=None, cprofile_path=None):
+    """Starts collecting. If cprofile_stage is given, that stage also runs under cProfile and its stats are dumped to cprofile_path."""
+    global _enabled, _cprofile_stage, _cprofile_path, _started_at
+    _enabled = True
+    _cprofile_stage = cprofile_stage
+    _cprofile_path = cprofile_path
+    _started_at = time.perf_counter()
+
+def is_enabled():
+    return _enabled
+
+@contextmanager
+def stage(name):
+    """Times the enclosed block as stage `name`; repeated stages are summed."""
+    if not _enabled:
+        yield
+        return
+    profile = cProfile.Profile() if name == _cprofile_stage else None
+    wall, cpu = time.perf_counter(), time.process_time()
+    if profile:
+        profile.enable()
+    try:
+        yield
+    finally:
+        if profile:
+            profile.disable()
+            profile.dump_stats(_cprofile_path)
+            print(f"Wrote cProfile stats of stage '{name}' to {_cprofile_path}")
+        with _lock:
+            entry = _stages.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0})
+            entry['calls'] += 1
+            entry['wall_s'] += time.perf_counter() - wall
+            entry['cpu_s'] += time.process_time() - cpu
+
+def count(name, amount=1):
+    """Adds amount to counter `name`."""
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + amount
+
+def observe(name, seconds):
+    """Records one duration (e.g. a request's latency) under `name`."""
+    if _enabled:
+        with _lock:
+            entry = _timings.setdefault(name, {'count': 0, 'total_s': 0.0, 'max_s': 0.0})
+            entry['count'] += 1
+            entry['total_s'] += seconds
+            entry['max_s'] = max(entry['max_s'], seconds)
+
+def report():
+    """Returns everything collected so far."""
+    with _lock:
+        timings = {
+            name: dict(entry, mean_s=entry['total_s'] / entry['count'])
+            for name, entry in sorted(_timings.items())
+        }
+        return {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'total_wall_s': time.perf_counter() - _started_at if _started_at is not None else 0.0,
+            'stages': {name: dict(entry) for name, entry in _stages.items()},
+            'counters': dict(sorted(_counters.items())),
+            'timings': timings
+        }
+
+def write_report(path):
+    """Writes the report as JSON and prints the slowest stages."""
+    data = report()
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=4)
+    print(f"Wrote profile report to {path}")
+    for name, entry in sorted(data['stages'].items(), key=lambda item: -item[1]['wall_s'])[:10]:
+        print(f"  {name}: {entry['wall_s']:.2f}s wall, {entry['cpu_s']:.2f}s CPU")
@@ -0,0 +1,40 @@
+from dataclasses import dataclass, field
+
+# Compact records for the parts of the Matchplay API responses the site uses. normalize.py
+# converts each loaded file into these, with typed values, and everything else (organizer,
+# RSVP settings, per-player metadata, ...) is dropped as soon as the file has been read.
+# Field names follow the API.
+
+@dataclass(slots=True)
+class Player:
+    playerId: int
+    name: str
+    ifpaId: int | None = None
+
+@dataclass(slots=True)
+class Standing:
+    playerId: int
+    position: int
+    pointsAdjusted: float
+
+@dataclass(slots=True)
+class Series:
+    seriesId: int
+    name: str
+    status: str | None
+    startDate: str | None = None
+    tournamentIds: list = field(default_factory=list)
+    players: list = field(default_factory=list)
+    standings: list = field(default_factory=list)
+
+@dataclass(slots=True)
+class Game:
+    gameId: int | None
+    roundId: int
+    startedAt: str
+    arenaName: str
+    set: int
+    playerIds: list
+    resultPositions: list | None
+    # Floats, NaN where a player has no result
+    resultPoints: list | None
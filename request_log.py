@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qsl
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import DATA_DIR, REQUEST_LOG_FILE
+from http_client import endpoint_name
+
+# Structured log of the Matchplay API calls made by api_client.
+#
+# Every response (including ones that are retried) and every request skipped because the
+# local cache was still fresh is appended to REQUEST_LOG_PATH as one JSON object per line:
+#   {"run", "time", "method", "endpoint", "url", "params", "status", "latency_ms", "bytes", "cache"}
+# with cache "miss" for a network request and "hit" for a cached file (status, latency and
+# bytes are null then). Entries of one `--fetch` share the same "run" so they can be compared.
+#
+# With record_bodies the response body is stored as well ("body", "headers"), which makes the
+# log replayable: ReplayAdapter answers requests from the recorded responses instead of the
+# network, so the fetch pipeline can be tested and benchmarked offline and deterministically.
+
+REQUEST_LOG_PATH = os.path.join(DATA_DIR, REQUEST_LOG_FILE) if REQUEST_LOG_FILE else None
+# Response headers kept with a recorded body; the HTTP client acts on these
+RECORDED_HEADERS = ('Content-Type', 'Retry-After')
+
+_run = datetime.now().isoformat(timespec='seconds')
+_record_bodies = False
+_log_file = None
+_lock = threading.Lock()
+
+def configure(record_bodies=False):
+    """Sets whether response bodies are stored in the log (needed for replaying it)."""
+    global _record_bodies
+    _record_bodies = record_bodies
+
+def _split_url(url):
+    """Returns (path with query, params) of a URL; the host is left out so logs replay against any base URL."""
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    return path, dict(parse_qsl(parts.query))
+
+def _write(entry):
+    global _log_file
+    if REQUEST_LOG_PATH is None:
+        return
+    line = json.dumps(entry)
+    with _lock:
+        if _log_file is None:
+            os.makedirs(os.path.dirname(REQUEST_LOG_PATH) or ".", exist_ok=True)
+            _log_file = open(REQUEST_LOG_PATH, 'a')
+        _log_file.write(line + "\n")
+        _log_file.flush()
+
+def log_response(response, *args, **kwargs):
+    """Session response hook: logs one network request."""
+    path, params = _split_url(response.url)
+    entry = {
+        'run': _run,
+        'time': time.time(),
+        'method': response.request.method,
+        'endpoint': endpoint_name(response.url),
+        'url': path,
+        'params': params,
+        'status': response.status_code,
+        'latency_ms': round(response.elapsed.total_seconds() * 1000, 1),
+        'bytes': len(response.content),
+        'cache': 'miss'
+    }
+    if _record_bodies:
+        entry['headers'] = {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers}
+        entry['body'] = response.text
+    _write(entry)
+
+def log_cache_hit(url, params=None):
+    """Logs a request that was not sent because its cached response is still fresh."""
+    request = requests.Request('GET', url, params=params).prepare()
+    path, params = _split_url(request.url)
+    _write({
+        'run': _run,
+        'time': time.time(),
+        'method': 'GET',
+        'endpoint': endpoint_name(request.url),
+        'url': path,
+        'params': params,
+        'status': None,
+        'latency_ms': None,
+        'bytes': None,
+        'cache': 'hit'
+    })
+
+def read_log(path=REQUEST_LOG_PATH):
+    """Returns the entries of a request log."""
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+class ReplayAdapter(HTTPAdapter):
+    """
+    Transport adapter that answers requests from the recorded responses of a request log.
+    Responses to the same URL are replayed in the order they were recorded (so a recorded
+    503 followed by a 200 replays as a retry), repeating the last one once they run out.
+    Requests that were never recorded get a 404. With latency, each response is delayed by
+    its recorded latency, so replayed fetches can be timed.
+    """
+
+    def __init__(self, log_path=REQUEST_LOG_PATH, latency=False):
+        super().__init__()
+        self.latency = latency
+        self.responses = {}
+        self.lock = threading.Lock()
+        for entry in read_log(log_path):
+            if 'body' in entry:
+                self.responses.setdefault((entry['method'], entry['url']), []).append(entry)
+
+    def _next_entry(self, key):
+        with self.lock:
+            entries = self.responses.get(key)
+            if not entries:
+                return None
+            return entries.pop(0) if len(entries) > 1 else entries[0]
+
+    def send(self, request, **kwargs):
+        entry = self._next_entry((request.method, _split_url(request.url)[0]))
+        if entry is None:
+            status, headers, body, latency_ms = 404, {'Content-Type': 'application/json'}, '{"message": "not in the request log"}', 0
+        else:
+            status, headers, body, latency_ms = entry['status'], entry.get('headers', {}), entry['body'], entry['latency_ms']
+        if self.latency:
+            time.sleep(latency_ms / 1000)
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(headers)
+        response._content = body.encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.reason = _reason(status)
+        response.elapsed = timedelta(milliseconds=latency_ms if self.latency else 0)
+        return response
+
+def _reason(status):
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return ''
+
+def summarize(path=REQUEST_LOG_PATH, run=None):
+    """Prints request count, cache hits, latency and bytes per endpoint of one run (default: the last)."""
+    entries = read_log(path) if path and os.path.exists(path) else []
+    if not entries:
+        print(f"No requests have been logged to {path} yet.")
+        return
+    run = run or entries[-1]['run']
+    entries = [entry for entry in entries if entry['run'] == run]
+    by_endpoint = {}
+    for entry in entries:
+        stats = by_endpoint.setdefault(entry['endpoint'], {'requests': 0, 'hits': 0, 'latency_ms': 0.0, 'bytes': 0, 'errors': 0})
+        if entry['cache'] == 'hit':
+            stats['hits'] += 1
+            continue
+        stats['requests'] += 1
+        stats['latency_ms'] += entry['latency_ms']
+        stats['bytes'] += entry['bytes']
+        stats['errors'] += entry['status'] >= 400
+    total_latency = sum(stats['latency_ms'] for stats in by_endpoint.values()) or 1.0
+
+    print(f"Requests of run {run} ({len(entries)} entries):")
+    print(f"  {'endpoint':<32} {'requests':>8} {'hits':>6} {'errors':>6} {'latency s':>10} {'share':>6} {'KB':>9}")
+    for endpoint, stats in sorted(by_endpoint.items(), key=lambda item: -item[1]['latency_ms']):
+        print(f"  {endpoint:<32} {stats['requests']:>8} {stats['hits']:>6} {stats['errors']:>6} "
+              f"{stats['latency_ms'] / 1000:>10.2f} {stats['latency_ms'] / total_latency:>6.0%} {stats['bytes'] / 1024:>9.1f}")
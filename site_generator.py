@@ -1,54 +1,132 @@
 import os
+import sys
+import json
 import shutil
 from datetime import datetime
-from jinja2 import Environment, FileSystemLoader
 
-from data_processor import load_all_series_data
-from config import OUTPUT_DIR, TEMPLATES_DIR, STATIC_DIR
-from page_generators.helpers import score_color_filter, format_number_filter, json_attribute_filter
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+import profiling
+from data_processor import iter_series_data, build_league_model
+from data_store import summarize_missing_inputs
+from normalize import summarize_invalid_inputs
+from config import OUTPUT_DIR, STATIC_DIR, MINIFY_HTML, PRECOMPRESS_OUTPUT, TEMPLATE_CACHE_DIR
+from page_generators.assets import publish_static_files, precompress_output, output_size
+from page_generators.helpers import create_environment, precompile_templates
+from page_generators.page_writer import PageWriter
 from page_generators.seasons import generate_seasons_page, generate_season_pages
 from page_generators.players import generate_player_pages
 from page_generators.charts import generate_charts_page
 from page_generators.leaderboards import generate_leaderboards_page
 
-def generate_site(excluded_series_names):
-    """Generates the static HTML site."""
+def peak_rss_mb():
+    """Returns the peak resident set size of this process in MB, or None if the platform cannot report it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def report_peak_rss(stage):
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"Peak RSS {stage}: {peak:.1f} MB")
+
+def _kb(size):
+    return f"{size / 1024:,.0f} KB"
+
+def report_output_size(writer):
+    """Writes the compressed siblings of the output (if enabled) and prints the size of the site."""
+    size = precompress_output(OUTPUT_DIR) if PRECOMPRESS_OUTPUT else output_size(OUTPUT_DIR)
+    line = f"Output size: {size['files']} files, {_kb(size['bytes'])}"
+    if PRECOMPRESS_OUTPUT:
+        line += f" ({_kb(size['gzip_bytes'])} gzip"
+        line += f", {_kb(size['brotli_bytes'])} brotli)" if size['brotli_bytes'] is not None else "; install brotli for .br files)"
+    print(line)
+    if writer.bytes_rendered:
+        print(f"Pages rendered: {_kb(writer.bytes_rendered)} before minification, {_kb(writer.bytes_minified)} after")
+    for name, value in size.items():
+        if value is not None:
+            profiling.count(f"output.{name}", value)
+
+def generate_site(excluded_series_names, incremental=False, jobs=1, verify_aggregates=False, strict=False):
+    """
+    Generates the static HTML site from the local data store only; nothing is fetched.
+    Missing input files and values that failed validation are reported once before
+    rendering, and with strict=True they abort the build (returning False). In incremental
+    mode the output directory is kept and only pages whose input data files or templates
+    changed since the last build are rendered.
+    With jobs > 1 pages are rendered in that many worker processes. With verify_aggregates
+    the stored leaderboard aggregates are checked against a full rebuild.
+    """
     print("Generating static site...")
-    
-    # Clean and recreate OUTPUT_DIR to ensure fresh generation
-    if os.path.exists(OUTPUT_DIR):
-        shutil.rmtree(OUTPUT_DIR)
-    os.makedirs(OUTPUT_DIR, exist_ok=True) # Recreate after deletion
-    
-    # Copy static files to output directory
-    static_output_dir = os.path.join(OUTPUT_DIR, 'static')
-    if os.path.exists(static_output_dir):
-        shutil.rmtree(static_output_dir)
-    shutil.copytree(STATIC_DIR, static_output_dir)
-    print(f"Copied static files from '{STATIC_DIR}' to '{static_output_dir}'")
-
-    all_series_data = load_all_series_data(excluded_series_names)
-
-    if not all_series_data:
+
+    # Load, parse, correct and score every series once; all generators read from this model.
+    # Series are streamed in, so only one season's raw JSON is in memory at a time.
+    with profiling.stage("generate.build_league_model"):
+        league_model = build_league_model(iter_series_data(excluded_series_names))
+
+    if not league_model['seasons']:
         print("\nNo data found in the 'data' directory.")
         print("Please run the script with fetch_data() enabled to download the data first.")
         return
-    
-    env = Environment(loader=FileSystemLoader(TEMPLATES_DIR))
-    env.filters['score_color_code'] = score_color_filter # Register the custom filter
-    env.filters['format_number'] = format_number_filter # Register the new filter
-    env.filters['tojson'] = json_attribute_filter # Register our custom safe JSON filter
+
+    report_peak_rss(f"after loading {len(league_model['seasons'])} series")
+
+    summarize_missing_inputs(league_model['missing_inputs'])
+    summarize_invalid_inputs(league_model['invalid_inputs'])
+    if strict and league_model['missing_inputs']:
+        print("Aborting site generation (--strict): run with --fetch to download the missing inputs first.")
+        return False
+    if strict and league_model['invalid_inputs']:
+        print("Aborting site generation (--strict): some input files failed validation.")
+        return False
+
+    with profiling.stage("generate.prepare_output"):
+        static_output_dir = os.path.join(OUTPUT_DIR, 'static')
+        if not incremental and os.path.exists(OUTPUT_DIR):
+            # Clean OUTPUT_DIR to ensure fresh generation
+            shutil.rmtree(OUTPUT_DIR)
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+        # Publish static files under fingerprinted names (removing outdated ones)
+        static_urls = publish_static_files(STATIC_DIR, static_output_dir, minify=MINIFY_HTML)
+        print(f"Published static files from '{STATIC_DIR}' to '{static_output_dir}'")
 
     # Add current timestamp to global variables
-    env.globals['last_updated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    template = env.get_template('index.html')
-    with open(os.path.join(OUTPUT_DIR, 'index.html'), 'w') as f:
-        f.write(template.render())
-    print("Generated index.html")
-
-    generate_seasons_page(env, all_series_data)
-    generate_season_pages(env, all_series_data)
-    player_categorized_seasons, all_players_chart_data = generate_player_pages(env, all_series_data)
-    generate_charts_page(env, all_players_chart_data) # New call to generate charts page
-    generate_leaderboards_page(env, all_series_data, player_categorized_seasons)
+    last_updated = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    writer = PageWriter(OUTPUT_DIR, create_environment, env_args=(last_updated, static_urls),
+                        incremental=incremental, jobs=jobs, minify=MINIFY_HTML,
+                        virtual_inputs={'series_index': league_model['series_index_signature'],
+                                        'static_files': json.dumps(static_urls, sort_keys=True)},
+                        common_inputs=['static_files'])
+    if jobs > 1 and TEMPLATE_CACHE_DIR:
+        # Compile the templates once, so the render workers load them from the bytecode cache
+        with profiling.stage("generate.precompile_templates"):
+            precompile_templates(writer.env)
+
+    with profiling.stage("generate.index_page"):
+        writer.render('index.html', 'index.html', [])
+    with profiling.stage("generate.seasons_page"):
+        generate_seasons_page(writer, league_model)
+    with profiling.stage("generate.season_pages"):
+        generate_season_pages(writer, league_model)
+    with profiling.stage("generate.player_pages"):
+        all_players_chart_data = generate_player_pages(writer, league_model)
+    with profiling.stage("generate.charts_page"):
+        generate_charts_page(writer, league_model, all_players_chart_data) # New call to generate charts page
+    with profiling.stage("generate.leaderboards_page"):
+        generate_leaderboards_page(writer, league_model, verify_aggregates=verify_aggregates)
+
+    with profiling.stage("generate.finish"):
+        writer.finish()
+    with profiling.stage("generate.compress"):
+        report_output_size(writer)
+    profiling.count("pages.rendered", writer.rendered_count)
+    profiling.count("pages.unchanged", writer.skipped_count)
+    profiling.count("pages.bytes_written", writer.bytes_written)
+    report_peak_rss("after generation")
+    return True
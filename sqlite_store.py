@@ -0,0 +1,423 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from config import DATA_DIR, CACHE_MANIFEST_FILE, SQLITE_STORE_PATH, EXCLUDED_SERIES_NAMES
+from finals import FINALS_MAPPING_PATH, load_finals_mapping, get_finals_tournament_ids, finals_tournament_id_list
+
+# Optional SQLite backend of the local data store (DATA_STORE_BACKEND = "sqlite").
+#
+# Every API response the JSON backend would keep as DATA_DIR/<kind>_<id>.json is a
+# "document" here, still addressed by that file path so callers do not care which backend
+# is in use. Its content is normalized into the tables below and read back with indexed
+# queries in the shape of the original response (only the fields the site uses survive).
+# The documents table holds the cache policy metadata (fetch time, series status) and the
+# SHA-1 of the response as the JSON backend would have written it, which is the input
+# signature used by incremental builds.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    ref_id INTEGER NOT NULL,
+    status TEXT,
+    fetched_at REAL,
+    sha1 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS series (
+    series_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    status TEXT,
+    start_date TEXT
+);
+CREATE TABLE IF NOT EXISTS series_tournaments (
+    series_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    tournament_id INTEGER NOT NULL,
+    PRIMARY KEY (series_id, seq)
+);
+CREATE TABLE IF NOT EXISTS players (
+    series_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    player_id INTEGER NOT NULL,
+    name TEXT,
+    ifpa_id INTEGER,
+    PRIMARY KEY (series_id, seq)
+);
+CREATE INDEX IF NOT EXISTS players_by_player ON players (player_id);
+CREATE TABLE IF NOT EXISTS standings (
+    series_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    player_id INTEGER NOT NULL,
+    position,
+    points,
+    points_adjusted,
+    PRIMARY KEY (series_id, seq)
+);
+CREATE INDEX IF NOT EXISTS standings_by_player ON standings (player_id);
+CREATE TABLE IF NOT EXISTS weekly_points (
+    series_id INTEGER NOT NULL,
+    tournament_seq INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    tournament_id INTEGER NOT NULL,
+    player_id INTEGER NOT NULL,
+    points,
+    PRIMARY KEY (series_id, tournament_seq, seq)
+);
+CREATE INDEX IF NOT EXISTS weekly_points_by_player ON weekly_points (player_id);
+CREATE INDEX IF NOT EXISTS weekly_points_by_tournament ON weekly_points (tournament_id);
+CREATE TABLE IF NOT EXISTS arenas (
+    arena_id INTEGER PRIMARY KEY,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS tournament_arenas (
+    tournament_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    arena_id INTEGER NOT NULL,
+    PRIMARY KEY (tournament_id, seq)
+);
+CREATE TABLE IF NOT EXISTS games (
+    tournament_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    game_id INTEGER,
+    round_id INTEGER,
+    arena_id INTEGER,
+    arena_name TEXT,
+    set_number INTEGER,
+    status TEXT,
+    started_at TEXT,
+    player_ids TEXT NOT NULL,
+    result_positions TEXT,
+    result_points TEXT,
+    PRIMARY KEY (tournament_id, seq)
+);
+CREATE TABLE IF NOT EXISTS game_players (
+    tournament_id INTEGER NOT NULL,
+    game_seq INTEGER NOT NULL,
+    slot INTEGER NOT NULL,
+    player_id INTEGER NOT NULL,
+    position INTEGER,
+    points,
+    PRIMARY KEY (tournament_id, game_seq, slot)
+);
+CREATE INDEX IF NOT EXISTS game_players_by_player ON game_players (player_id);
+CREATE TABLE IF NOT EXISTS finals_standings (
+    tournament_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    player_id INTEGER NOT NULL,
+    position,
+    points,
+    PRIMARY KEY (tournament_id, seq)
+);
+CREATE INDEX IF NOT EXISTS finals_standings_by_player ON finals_standings (player_id);
+"""
+
+DOCUMENT_NAME = re.compile(r'^(series|tournament_games|tournament_details|finals_standings)_(\d+)\.json$')
+
+# Tables holding the content of each kind of document, keyed by the document's ID column
+DOCUMENT_TABLES = {
+    'series': [('series', 'series_id'), ('series_tournaments', 'series_id'), ('players', 'series_id'),
+               ('standings', 'series_id'), ('weekly_points', 'series_id')],
+    'tournament_games': [('games', 'tournament_id'), ('game_players', 'tournament_id')],
+    'tournament_details': [('tournament_arenas', 'tournament_id')],
+    'finals_standings': [('finals_standings', 'tournament_id')]
+}
+
+_connection = None
+_lock = threading.Lock()
+
+def get_connection():
+    """Opens (once per process) the store at SQLITE_STORE_PATH, creating its tables if needed."""
+    global _connection
+    if _connection is None:
+        os.makedirs(os.path.dirname(SQLITE_STORE_PATH) or ".", exist_ok=True)
+        # Fetches write from several threads; every use of the connection holds _lock.
+        _connection = sqlite3.connect(SQLITE_STORE_PATH, check_same_thread=False)
+        _connection.executescript(SCHEMA)
+    return _connection
+
+def parse_document_name(filepath):
+    """Returns (kind, id) for a data store file path such as data/series_123.json, or None."""
+    match = DOCUMENT_NAME.match(os.path.basename(filepath))
+    if match is None:
+        return None
+    return match.group(1), int(match.group(2))
+
+def _scalar(value):
+    return value if value is None or isinstance(value, (int, float, str)) else None
+
+def _json_or_none(value):
+    return None if value is None else json.dumps(value)
+
+def _insert_series(conn, series_id, response):
+    series = response['data']
+    conn.execute("INSERT INTO series VALUES (?, ?, ?, ?)",
+                 (series_id, series['name'], series.get('status'), series.get('startDate')))
+    conn.executemany("INSERT INTO series_tournaments VALUES (?, ?, ?)",
+                     [(series_id, seq, tid) for seq, tid in enumerate(series.get('tournamentIds', []))])
+    conn.executemany("INSERT INTO players VALUES (?, ?, ?, ?, ?)", [
+        (series_id, seq, player['playerId'], player.get('name'), player.get('ifpaId'))
+        for seq, player in enumerate(series.get('players', []))
+    ])
+    conn.executemany("INSERT INTO standings VALUES (?, ?, ?, ?, ?, ?)", [
+        (series_id, seq, standing['playerId'], _scalar(standing.get('position')),
+         _scalar(standing.get('points')), _scalar(standing.get('pointsAdjusted')))
+        for seq, standing in enumerate(series.get('standings', []))
+    ])
+    tournament_points = series.get('tournamentPoints')
+    if isinstance(tournament_points, dict):
+        rows = []
+        for tournament_seq, (tournament_id, player_points) in enumerate(tournament_points.items()):
+            if not isinstance(player_points, dict):
+                continue
+            for seq, (player_id, points) in enumerate(player_points.items()):
+                rows.append((series_id, tournament_seq, seq, int(tournament_id), int(player_id), _scalar(points)))
+        conn.executemany("INSERT INTO weekly_points VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+def _upsert_arena(conn, arena):
+    if arena.get('arenaId') is not None:
+        conn.execute("INSERT INTO arenas VALUES (?, ?) ON CONFLICT (arena_id) DO UPDATE SET name = excluded.name",
+                     (arena['arenaId'], arena.get('name')))
+
+def _insert_tournament_games(conn, tournament_id, response):
+    game_rows, player_rows = [], []
+    for seq, game in enumerate(response.get('data') or []):
+        arena = game.get('arena') or {}
+        if arena:
+            _upsert_arena(conn, arena)
+        game_rows.append((
+            tournament_id, seq, game.get('gameId'), game.get('roundId'), game.get('arenaId'),
+            arena.get('name'), game.get('set'), game.get('status'), game.get('startedAt'),
+            json.dumps(game['playerIds']), _json_or_none(game.get('resultPositions')),
+            _json_or_none(game.get('resultPoints'))
+        ))
+        positions = {}
+        for index, player_id in enumerate(game.get('resultPositions') or []):
+            positions.setdefault(player_id, index + 1)
+        result_points = game.get('resultPoints') or []
+        for slot, player_id in enumerate(game['playerIds']):
+            points = result_points[slot] if slot < len(result_points) else None
+            player_rows.append((tournament_id, seq, slot, player_id, positions.get(player_id), _scalar(points)))
+    conn.executemany("INSERT INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", game_rows)
+    conn.executemany("INSERT INTO game_players VALUES (?, ?, ?, ?, ?, ?)", player_rows)
+
+def _insert_tournament_details(conn, tournament_id, response):
+    arenas = (response.get('data') or {}).get('arenas') or []
+    for arena in arenas:
+        _upsert_arena(conn, arena)
+    conn.executemany("INSERT INTO tournament_arenas VALUES (?, ?, ?)", [
+        (tournament_id, seq, arena['arenaId']) for seq, arena in enumerate(arenas) if arena.get('arenaId') is not None
+    ])
+
+def _insert_finals_standings(conn, tournament_id, standings):
+    conn.executemany("INSERT INTO finals_standings VALUES (?, ?, ?, ?, ?)", [
+        (tournament_id, seq, standing['playerId'], _scalar(standing.get('position')), _scalar(standing.get('points')))
+        for seq, standing in enumerate(standings or [])
+    ])
+
+INSERTERS = {
+    'series': _insert_series,
+    'tournament_games': _insert_tournament_games,
+    'tournament_details': _insert_tournament_details,
+    'finals_standings': _insert_finals_standings
+}
+
+def write_document(filepath, data, series_status, fetched_at=None, sha1=None):
+    """
+    Stores an API response under its data store path, replacing any previous version, and
+    records when it was fetched and the status of its series at that time. sha1 defaults to
+    the hash of the response serialized the way the JSON backend writes it.
+    """
+    kind, ref_id = parse_document_name(filepath)
+    if sha1 is None:
+        sha1 = hashlib.sha1(json.dumps(data, indent=4).encode('utf-8')).hexdigest()
+    with _lock:
+        conn = get_connection()
+        with conn:
+            for table, id_column in DOCUMENT_TABLES[kind]:
+                conn.execute(f"DELETE FROM {table} WHERE {id_column} = ?", (ref_id,))
+            INSERTERS[kind](conn, ref_id, data)
+            # Upsert keeps the rowid, so documents stay listed in the order they were first stored
+            conn.execute(
+                "INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (name) DO UPDATE SET "
+                "status = excluded.status, fetched_at = excluded.fetched_at, sha1 = excluded.sha1",
+                (os.path.basename(filepath), kind, ref_id, series_status,
+                 time.time() if fetched_at is None else fetched_at, sha1)
+            )
+
+def document_entry(filepath):
+    """Returns the cache metadata ({'fetched_at', 'status', 'sha1'}) of a stored document, or None."""
+    with _lock:
+        row = get_connection().execute(
+            "SELECT fetched_at, status, sha1 FROM documents WHERE name = ?", (os.path.basename(filepath),)
+        ).fetchone()
+    if row is None:
+        return None
+    return {'fetched_at': row[0], 'status': row[1], 'sha1': row[2]}
+
+def document_paths(kind):
+    """Returns the data store paths of every stored document of one kind, in the order they were first stored."""
+    with _lock:
+        rows = get_connection().execute(
+            "SELECT name FROM documents WHERE kind = ? ORDER BY rowid", (kind,)
+        ).fetchall()
+    return [os.path.join(DATA_DIR, name) for name, in rows]
+
+def _read_series(conn, series_id):
+    row = conn.execute("SELECT name, status, start_date FROM series WHERE series_id = ?", (series_id,)).fetchone()
+    series = {'seriesId': series_id, 'name': row[0], 'status': row[1]}
+    if row[2] is not None:
+        series['startDate'] = row[2]
+    series['tournamentIds'] = [tid for tid, in conn.execute(
+        "SELECT tournament_id FROM series_tournaments WHERE series_id = ? ORDER BY seq", (series_id,))]
+    series['players'] = [
+        {'playerId': player_id, 'name': name, 'ifpaId': ifpa_id}
+        for player_id, name, ifpa_id in conn.execute(
+            "SELECT player_id, name, ifpa_id FROM players WHERE series_id = ? ORDER BY seq", (series_id,))
+    ]
+    series['standings'] = [
+        {'playerId': player_id, 'position': position, 'points': points, 'pointsAdjusted': points_adjusted}
+        for player_id, position, points, points_adjusted in conn.execute(
+            "SELECT player_id, position, points, points_adjusted FROM standings WHERE series_id = ? ORDER BY seq",
+            (series_id,))
+    ]
+    tournament_points = {}
+    for tournament_id, player_id, points in conn.execute(
+            "SELECT tournament_id, player_id, points FROM weekly_points WHERE series_id = ? "
+            "ORDER BY tournament_seq, seq", (series_id,)):
+        tournament_points.setdefault(str(tournament_id), {})[str(player_id)] = points
+    series['tournamentPoints'] = tournament_points
+    return {'data': series}
+
+def _read_tournament_games(conn, tournament_id):
+    games = []
+    for row in conn.execute(
+            "SELECT game_id, round_id, arena_id, arena_name, set_number, status, started_at, player_ids, "
+            "result_positions, result_points FROM games WHERE tournament_id = ? ORDER BY seq", (tournament_id,)):
+        game_id, round_id, arena_id, arena_name, set_number, status, started_at = row[:7]
+        game = {'gameId': game_id, 'roundId': round_id, 'tournamentId': tournament_id, 'arenaId': arena_id,
+                'set': set_number, 'status': status, 'startedAt': started_at,
+                'playerIds': json.loads(row[7]),
+                'resultPositions': None if row[8] is None else json.loads(row[8]),
+                'resultPoints': None if row[9] is None else json.loads(row[9])}
+        if arena_name is not None:
+            game['arena'] = {'arenaId': arena_id, 'name': arena_name}
+        games.append(game)
+    return {'data': games}
+
+def _read_tournament_details(conn, tournament_id):
+    arenas = [
+        {'arenaId': arena_id, 'name': name}
+        for arena_id, name in conn.execute(
+            "SELECT a.arena_id, a.name FROM tournament_arenas t JOIN arenas a ON a.arena_id = t.arena_id "
+            "WHERE t.tournament_id = ? ORDER BY t.seq", (tournament_id,))
+    ]
+    return {'data': {'tournamentId': tournament_id, 'arenas': arenas}}
+
+def _read_finals_standings(conn, tournament_id):
+    return [
+        {'playerId': player_id, 'position': position, 'points': points}
+        for player_id, position, points in conn.execute(
+            "SELECT player_id, position, points FROM finals_standings WHERE tournament_id = ? ORDER BY seq",
+            (tournament_id,))
+    ]
+
+READERS = {
+    'series': _read_series,
+    'tournament_games': _read_tournament_games,
+    'tournament_details': _read_tournament_details,
+    'finals_standings': _read_finals_standings
+}
+
+def read_document(filepath):
+    """Returns a stored document in the shape of the API response it was built from, or None if it is not stored."""
+    kind, ref_id = parse_document_name(filepath)
+    with _lock:
+        conn = get_connection()
+        if conn.execute("SELECT 1 FROM documents WHERE name = ?", (os.path.basename(filepath),)).fetchone() is None:
+            return None
+        return READERS[kind](conn, ref_id)
+
+def _series_statuses(data_dir, filenames):
+    """
+    Returns ({series ID: status}, {tournament ID: status of its series}, finals tournament IDs)
+    read from the cached series responses in data_dir. Finals tournaments take the status of
+    the series the finals mapping in data_dir assigns them to, after the same year corrections
+    the site applies to series names.
+    """
+    # data_processor reads the data store, which imports this module
+    from data_processor import parse_series_name, apply_year_corrections_to_seasons_list
+
+    series_statuses, tournament_statuses, finals_ids = {}, {}, set()
+    seasons = []
+    for filename in filenames:
+        kind, series_id = parse_document_name(filename)
+        if kind != 'series':
+            continue
+        with open(os.path.join(data_dir, filename), 'r') as f:
+            series = json.load(f).get('data') or {}
+        series_statuses[series_id] = series.get('status')
+        for tournament_id in series.get('tournamentIds') or []:
+            tournament_statuses.setdefault(tournament_id, series.get('status'))
+        if 'name' in series and series['name'] not in EXCLUDED_SERIES_NAMES:
+            year, season_name, league_name = parse_series_name(series['name'])
+            seasons.append({'seriesId': series_id, 'year': year, 'season_name': season_name,
+                            'league_name': league_name, 'status': series.get('status')})
+
+    finals_mapping = load_finals_mapping(os.path.join(data_dir, os.path.basename(FINALS_MAPPING_PATH)))
+    for season in apply_year_corrections_to_seasons_list(seasons):
+        finals_tournament_ids = get_finals_tournament_ids(
+            season['league_name'], season['season_name'], season['year'], finals_mapping
+        )
+        for tournament_id in finals_tournament_id_list(finals_tournament_ids):
+            tournament_statuses.setdefault(tournament_id, season['status'])
+            finals_ids.add(tournament_id)
+    return series_statuses, tournament_statuses, finals_ids
+
+def _has_results(response):
+    """Whether a finals standings (a list) or games ({'data': [...]}) response holds any results."""
+    return bool(response.get('data') if isinstance(response, dict) else response)
+
+def import_json_cache(data_dir=DATA_DIR):
+    """
+    Imports every cached API response in data_dir into the store, keeping the fetch time and
+    series status recorded in the JSON cache manifest. Files without a manifest entry (caches
+    written before the manifest existed) take the status of their series from the cached series
+    responses (for finals, through the finals mapping), and their file modification time as
+    fetch time. Files are imported in directory
+    listing order, the order the JSON backend loads them in. Returns the number of files imported.
+    """
+    manifest_path = os.path.join(data_dir, CACHE_MANIFEST_FILE)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+
+    filenames = [filename for filename in os.listdir(data_dir) if parse_document_name(filename) is not None]
+    series_statuses, tournament_statuses, finals_ids = _series_statuses(data_dir, filenames)
+
+    imported = 0
+    for filename in filenames:
+        kind, ref_id = parse_document_name(filename)
+        filepath = os.path.join(data_dir, filename)
+        with open(filepath, 'rb') as f:
+            content = f.read()
+        response = json.loads(content)
+        entry = manifest.get(filename, {})
+        status = entry.get('status')
+        if status is None:
+            status = series_statuses.get(ref_id) if kind == 'series' else tournament_statuses.get(ref_id)
+            # Empty finals results are kept 'active' so they are checked again, as when fetched
+            if kind in ('finals_standings', 'tournament_games') and ref_id in finals_ids and not _has_results(response):
+                status = 'active'
+        write_document(
+            os.path.join(DATA_DIR, filename), response, status,
+            fetched_at=entry.get('fetched_at', os.path.getmtime(filepath)),
+            sha1=hashlib.sha1(content).hexdigest()
+        )
+        imported += 1
+    return imported
@@ -0,0 +1,223 @@
+// Shared scripts of every page, loaded from base.html.
+
+const themeSwitcher = {
+    // Config
+    _scheme: "auto",
+    menuTarget: "details[role='list']",
+    buttonsTarget: "a[data-theme-switcher]",
+    buttonAttribute: "data-theme-switcher",
+    rootAttribute: "data-theme",
+    localStorageKey: "picoPreferedColorScheme",
+
+    // Get scheme from local storage
+    get schemeFromLocalStorage() {
+        if (typeof window.localStorage !== "undefined") {
+            if (window.localStorage.getItem(this.localStorageKey) !== null) {
+                return window.localStorage.getItem(this.localStorageKey);
+            }
+        }
+        return this._scheme;
+    },
+
+    // Prefered scheme
+    get scheme() {
+        return this._scheme;
+    },
+
+    // Set scheme
+    set scheme(scheme) {
+        if (scheme == "auto") {
+            this._scheme = "auto";
+        } else if (scheme == "dark") {
+            this._scheme = "dark";
+        } else {
+            this._scheme = "light";
+        }
+        this.applyScheme();
+        this.schemeToLocalStorage();
+    },
+
+    // Init switchers
+    initSwitchers() {
+        const buttons = document.querySelectorAll(this.buttonsTarget);
+        buttons.forEach((button) => {
+            button.addEventListener(
+                "click",
+                (event) => {
+                    event.preventDefault();
+                    // Set scheme
+                    this.scheme = button.getAttribute(this.buttonAttribute);
+                    // Close dropdown
+                    document.querySelector(this.menuTarget).removeAttribute("open");
+                },
+                false
+            );
+        });
+    },
+
+    // Apply scheme
+    applyScheme() {
+        document.documentElement.setAttribute(this.rootAttribute, this.scheme);
+        updateScoreColors(); // Update score colors when theme changes
+    },
+
+    // Store scheme to local storage
+    schemeToLocalStorage() {
+        if (typeof window.localStorage !== "undefined") {
+            window.localStorage.setItem(this.localStorageKey, this.scheme);
+        }
+    },
+};
+
+// Function to update score colors based on theme
+function updateScoreColors() {
+    const badges = document.querySelectorAll('.score-badge');
+    const isDark = document.documentElement.getAttribute('data-theme') === 'dark';
+
+    badges.forEach(badge => {
+        const score = parseFloat(badge.getAttribute('data-score'));
+        if (isNaN(score)) return;
+
+        let r, g, b;
+
+        if (score === 35) {
+            // Gold
+            r = 255; g = 215; b = 0;
+        } else if (score <= 5) {
+            // Red
+            r = 255; g = 0; b = 0;
+        } else if (score >= 34) {
+            // Green
+            r = 0; g = 128; b = 0;
+        } else if (score < 20) {
+            // Red to White (or Dark Grey in dark mode)
+            const t = (score - 5) / 15.0;
+            if (isDark) {
+                // Interpolate Red (255,0,0) to Dark Grey (50,50,50)
+                r = 255 + (50 - 255) * t;
+                g = 0 + (50 - 0) * t;
+                b = 0 + (50 - 0) * t;
+            } else {
+                // Interpolate Red (255,0,0) to White (255,255,255)
+                r = 255;
+                g = int(255 * t); // This logic was slightly off in python, let's fix it here
+                // Python: g = int(255 * t), b = int(255 * t) -> Red to White
+                g = Math.floor(255 * t);
+                b = Math.floor(255 * t);
+            }
+        } else {
+            // White (or Dark Grey) to Green
+            const t = (score - 20) / 14.0;
+            if (isDark) {
+                // Interpolate Dark Grey (50,50,50) to Green (0,128,0)
+                r = 50 + (0 - 50) * t;
+                g = 50 + (128 - 50) * t;
+                b = 50 + (0 - 50) * t;
+            } else {
+                // Interpolate White (255,255,255) to Green (0,128,0)
+                r = Math.floor(255 * (1 - t));
+                g = Math.floor(255 * (1 - t) + 128 * t);
+                b = Math.floor(255 * (1 - t));
+            }
+        }
+
+        badge.style.backgroundColor = `rgb(${Math.round(r)},${Math.round(g)},${Math.round(b)})`;
+
+        // Adjust text color for contrast
+        // Simple check: if background is dark, text white, else black
+        // Calculate luminance
+        const luminance = (0.299 * r + 0.587 * g + 0.114 * b) / 255;
+        if (luminance > 0.5) {
+            badge.style.color = 'black';
+        } else {
+            badge.style.color = 'white';
+        }
+    });
+}
+
+// Init
+themeSwitcher.scheme = themeSwitcher.schemeFromLocalStorage;
+
+document.addEventListener('DOMContentLoaded', () => {
+    themeSwitcher.initSwitchers();
+    updateScoreColors(); // Initial color update
+});
+
+function sortTable(tableId, n, isNumeric = false) {
+    let table, rows, switching, i, x, y, shouldSwitch, dir, switchcount = 0;
+    table = document.getElementById(tableId);
+    switching = true;
+    // Set the sorting direction to ascending:
+    dir = "asc";
+    /* Make a loop that will continue until
+    no switching has been done: */
+    while (switching) {
+        // Start by saying: no switching is done:
+        switching = false;
+        rows = table.rows;
+        /* Loop through all table rows (except the
+        first, which contains table headers): */
+        for (i = 1; i < (rows.length - 1); i++) {
+            // Start by saying there should be no switching:
+            shouldSwitch = false;
+            /* Get the two elements you want to compare,
+            one from current row and one from the next: */
+            x = rows[i].getElementsByTagName("TD")[n];
+            y = rows[i + 1].getElementsByTagName("TD")[n];
+
+            let xContent = x.innerHTML;
+            let yContent = y.innerHTML;
+
+            // Handle potential HTML spans for coloring (e.g., score_color_code filter)
+            if (x.firstElementChild && x.firstElementChild.tagName === 'SPAN') {
+                xContent = x.firstElementChild.textContent;
+            }
+            if (y.firstElementChild && y.firstElementChild.tagName === 'SPAN') {
+                yContent = y.firstElementChild.textContent;
+            }
+
+            // Convert to number if isNumeric is true
+            if (isNumeric) {
+                xContent = parseFloat(xContent.replace(/[^0-9.-]+/g,"")); // Remove non-numeric chars except . and -
+                yContent = parseFloat(yContent.replace(/[^0-9.-]+/g,""));
+                // Handle NaN from parseFloat if content is not a valid number
+                if (isNaN(xContent)) xContent = dir === "asc" ? -Infinity : Infinity;
+                if (isNaN(yContent)) yContent = dir === "asc" ? -Infinity : Infinity;
+            } else {
+                xContent = xContent.toLowerCase();
+                yContent = yContent.toLowerCase();
+            }
+
+            /* Check if the two rows should switch place,
+            based on the direction, asc or desc: */
+            if (dir == "asc") {
+                if (xContent > yContent) {
+                    // If so, mark as a switch and break the loop:
+                    shouldSwitch = true;
+                    break;
+                }
+            } else if (dir == "desc") {
+                if (xContent < yContent) {
+                    // If so, mark as a switch and break the loop:
+                    shouldSwitch = true;
+                    break;
+                }
+            }
+        }
+        if (shouldSwitch) {
+            /* If a switch has been marked, make the switch
+            and mark that a switch has been done: */
+            rows[i].parentNode.insertBefore(rows[i + 1], rows[i]);
+            switching = true;
+            // Each time a switch is done, increase this count by 1:
+            switchcount++;
+        } else {
+            /* If no switching has been done AND the direction is "asc",
+            set the direction to "desc" and run the while loop again. */
+            if (switchcount == 0 && dir == "asc") {
+                dir = "desc";
+                switching = true;
+            }
+        }
+    }
+}
@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Synthetic league served by the stub API: series of weekly tournaments with games at a few
+# arenas, and one season with a finals tournament.
+SERIES = [
+    {'seriesId': 100 + index, 'name': f"MFPinball {season} {year}", 'status': 'completed' if year < 2025 else 'active'}
+    for index, (season, year) in enumerate(
+        (season, year) for year in (2023, 2024, 2025) for season in ('Winter', 'Spring', 'Summer')
+    )
+]
+TOURNAMENTS_PER_SERIES = 8
+GAMES_PER_TOURNAMENT = 12
+FINALS_TOURNAMENT_ID = 9000
+FINALS_MAPPING = {'MFPinball': {'Winter 2024': FINALS_TOURNAMENT_ID}}
+ARENAS = [{'arenaId': arena_id, 'name': f"Machine {arena_id}"} for arena_id in (1, 2, 3, 4)]
+GAMES_PAGE_SIZE = 100
+
+def tournament_ids(series):
+    return [series['seriesId'] * 100 + week for week in range(TOURNAMENTS_PER_SERIES)]
+
+def tournament_games(tournament_id):
+    return [{
+        'gameId': tournament_id * 100 + index,
+        'tournamentId': tournament_id,
+        'arenaId': ARENAS[(tournament_id + index) % len(ARENAS)]['arenaId'],
+        'playerIds': [1, 2, 3, 4],
+        'resultPositions': [(index + offset) % 4 + 1 for offset in range(4)],
+        'resultPoints': [7, 5, 3, 1]
+    } for index in range(GAMES_PER_TOURNAMENT)]
+
+class StubApi(BaseHTTPRequestHandler):
+    """
+    Stub of the Matchplay API endpoints used by api_client. With server.inject_failures the
+    first request to every third URL gets a 503 and to every fifth URL a 429, so each is only
+    answered by a retry. Weekly tournaments are completed; the finals tournament has
+    server.finals_status.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_times.append(time.monotonic())
+            first_attempt = self.path not in server.seen
+            server.seen.setdefault(self.path, len(server.seen))
+            url_index = server.seen[self.path]
+        if server.inject_failures and first_attempt:
+            if url_index % 3 == 0:
+                return self.send(503, {'message': 'injected'})
+            if url_index % 5 == 0:
+                return self.send(429, {'message': 'injected'}, {'Retry-After': '0'})
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = url.path.split('/')[2:]
+        if parts == ['series']:
+            return self.send(200, {'data': [dict(series) for series in SERIES],
+                                   'meta': {'current_page': 1, 'last_page': 1}})
+        if parts[0] == 'series' and len(parts) == 2:
+            series = next(series for series in SERIES if series['seriesId'] == int(parts[1]))
+            return self.send(200, {'data': dict(series, tournamentIds=tournament_ids(series))})
+        if parts == ['games']:
+            ids = [int(tid) for tid in query['tournaments'][0].split(',')]
+            games = [game for tid in ids for game in tournament_games(tid)]
+            page = int(query.get('page', ['1'])[0])
+            last_page = max(1, -(-len(games) // GAMES_PAGE_SIZE))
+            return self.send(200, {'data': games[(page - 1) * GAMES_PAGE_SIZE:page * GAMES_PAGE_SIZE],
+                                   'meta': {'current_page': page, 'last_page': last_page}})
+        if parts[0] == 'tournaments' and len(parts) == 3 and parts[2] == 'standings':
+            return self.send(200, [{'playerId': player_id, 'position': player_id} for player_id in (1, 2, 3, 4)])
+        if parts[0] == 'tournaments' and len(parts) == 3 and parts[2] == 'games':
+            return self.send(200, {'data': tournament_games(int(parts[1]))})
+        if parts[0] == 'tournaments' and len(parts) == 2:
+            tournament_id = int(parts[1])
+            status = server.finals_status if tournament_id == FINALS_TOURNAMENT_ID else 'completed'
+            return self.send(200, {'data': {'tournamentId': tournament_id, 'status': status, 'arenas': ARENAS}})
+        return self.send(404, {'message': 'not found'})
+
+@pytest.fixture
+def stub_api():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubApi)
+    server.lock = threading.Lock()
+    server.inject_failures = False
+
+    def reset(inject_failures=False, finals_status='completed'):
+        server.request_times = []
+        server.seen = {}
+        server.inject_failures = inject_failures
+        server.finals_status = finals_status
+    server.reset = reset
+    reset()
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+# Runs fetch_data in a fresh process (the fetch functions memoize per process) with a fast
+# backoff and the given rate limit
+FETCH_SCRIPT = """
+import sys, json
+import api_client
+from http_client import TokenBucket
+from data_processor import parse_series_name
+
+workers, rate, burst = int(sys.argv[1]), float(sys.argv[2]), int(sys.argv[3])
+api_client.HTTP.bucket = TokenBucket(rate, burst)
+api_client.HTTP.backoff = 0.01
+api_client.HTTP.max_backoff = 0.05
+api_client.fetch_data([], json.loads(sys.argv[4]), parse_series_name, max_workers=workers)
+"""
+
+def run_fetch(work_dir, server, workers, rate=1000, burst=1000):
+    os.makedirs(work_dir)
+    env = dict(os.environ,
+               PYTHONPATH=REPO_DIR,
+               MATCHPLAY_BASE_URL=f"http://127.0.0.1:{server.server_port}/api",
+               MATCHPLAY_API_KEY='test-key',
+               USER_ID='1')
+    subprocess.run(
+        [sys.executable, '-c', FETCH_SCRIPT, str(workers), str(rate), str(burst), json.dumps(FINALS_MAPPING)],
+        cwd=work_dir, env=env, check=True, capture_output=True, text=True, timeout=120
+    )
+    return read_cache(os.path.join(work_dir, 'data'))
+
+def read_cache(data_dir):
+    """Returns {filename: content} of the cache files written by a fetch, without fetch times."""
+    files = {}
+    for filename in sorted(os.listdir(data_dir)):
+        if filename == 'requests.jsonl':
+            continue
+        with open(os.path.join(data_dir, filename), 'r') as f:
+            content = json.load(f)
+        if filename == 'cache_manifest.json':
+            content = {name: {key: value for key, value in entry.items() if key != 'fetched_at'}
+                       for name, entry in content.items()}
+        files[filename] = content
+    return files
+
+def test_concurrent_fetch_writes_the_same_files_as_sequential(tmp_path, stub_api):
+    sequential = run_fetch(tmp_path / 'sequential', stub_api, workers=1)
+    sequential_requests = len(stub_api.request_times)
+    stub_api.reset()
+    concurrent = run_fetch(tmp_path / 'concurrent', stub_api, workers=8)
+
+    expected_games = {f"tournament_games_{tid}.json" for series in SERIES for tid in tournament_ids(series)}
+    assert expected_games | {f"tournament_games_{FINALS_TOURNAMENT_ID}.json"} <= set(sequential)
+    assert f"finals_standings_{FINALS_TOURNAMENT_ID}.json" in sequential
+    assert 'fetch_failures.json' not in sequential
+    assert concurrent == sequential
+    assert len(stub_api.request_times) == sequential_requests
+
+def test_finals_are_cached_with_their_own_status(tmp_path, stub_api):
+    # The finals' series (Winter 2024) is completed, but the finals tournament is still running
+    stub_api.reset(finals_status='started')
+    manifest = run_fetch(tmp_path / 'started', stub_api, workers=4)['cache_manifest.json']
+    assert manifest[f"finals_standings_{FINALS_TOURNAMENT_ID}.json"]['status'] == 'active'
+    assert manifest[f"tournament_games_{FINALS_TOURNAMENT_ID}.json"]['status'] == 'active'
+
+    stub_api.reset(finals_status='completed')
+    manifest = run_fetch(tmp_path / 'completed', stub_api, workers=4)['cache_manifest.json']
+    assert manifest[f"finals_standings_{FINALS_TOURNAMENT_ID}.json"]['status'] == 'completed'
+    assert manifest[f"tournament_games_{FINALS_TOURNAMENT_ID}.json"]['status'] == 'completed'
+
+def test_concurrent_fetch_retries_failed_requests(tmp_path, stub_api):
+    expected = run_fetch(tmp_path / 'clean', stub_api, workers=1)
+    stub_api.reset(inject_failures=True)
+    fetched = run_fetch(tmp_path / 'failing', stub_api, workers=8)
+
+    assert len(stub_api.request_times) > len(stub_api.seen)
+    assert fetched == expected
+
+def test_concurrent_fetch_stays_under_the_rate_limit(tmp_path, stub_api):
+    rate, burst, window = 40, 4, 0.25
+    run_fetch(tmp_path / 'limited', stub_api, workers=8, rate=rate, burst=burst)
+
+    times = stub_api.request_times
+    assert len(times) > burst + rate * window
+    for index, start in enumerate(times):
+        in_window = sum(1 for t in times[index:] if t - start <= window)
+        # One token of slack for timing jitter between client and server
+        assert in_window <= burst + rate * window + 1
@@ -0,0 +1,86 @@
+import os
+import json
+import shutil
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+
+from page_generators.search_index import normalize_name, name_keys, write_player_search_index
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates', 'players.html')
+
+NAMES = [
+    'Cary Grant', 'Mary-Ann', "Sean O'Brien", 'José Ñúñez', 'Zoë Ångström', 'ﬁnn', 'Ǆemal',
+    '李小龍', 'Nguyễn Văn A', 'Al', 'X', 'player_42'
+]
+
+class CollectingWriter:
+    """Keeps the files write_player_search_index writes, by path."""
+    def __init__(self):
+        self.files = {}
+
+    def write_file(self, path, data):
+        self.files[path] = data.decode('utf-8')
+
+def player_seasons(names):
+    return {
+        player_id: {'player_info': SimpleNamespace(name=name), 'mfp_seasons': [], 'mflp_seasons': []}
+        for player_id, name in enumerate(names, start=1)
+    }
+
+def page_lookup_script():
+    """The page's normalizeName, termKeys and search functions, as in templates/players.html."""
+    with open(TEMPLATE_PATH) as f:
+        template = f.read()
+    start = template.index('// Must match normalize_name')
+    return template[start:template.index('function playerItem', start)]
+
+def run_page_search(manifest, files, queries):
+    """Runs the page's lookup in node over the written index; returns (normalized names, matches per query)."""
+    script = f"""
+const searchIndex = {json.dumps(manifest)};
+const files = {json.dumps(files)};
+const indexFiles = {{}};
+{page_lookup_script()}
+// Serve the index from the written files instead of fetching it
+function loadIndexFile(name, hash) {{
+    return Promise.resolve(JSON.parse(files[`${{searchIndex.dir}}/${{name}}.${{hash}}.json`]));
+}}
+(async () => {{
+    const names = {json.dumps(NAMES)}.map(normalizeName);
+    const matches = [];
+    for (const query of {json.dumps(queries)}) matches.push(await search(query));
+    console.log(JSON.stringify([names, matches]));
+}})();
+"""
+    result = subprocess.run(['node', '-'], input=script, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+@pytest.mark.skipif(shutil.which('node') is None, reason="node is needed to run the page's script")
+def test_page_lookup_matches_substrings_of_names():
+    writer = CollectingWriter()
+    manifest, _ = write_player_search_index(writer, player_seasons(NAMES), page_size=5)
+    records = json.loads(writer.files[f"search/records.{manifest['records']}.json"])
+    normalized_records = [normalize_name(record[1]) for record in records]
+
+    # Every substring of every word, short ones included, plus multi-word and accented queries
+    queries = sorted({
+        word[i:j]
+        for name in normalized_records for word in name.split()
+        for i in range(len(word)) for j in range(i + 1, len(word) + 1)
+    }) + ['ar', 'CARY g', 'josé', 'nuñ', 'o brien', 'NGUYEN van', 'zz', 'fi']
+
+    names, matches = run_page_search(manifest, writer.files, queries)
+
+    assert names == [normalize_name(name) for name in NAMES]
+    for query, found in zip(queries, matches):
+        terms = normalize_name(query).split()
+        expected = [position for position, name in enumerate(normalized_records) if all(term in name for term in terms)]
+        assert found == expected, query
+    assert [records[position][1] for position in matches[queries.index('ar')]] == ['Cary Grant', 'Mary-Ann']
+
+def test_name_keys_cover_every_trigram_of_each_word():
+    assert name_keys(normalize_name('Cary Grant')) == {'car', 'ary', 'gra', 'ran', 'ant'}
+    assert name_keys(normalize_name('李小龍')) == {'李小龍'}
+    assert name_keys(normalize_name('Al X')) == set()
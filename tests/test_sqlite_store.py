@@ -0,0 +1,85 @@
+import os
+import json
+import time
+
+import pytest
+
+import cache_policy
+import sqlite_store
+
+DAY = 24 * 3600
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """An empty SQLite store in tmp_path that cache_policy uses as its backend."""
+    monkeypatch.setattr(sqlite_store, 'SQLITE_STORE_PATH', str(tmp_path / 'league.sqlite3'))
+    monkeypatch.setattr(sqlite_store, '_connection', None)
+    monkeypatch.setattr(cache_policy, 'sqlite_store', sqlite_store)
+    yield sqlite_store
+    if sqlite_store._connection is not None:
+        sqlite_store._connection.close()
+
+def write_cache_file(data_dir, filename, data, age_seconds=0):
+    path = os.path.join(data_dir, filename)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=4)
+    mtime = time.time() - age_seconds
+    os.utime(path, (mtime, mtime))
+
+def test_import_without_manifest_keeps_cache_fresh(tmp_path, store):
+    # A cache written before the manifest existed: no cache_manifest.json at all
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    write_cache_file(data_dir, 'series_1.json', {'data': {
+        'seriesId': 1, 'name': 'MFP Season 1 2020', 'status': 'completed', 'tournamentIds': [10, 11]
+    }}, age_seconds=400 * DAY)
+    write_cache_file(data_dir, 'series_2.json', {'data': {
+        'seriesId': 2, 'name': 'MFP Season 2 2024', 'status': 'active', 'tournamentIds': [20]
+    }})
+    game = {'gameId': 1, 'playerIds': [5, 6], 'resultPositions': [6, 5], 'resultPoints': [1, 3]}
+    write_cache_file(data_dir, 'tournament_games_10.json', {'data': [game]}, age_seconds=400 * DAY)
+    write_cache_file(data_dir, 'tournament_games_11.json', {'data': []}, age_seconds=400 * DAY)
+    write_cache_file(data_dir, 'tournament_games_20.json', {'data': []})
+    write_cache_file(data_dir, 'finals_standings_30.json', [{'playerId': 5, 'position': 1}])
+
+    assert store.import_json_cache(str(data_dir)) == 6
+
+    expected_statuses = {
+        'series_1.json': 'completed', 'tournament_games_10.json': 'completed', 'tournament_games_11.json': 'completed',
+        'series_2.json': 'active', 'tournament_games_20.json': 'active', 'finals_standings_30.json': 'completed'
+    }
+    for filename, series_status in expected_statuses.items():
+        assert not cache_policy.is_cache_stale(os.path.join('data', filename), series_status), filename
+
+def test_import_without_manifest_keeps_finals_of_completed_series_fresh(tmp_path, store):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    write_cache_file(data_dir, 'series_1.json', {'data': {
+        'seriesId': 1, 'name': 'MFPinball Winter 2020', 'status': 'completed', 'tournamentIds': [10]
+    }}, age_seconds=400 * DAY)
+    write_cache_file(data_dir, 'finals_mapping.json', {'MFPinball': {'Winter 2020': [30, 31]}})
+    game = {'gameId': 1, 'playerIds': [5, 6], 'resultPositions': [6, 5], 'resultPoints': [1, 3]}
+    write_cache_file(data_dir, 'finals_standings_30.json', [{'playerId': 5, 'position': 1}], age_seconds=400 * DAY)
+    write_cache_file(data_dir, 'tournament_games_30.json', {'data': [game]}, age_seconds=400 * DAY)
+    write_cache_file(data_dir, 'finals_standings_31.json', [], age_seconds=400 * DAY)
+    write_cache_file(data_dir, 'tournament_games_31.json', {'data': []}, age_seconds=400 * DAY)
+
+    store.import_json_cache(str(data_dir))
+
+    # Finals are checked without a series status (see api_client.finals_cache_status)
+    assert not cache_policy.is_cache_stale(os.path.join('data', 'finals_standings_30.json'))
+    assert not cache_policy.is_cache_stale(os.path.join('data', 'tournament_games_30.json'))
+    # Empty finals results are imported as 'active', so old ones are fetched again
+    assert cache_policy.is_cache_stale(os.path.join('data', 'finals_standings_31.json'))
+    assert cache_policy.is_cache_stale(os.path.join('data', 'tournament_games_31.json'))
+
+def test_import_without_manifest_expires_old_files_of_unknown_series(tmp_path, store):
+    # These finals standings belong to no cached series, so like the JSON backend without a
+    # manifest they fall back to their age
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    write_cache_file(data_dir, 'finals_standings_30.json', [], age_seconds=2 * DAY)
+
+    store.import_json_cache(str(data_dir))
+
+    assert cache_policy.is_cache_stale(os.path.join('data', 'finals_standings_30.json'), 'completed')